@@ -0,0 +1,115 @@
+"""
+Contexto de aplicación: registro de servicios compartidos.
+
+Construye cada backend una sola vez (con sus dependencias inyectadas) y
+todos usan el mismo pool de conexiones, así que cambiar de página no abre
+conexiones nuevas contra el servidor.
+
+También lleva una versión por conjunto de datos ("compras", "inventario",
+"produccion", "ventas", "clientes", "precios"): quien escribe llama a
+mark_changed y las páginas en caché comparan data_versions para saber si
+lo que muestran quedó viejo.
+
+Los backends (y con ellos pymysql) se importan recién al crear cada
+servicio, así que importar este módulo no retrasa el arranque de la GUI.
+"""
+
+import importlib
+import threading
+
+from Core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+def _lazy(path):
+    """Fábrica que importa "modulo:Clase" recién al usarse."""
+    module_name, class_name = path.split(":")
+
+    def factory(**dependencies):
+        return getattr(importlib.import_module(module_name), class_name)(**dependencies)
+    return factory
+
+
+class AppContext:
+    """Registro perezoso de backends compartidos por todas las páginas."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._services = {}
+        self._versions = {}
+        self._factories = {
+            "inventario": lambda: _lazy("Core.inventario_backend:InventarioBackend")(),
+            "produccion": lambda: _lazy("Core.produccion_backend:ProduccionBackend")(inventario=self.inventario),
+            "ventas": lambda: _lazy("Core.ventas_backend:VentasBackend")(produccion=self.produccion),
+            "compras": lambda: _lazy("Core.compras_backend:ComprasBackend")(inventario=self.inventario),
+        }
+
+    def get(self, nombre):
+        """Devuelve el servicio `nombre`, creándolo la primera vez."""
+        service = self._services.get(nombre)
+        if service is not None:
+            return service
+        with self._lock:
+            if nombre not in self._services:
+                if nombre not in self._factories:
+                    raise KeyError(f"Servicio desconocido: {nombre}")
+                self._services[nombre] = self._factories[nombre]()
+                logger.info(f"Servicio '{nombre}' creado")
+            return self._services[nombre]
+
+    def register(self, nombre, factory):
+        """Registra (o reemplaza) la fábrica de un servicio."""
+        with self._lock:
+            self._factories[nombre] = factory
+            self._services.pop(nombre, None)
+
+    def mark_changed(self, *datasets):
+        """Marca `datasets` como modificados (p. ej. tras guardar una compra)."""
+        with self._lock:
+            for nombre in datasets:
+                self._versions[nombre] = self._versions.get(nombre, 0) + 1
+
+    def data_versions(self, datasets):
+        """Versiones actuales de `datasets`, para comparar con las de la última carga."""
+        return tuple(self._versions.get(nombre, 0) for nombre in datasets)
+
+    @property
+    def pool(self):
+        from Core.database import get_pool
+        return get_pool()
+
+    @property
+    def inventario(self):
+        return self.get("inventario")
+
+    @property
+    def produccion(self):
+        return self.get("produccion")
+
+    @property
+    def ventas(self):
+        return self.get("ventas")
+
+    @property
+    def compras(self):
+        return self.get("compras")
+
+    def connection_stats(self):
+        """Conexiones abiertas/en uso y métricas del pool compartido."""
+        from Core.database import get_pool_stats
+        return get_pool_stats()
+
+
+_context = None
+_context_lock = threading.Lock()
+
+
+def get_app_context():
+    """Devuelve el contexto de aplicación del proceso."""
+    global _context
+    if _context is None:
+        with _context_lock:
+            if _context is None:
+                _context = AppContext()
+    return _context
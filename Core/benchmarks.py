@@ -0,0 +1,524 @@
+"""
+Benchmarks y pruebas de carga de los backends.
+
+Uso:
+    python -m Core.benchmarks stress-stock [--hilos 32] [--consumos 50]
+    python -m Core.benchmarks logging [--n 20000]
+    python -m Core.benchmarks eventos [logs/events.jsonl]
+    python -m Core.benchmarks units [--n 200000]
+    python -m Core.benchmarks unidades
+    python -m Core.benchmarks dinero [--compras 100000]
+    python -m Core.benchmarks indices
+    python -m Core.benchmarks tablas [--filas 1000 10000 100000] [--sin-treeview]
+
+Las pruebas que usan la base de datos trabajan con un producto temporal
+y lo borran al terminar.
+"""
+
+import argparse
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import tempfile
+import threading
+import time
+
+from Core import database
+from Core.inventario_backend import InventarioBackend
+from Core.pool import ConnectionPool
+
+PRODUCTO_STRESS = "__stress_consumo__"
+
+
+def stress_consumir_stock(hilos=32, consumos=50, cantidad=1.0, stock_inicial=None):
+    """
+    Lanza `hilos` hilos que consumen `cantidad` g del mismo producto
+    `consumos` veces cada uno, y verifica que no se pierdan actualizaciones.
+
+    Por defecto el stock inicial alcanza solo para la mitad de los consumos,
+    así también se comprueba que el stock nunca queda negativo.
+    Devuelve un dict con el resultado; `ok` es False si hubo lost updates.
+    """
+    total_pedidos = hilos * consumos
+    if stock_inicial is None:
+        stock_inicial = total_pedidos * cantidad / 2
+
+    inventario = InventarioBackend()
+
+    with database.transaction() as cursor:
+        cursor.execute("DELETE FROM inventario WHERE producto = %s", (PRODUCTO_STRESS,))
+        cursor.execute(
+            "INSERT INTO inventario (producto, cantidad_stock, unidad_base, costo_promedio_ponderado) "
+            "VALUES (%s, %s, 'g', 0)",
+            (PRODUCTO_STRESS, stock_inicial)
+        )
+
+    # Pool propio con una conexión por hilo, para que la contención sea en la
+    # base y no en el pool; el pool compartido de la aplicación no se toca
+    pool = ConnectionPool(
+        database.DB_CONFIG, min_size=0, max_size=hilos,
+        acquire_timeout=database.POOL_CONFIG["acquire_timeout"],
+    )
+    exitos = [0] * hilos
+    rechazos = [0] * hilos
+    errores = []
+    inicio_barrera = threading.Barrier(hilos)
+
+    def consumir():
+        # Como database.transaction(), pero con una conexión del pool de la prueba
+        with pool.connection() as conn:
+            try:
+                with conn.cursor() as cursor:
+                    inventario.consumir_stock(PRODUCTO_STRESS, cantidad, "g", cursor=cursor)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+    def trabajador(i):
+        inicio_barrera.wait()
+        for _ in range(consumos):
+            try:
+                consumir()
+                exitos[i] += 1
+            except ValueError as e:
+                if "Stock insuficiente" in str(e):
+                    rechazos[i] += 1
+                else:
+                    errores.append(str(e))
+            except Exception as e:
+                errores.append(str(e))
+
+    inicio = time.perf_counter()
+    try:
+        threads = [threading.Thread(target=trabajador, args=(i,)) for i in range(hilos)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        segundos = time.perf_counter() - inicio
+        pool_stats = pool.stats()
+    finally:
+        pool.close()
+
+    try:
+        with database.transaction() as cursor:
+            cursor.execute("SELECT cantidad_stock FROM inventario WHERE producto = %s", (PRODUCTO_STRESS,))
+            stock_final = float(cursor.fetchone()["cantidad_stock"])
+    finally:
+        with database.transaction() as cursor:
+            cursor.execute("DELETE FROM inventario WHERE producto = %s", (PRODUCTO_STRESS,))
+
+    total_exitos = sum(exitos)
+    esperado = stock_inicial - total_exitos * cantidad
+    resultado = {
+        "hilos": hilos,
+        "consumos_pedidos": total_pedidos,
+        "consumos_ok": total_exitos,
+        "rechazados_sin_stock": sum(rechazos),
+        "errores": len(errores),
+        "stock_inicial": stock_inicial,
+        "stock_final": stock_final,
+        "stock_esperado": esperado,
+        "consumos_por_segundo": round(total_pedidos / segundos, 1) if segundos else None,
+        "pool": pool_stats,
+    }
+    resultado["ok"] = (
+        abs(stock_final - esperado) < 1e-6
+        and stock_final >= 0
+        and not errores
+    )
+    return resultado
+
+
+def bench_logging(n=20000, handlers_duplicados=10):
+    """
+    Costo por llamada de logger.info() visto desde el hilo que loguea.
+
+    Compara tres configuraciones escribiendo a archivos temporales:
+      - sync: StreamHandler + FileHandler en el mismo hilo (configuración vieja)
+      - sync_duplicado: lo mismo con los handlers agregados N veces, como pasaba
+        al llamar setup_logger() desde cada frame
+      - cola: QueueHandler + QueueListener (Core.logger)
+    Devuelve microsegundos por llamada para cada caso.
+    """
+    from Core.logger import _AsyncQueueHandler, LOG_FORMAT
+
+    formatter = logging.Formatter(LOG_FORMAT)
+    tmpdir = tempfile.mkdtemp(prefix="bench_logging_")
+    devnull = open(os.devnull, "w")
+
+    def sync_handlers(nombre):
+        stream = logging.StreamHandler(devnull)
+        archivo = logging.FileHandler(os.path.join(tmpdir, f"{nombre}.log"))
+        stream.setFormatter(formatter)
+        archivo.setFormatter(formatter)
+        return [stream, archivo]
+
+    def medir(logger):
+        inicio = time.perf_counter()
+        for i in range(n):
+            logger.info("Venta registrada: ClienteID %s, ProductoID %s, Cantidad %s", i, i * 7, 3)
+        return (time.perf_counter() - inicio) / n * 1e6
+
+    resultados = {}
+    abiertos = []
+    try:
+        sync = logging.getLogger("bench.sync")
+        dup = logging.getLogger("bench.sync_duplicado")
+        cola = logging.getLogger("bench.cola")
+        for lg in (sync, dup, cola):
+            lg.propagate = False
+            lg.setLevel(logging.INFO)
+
+        for h in sync_handlers("sync"):
+            sync.addHandler(h)
+            abiertos.append(h)
+        for i in range(handlers_duplicados):
+            for h in sync_handlers(f"dup{i}"):
+                dup.addHandler(h)
+                abiertos.append(h)
+        q = queue.SimpleQueue()
+        destino = sync_handlers("cola")
+        abiertos.extend(destino)
+        cola.addHandler(_AsyncQueueHandler(q))
+        listener = logging.handlers.QueueListener(q, *destino)
+        listener.start()
+
+        resultados["sync_us"] = round(medir(sync), 2)
+        resultados["sync_duplicado_us"] = round(medir(dup), 2)
+        resultados["cola_us"] = round(medir(cola), 2)
+        inicio = time.perf_counter()
+        listener.stop()
+        resultados["cola_drenado_s"] = round(time.perf_counter() - inicio, 3)
+    finally:
+        for lg in ("bench.sync", "bench.sync_duplicado", "bench.cola"):
+            logging.getLogger(lg).handlers.clear()
+        for h in abiertos:
+            h.close()
+        devnull.close()
+    resultados["llamadas"] = n
+    return resultados
+
+
+def resumir_eventos(path):
+    """
+    Agrega el log de eventos JSON por operación: cantidad, errores,
+    percentiles p50/p95/p99 de elapsed_ms y promedio de viajes a la base.
+    """
+    por_operacion = {}
+    with open(path, encoding="utf-8") as f:
+        for linea in f:
+            if not linea.strip():
+                continue
+            evento = json.loads(linea)
+            datos = por_operacion.setdefault(evento["operation"], {"ms": [], "errores": 0, "viajes": 0})
+            datos["ms"].append(evento.get("elapsed_ms", 0))
+            datos["viajes"] += evento.get("db_round_trips", 0)
+            if evento.get("status") == "error":
+                datos["errores"] += 1
+
+    def percentil(valores, p):
+        return valores[min(len(valores) - 1, int(round(p / 100 * (len(valores) - 1))))]
+
+    resumen = {}
+    for operacion, datos in sorted(por_operacion.items()):
+        ms = sorted(datos["ms"])
+        resumen[operacion] = {
+            "n": len(ms),
+            "errores": datos["errores"],
+            "p50_ms": percentil(ms, 50),
+            "p95_ms": percentil(ms, 95),
+            "p99_ms": percentil(ms, 99),
+            "viajes_promedio": round(datos["viajes"] / len(ms), 2),
+        }
+    return resumen
+
+
+def bench_units(n=200000):
+    """
+    Conversiones por segundo de convert_to_base / convert_from_base,
+    sin traza (por defecto) y con la traza DEBUG activa (como antes).
+    """
+    from Core import units
+
+    casos = [(1.5, "kg"), (250, "g"), (2, "lt"), (12, "unit"), (3, "lb")]
+
+    def medir():
+        inicio = time.perf_counter()
+        for i in range(n):
+            cantidad, unidad = casos[i % len(casos)]
+            base, unidad_base = units.convert_to_base(cantidad, unidad)
+            units.convert_from_base(base, unidad_base, unidad)
+        return round(n / (time.perf_counter() - inicio))
+
+    nivel = units.logger.level
+    resultados = {"conversiones": n, "sin_traza_por_s": medir()}
+    # Con la traza los mensajes van a un logger con un handler nulo, para
+    # medir el costo del logging y no el de la consola.
+    nulo = logging.NullHandler()
+    units.logger.addHandler(nulo)
+    units.logger.propagate = False
+    units.set_unit_tracing(True)
+    try:
+        resultados["con_traza_por_s"] = medir()
+    finally:
+        units.set_unit_tracing(False)
+        units.logger.removeHandler(nulo)
+        units.logger.propagate = True
+        units.logger.setLevel(nivel)
+    return resultados
+
+
+def _compras_sinteticas(n, semilla=1234):
+    """Compras reproducibles: (cantidad en g como texto, precio por kg como texto)."""
+    import random
+    rnd = random.Random(semilla)
+    for _ in range(n):
+        cantidad = f"{rnd.randint(1, 50000) / 10:.1f}"
+        precio_kg = f"{rnd.randint(1, 99999) / 100:.2f}"
+        yield cantidad, precio_kg
+
+
+def drift_costo_promedio(compras=100000):
+    """
+    Simula `compras` entradas de stock de un mismo producto y compara el costo
+    promedio ponderado contra una referencia exacta (fracciones, redondeando
+    solo al guardar en cada columna como hace la base).
+
+      - decimal: Core.money (camino actual)
+      - float:   la cuenta vieja en float/DOUBLE, redondeada al guardar
+
+    `ok` es True si el camino Decimal coincide con la referencia en todas las
+    compras y la suma de los totales guardados es exacta al centavo.
+    """
+    import math
+    from decimal import Decimal
+    from fractions import Fraction
+    from Core import money as m
+
+    def guardar(valor, escala):
+        # Redondeo de columna DECIMAL (mitad hacia arriba) sobre un valor exacto >= 0
+        paso = Fraction(escala)
+        return math.floor(valor / paso + Fraction(1, 2)) * paso
+
+    ref_stock, ref_costo, ref_gastado = Fraction(0), Fraction(0), Fraction(0)
+    dec_stock, dec_costo, dec_gastado = m.ZERO, m.ZERO, m.ZERO
+    flt_stock, flt_costo, flt_gastado = 0.0, 0.0, 0.0
+    desvio_decimal = Fraction(0)
+    desvio_float = Fraction(0)
+
+    for cantidad, precio_kg in _compras_sinteticas(compras):
+        # Referencia exacta
+        total = guardar(Fraction(cantidad) * Fraction(precio_kg) / 1000, m.MONEY)
+        q = Fraction(cantidad)
+        ref_costo = guardar((ref_stock * ref_costo + total) / (ref_stock + q), m.COST)
+        ref_stock += q
+        ref_gastado += total
+
+        # Core.money
+        total_dec = m.money(Decimal(cantidad) * Decimal(precio_kg) / 1000)
+        dec_costo = m.weighted_average_cost(dec_stock, dec_costo, m.qty(cantidad), total_dec)
+        dec_stock += m.qty(cantidad)
+        dec_gastado += total_dec
+
+        # Float (como antes)
+        total_flt = float(cantidad) * float(precio_kg) / 1000
+        flt_costo = round((flt_stock * flt_costo + total_flt) / (flt_stock + float(cantidad)), 4)
+        flt_stock += float(cantidad)
+        flt_gastado += total_flt
+
+        desvio_decimal = max(desvio_decimal, abs(Fraction(dec_costo) - ref_costo))
+        desvio_float = max(desvio_float, abs(Fraction(repr(flt_costo)) - ref_costo))
+
+    return {
+        "compras": compras,
+        "costo_referencia": float(ref_costo),
+        "costo_decimal": str(dec_costo),
+        "costo_float": flt_costo,
+        "desvio_max_decimal": float(desvio_decimal),
+        "desvio_max_float": float(desvio_float),
+        "gastado_referencia": float(ref_gastado),
+        "gastado_decimal": str(dec_gastado),
+        "gastado_float": flt_gastado,
+        "ok": desvio_decimal == 0 and Fraction(dec_gastado) == ref_gastado,
+    }
+
+
+def bench_money(n=100000):
+    """
+    Microsegundos por compra de la aritmética de una entrada de stock
+    (total de línea, costo unitario y costo promedio): float vs Core.money.
+    Es lo único que cambia en el camino caliente; el resto es un viaje a la base.
+    """
+    from Core import money as m
+
+    casos = list(_compras_sinteticas(1000))
+
+    def medir_float():
+        stock, costo = 0.0, 0.0
+        inicio = time.perf_counter()
+        for i in range(n):
+            cantidad, precio = casos[i % len(casos)]
+            cantidad, precio = float(cantidad), float(precio)
+            total = cantidad * precio
+            _ = total / cantidad
+            costo = (stock * costo + total) / (stock + cantidad)
+            stock += cantidad
+        return (time.perf_counter() - inicio) / n * 1e6
+
+    def medir_decimal():
+        stock, costo = m.ZERO, m.ZERO
+        inicio = time.perf_counter()
+        for i in range(n):
+            cantidad, precio = casos[i % len(casos)]
+            cantidad, precio = m.qty(cantidad), m.money(precio)
+            total = m.line_total(cantidad, precio)
+            _ = m.unit_cost(total, cantidad)
+            costo = m.weighted_average_cost(stock, costo, cantidad, total)
+            stock += cantidad
+        return (time.perf_counter() - inicio) / n * 1e6
+
+    return {
+        "compras": n,
+        "float_us": round(medir_float(), 3),
+        "decimal_us": round(medir_decimal(), 3),
+    }
+
+
+def bench_tablas(tamanos=(1000, 10000, 100000), con_treeview=True, repeticiones=3):
+    """
+    Segundos por refresco de una tabla de N filas (necesita display):
+      - treeview: borrar todos los items e insertar todas las filas (como antes)
+      - virtual:  Gui.virtual_table.VirtualTable.set_rows
+    Cada refresco incluye update_idletasks() para contar también el repintado.
+    """
+    import tkinter as tk
+    from tkinter import ttk
+    from Gui.virtual_table import VirtualTable, Column
+
+    root = tk.Tk()
+    root.geometry("800x600")
+    claves = ("producto", "cantidad", "unidad", "precio", "total")
+    resultados = {}
+    try:
+        tree = ttk.Treeview(root, columns=claves, show="headings", height=20)
+        tabla = VirtualTable(root, [Column(k) for k in claves], height=20)
+        for n in tamanos:
+            filas = [
+                {"producto": f"Producto {i}", "cantidad": i % 97, "unidad": "g", "precio": i * 0.5, "total": i * 1.5}
+                for i in range(n)
+            ]
+            fila = {}
+            if con_treeview:
+                tree.pack(fill=tk.BOTH, expand=True)
+                tiempos = []
+                for _ in range(repeticiones):
+                    inicio = time.perf_counter()
+                    tree.delete(*tree.get_children())
+                    for r in filas:
+                        tree.insert("", tk.END, values=[r[k] for k in claves])
+                    root.update_idletasks()
+                    tiempos.append(time.perf_counter() - inicio)
+                tree.delete(*tree.get_children())
+                tree.pack_forget()
+                fila["treeview_s"] = round(min(tiempos), 4)
+
+            tabla.pack(fill=tk.BOTH, expand=True)
+            tiempos = []
+            for _ in range(repeticiones):
+                inicio = time.perf_counter()
+                tabla.set_rows(filas)
+                root.update_idletasks()
+                tiempos.append(time.perf_counter() - inicio)
+            tabla.pack_forget()
+            fila["virtual_s"] = round(min(tiempos), 4)
+            resultados[n] = fila
+    finally:
+        root.destroy()
+    return resultados
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de Economia App")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p_stress = sub.add_parser("stress-stock", help="Consumo concurrente de stock (lost updates)")
+    p_stress.add_argument("--hilos", type=int, default=32)
+    p_stress.add_argument("--consumos", type=int, default=50)
+
+    p_log = sub.add_parser("logging", help="Costo por llamada de logging (sync vs cola)")
+    p_log.add_argument("--n", type=int, default=20000)
+
+    p_ev = sub.add_parser("eventos", help="Percentiles de latencia por operación del log de eventos")
+    p_ev.add_argument("archivo", nargs="?", default=None)
+
+    p_units = sub.add_parser("units", help="Conversiones de unidades por segundo")
+    p_units.add_argument("--n", type=int, default=200000)
+
+    sub.add_parser("unidades", help="Verifica que toda unidad ofrecida en la GUI convierta")
+
+    sub.add_parser("indices", help="EXPLAIN de las consultas calientes: verifica que usen índices")
+
+    p_tablas = sub.add_parser("tablas", help="Tiempo de refresco de tablas grandes: Treeview vs VirtualTable")
+    p_tablas.add_argument("--filas", type=int, nargs="+", default=[1000, 10000, 100000])
+    p_tablas.add_argument("--sin-treeview", action="store_true", help="Medir solo la tabla virtual")
+
+    p_dinero = sub.add_parser("dinero", help="Costo de Core.money vs float y drift del costo promedio")
+    p_dinero.add_argument("--compras", type=int, default=100000)
+
+    args = parser.parse_args(argv)
+
+    if args.comando == "stress-stock":
+        resultado = stress_consumir_stock(hilos=args.hilos, consumos=args.consumos)
+        for clave, valor in resultado.items():
+            print(f"{clave}: {valor}")
+        return 0 if resultado["ok"] else 1
+    if args.comando == "logging":
+        for clave, valor in bench_logging(n=args.n).items():
+            print(f"{clave}: {valor}")
+        return 0
+    if args.comando == "units":
+        for clave, valor in bench_units(n=args.n).items():
+            print(f"{clave}: {valor}")
+        return 0
+    if args.comando == "unidades":
+        from Core.units import check_unit_registry, unit_choices
+        problemas = check_unit_registry()
+        for problema in problemas:
+            print(problema)
+        print(f"{len(unit_choices())} unidades verificadas, {len(problemas)} problemas")
+        return 1 if problemas else 0
+    if args.comando == "tablas":
+        for n, tiempos in bench_tablas(args.filas, con_treeview=not args.sin_treeview).items():
+            print(f"{n} filas: {tiempos}")
+        return 0
+    if args.comando == "indices":
+        from Core.schema import hot_queries, check_query_plans
+        consultas = hot_queries()
+        with database.transaction() as cursor:
+            problemas = check_query_plans(cursor, consultas)
+        for problema in problemas:
+            print(problema)
+        print(f"{len(consultas)} consultas revisadas, {len(problemas)} problemas")
+        return 1 if problemas else 0
+    if args.comando == "dinero":
+        for clave, valor in bench_money(n=args.compras).items():
+            print(f"{clave}: {valor}")
+        resultado = drift_costo_promedio(compras=args.compras)
+        for clave, valor in resultado.items():
+            print(f"{clave}: {valor}")
+        return 0 if resultado["ok"] else 1
+    if args.comando == "eventos":
+        from Core.logger import EVENT_LOG_FILE
+        for operacion, datos in resumir_eventos(args.archivo or EVENT_LOG_FILE).items():
+            print(f"{operacion}: {datos}")
+        return 0
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,43 +1,78 @@
-from Core.database import get_connection, insert_compra, get_compras
-from Core.logger import setup_logger
+from Core.database import insert_compra, get_compra, get_compras, get_compras_page, get_connection, transaction
+from Core.logger import setup_logger, traced
 from Core.inventario_backend import InventarioBackend
+from Core.compras_import import importar_compras
+from Core.compras_backfill import campos_tipados
+from Core.units import normalize_unit
+from Core.money import money, line_total, to_decimal
+
+SQL_RESUMEN_POR_PRODUCTO = """
+    SELECT producto, unidad_base,
+           SUM(cantidad_base) AS cantidad_base,
+           SUM(precio_total) AS total_gastado,
+           COUNT(*) AS compras
+    FROM compras
+    WHERE cantidad_base IS NOT NULL
+    GROUP BY producto, unidad_base
+    ORDER BY producto
+"""
 
 class ComprasBackend:
-    def __init__(self):
-        self.db = get_connection()
-        self.logger = setup_logger()
-        self.inventory_maneger = InventarioBackend()
+    def __init__(self, inventario=None):
+        self.logger = setup_logger(__name__)
+        self.inventory_maneger = inventario or InventarioBackend()
         self.logger.info("ComprasBackend initialized")
 
+    @traced("compras.save_purchase", ids=("tipo", "nombre", "proveedor"))
     def save_purchase(self, tipo, nombre, proveedor, cantidad=None, unidad=None, precio_compra=None, cantidad_paq=None, precio_paq=None, peso_paq=None, unidad_peso=None):
+        """Guarda una compra y su entrada de stock. Devuelve la fila guardada, como en el historial."""
         self.logger.info(f"Attempting to save {tipo} purchase: {nombre}")
         if not nombre or not proveedor:
             self.logger.warning("Save purchase failed: missing product name or supplier")
             raise ValueError("Nombre del producto y proveedor son obligatorios")
         try:
             if tipo == "granel":
-                cantidad = float(cantidad)
-                precio_compra = float(precio_compra)
-                precio_total = precio_compra * cantidad
+                cantidad = to_decimal(cantidad)
+                precio_compra = money(precio_compra)
+                precio_total = line_total(cantidad, precio_compra)
                 if not unidad:
                     raise ValueError("Unidad es obligatoria")
-                insert_compra(nombre, str(cantidad), unidad, precio_compra, precio_total, proveedor, "granel")
-                self.inventory_maneger.actualizar_stock_desde_compra(nombre, cantidad, unidad, precio_total)
+                unidad = normalize_unit(unidad)
+                if not unidad:
+                    raise ValueError("Unidad no reconocida")
+                # Compra y stock en una sola transacción: o se guardan ambos o ninguno
+                cantidad_base, unidad_base, _, _ = campos_tipados(cantidad, unidad)
+                with transaction() as cursor:
+                    compra_id = insert_compra(nombre, str(cantidad), unidad, precio_compra, precio_total, proveedor, "granel", cursor=cursor,
+                                              cantidad_base=cantidad_base, unidad_base=unidad_base)
+                    self.inventory_maneger.actualizar_stock_desde_compra(nombre, cantidad, unidad, precio_total, cursor=cursor)
+                    compra = get_compra(compra_id, cursor=cursor)
                 self.logger.info(f"Saved granel purchase: {nombre}, {cantidad} {unidad}, ${precio_total}")
             elif tipo == "paquetes":
                 cantidad_paq = int(cantidad_paq)
-                precio_paq = float(precio_paq)
-                peso_paq = float(peso_paq)
+                precio_paq = money(precio_paq)
+                peso_paq = to_decimal(peso_paq)
                 if not unidad_peso:
                     raise ValueError("Unidad de peso es obligatoria")
+                unidad_peso = normalize_unit(unidad_peso)
+                if not unidad_peso:
+                    raise ValueError("Unidad de peso no reconocida")
                 cantidad_total_peso = cantidad_paq * peso_paq
-                precio_total = cantidad_paq * precio_paq
+                precio_total = line_total(cantidad_paq, precio_paq)
                 cantidad_str = f"{cantidad_paq} x {peso_paq} {unidad_peso}"
-                insert_compra(nombre, cantidad_total_peso, unidad_peso, precio_paq, precio_total, proveedor, "paquetes")
-                self.inventory_maneger.actualizar_stock_desde_compra(nombre, cantidad_total_peso, unidad_peso, precio_total)
+                cantidad_base, unidad_base, paquetes, peso_paquete = campos_tipados(
+                    cantidad_total_peso, unidad_peso, cantidad_paq, peso_paq
+                )
+                with transaction() as cursor:
+                    compra_id = insert_compra(nombre, cantidad_total_peso, unidad_peso, precio_paq, precio_total, proveedor, "paquetes", cursor=cursor,
+                                              cantidad_base=cantidad_base, unidad_base=unidad_base,
+                                              paquetes=paquetes, peso_paquete=peso_paquete)
+                    self.inventory_maneger.actualizar_stock_desde_compra(nombre, cantidad_total_peso, unidad_peso, precio_total, cursor=cursor)
+                    compra = get_compra(compra_id, cursor=cursor)
                 self.logger.info(f"Saved paquetes purchase: {nombre}, {cantidad_paq} paquetes, ${precio_paq} each")
             else:
                 raise ValueError("Tipo de compra inválido")
+            return compra
         except ValueError as e:
             self.logger.error(f"Save purchase failed due to invalid input: {e}")
             raise
@@ -45,6 +80,37 @@ class ComprasBackend:
             self.logger.error(f"Save purchase failed: {e}")
             raise
 
+    @traced("compras.importar_compras", ids=("origen", "dry_run"))
+    def importar_compras(self, origen, dry_run=False, batch_size=500):
+        """Importa un archivo CSV/JSON de compras. Ver Core.compras_import."""
+        self.logger.info(f"Importing purchases from {origen} (dry_run={dry_run})")
+        return importar_compras(origen, dry_run=dry_run, batch_size=batch_size, inventario=self.inventory_maneger)
+
+    @traced("compras.get_resumen_por_producto")
+    def get_resumen_por_producto(self):
+        """
+        Total comprado por producto, agregado en SQL sobre las columnas tipadas:
+        [{producto, unidad_base, cantidad_base, total_gastado, compras}, ...]
+        """
+        conn = get_connection()
+        if not conn:
+            return []
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(SQL_RESUMEN_POR_PRODUCTO)
+                return cursor.fetchall()
+        except Exception as e:
+            self.logger.error(f"Error retrieving purchase summary: {e}")
+            return []
+        finally:
+            conn.close()
+
+    @traced("compras.get_purchase_history_page", ids=("producto", "proveedor", "limit"))
+    def get_purchase_history_page(self, after=None, limit=200, producto=None, proveedor=None, desde=None, hasta=None):
+        """Una página del historial de compras. Ver Core.database.get_compras_page."""
+        return get_compras_page(after=after, limit=limit, producto=producto, proveedor=proveedor, desde=desde, hasta=hasta)
+
+    @traced("compras.get_purchase_history")
     def get_purchase_history(self):
         self.logger.info("Retrieving purchase history")
         return get_compras()
@@ -0,0 +1,154 @@
+"""
+Columnas tipadas de `compras` (migración 5).
+
+`compras.cantidad` es texto: "1.5" en compras a granel y "3 x 500.0 g" (o el
+peso total) en compras por paquetes. Este módulo calcula los campos tipados
+cantidad_base, unidad_base, paquetes y peso_paquete, tanto para las compras
+nuevas como para completar por lotes las filas existentes.
+
+La migración 5 solo agrega las columnas; el relleno corre aparte, después de
+la migración y fuera de su lock: en cada arranque, si quedan filas sin
+completar, se retoma solo (Core.database.start_compras_backfill). También
+se puede lanzar a mano desde consola:
+    python -m Core.compras_backfill [--batch-size 1000]
+"""
+
+import re
+import sys
+
+from Core.logger import setup_logger
+from Core.money import qty, to_base_quantity, to_decimal
+from Core.units import base_unit_of, normalize_unit
+
+logger = setup_logger(__name__)
+
+# "3 x 500.0 g", "3x500 g", "3 X 0,5 kg"
+PATRON_PAQUETES = re.compile(r"^\s*(\d+)\s*[xX]\s*(\d+(?:[.,]\d+)?)\s*(.*?)\s*$")
+
+SQL_PENDIENTES = (
+    "SELECT id, cantidad, unidad, tipo, precio_compra, precio_total FROM compras "
+    "WHERE cantidad_base IS NULL AND id > %s ORDER BY id LIMIT %s"
+)
+SQL_HAY_PENDIENTES = "SELECT 1 FROM compras WHERE cantidad_base IS NULL LIMIT 1"
+SQL_ACTUALIZAR = (
+    "UPDATE compras SET cantidad_base = %s, unidad_base = %s, paquetes = %s, peso_paquete = %s "
+    "WHERE id = %s"
+)
+
+
+def campos_tipados(cantidad, unidad, paquetes=None, peso_paquete=None):
+    """
+    Campos tipados de una compra nueva: (cantidad_base, unidad_base, paquetes, peso_paquete).
+    `cantidad` es la cantidad total y `peso_paquete` el peso de cada paquete,
+    ambos en `unidad`; se guardan convertidos a la unidad base.
+    Lanza ValueError si la unidad no existe.
+    """
+    cantidad_base = to_base_quantity(cantidad, unidad)
+    if cantidad_base is None:
+        raise ValueError(f"Unidad '{unidad}' no reconocida")
+    return (
+        qty(cantidad_base),
+        base_unit_of(unidad),
+        int(paquetes) if paquetes is not None else None,
+        qty(to_base_quantity(peso_paquete, unidad)) if peso_paquete is not None else None,
+    )
+
+
+def parse_compra(fila):
+    """
+    Interpreta una fila existente de `compras` (dict con cantidad, unidad,
+    tipo, precio_compra y precio_total) y devuelve sus campos tipados.
+
+    En compras por paquetes guardadas como peso total, la cantidad de
+    paquetes se deduce de precio_total / precio_compra cuando es entera.
+    Lanza ValueError si la fila no se puede interpretar.
+    """
+    texto = str(fila["cantidad"]).strip()
+    unidad = fila["unidad"]
+
+    coincidencia = PATRON_PAQUETES.match(texto)
+    if coincidencia:
+        paquetes = int(coincidencia.group(1))
+        peso_paquete = to_decimal(coincidencia.group(2).replace(",", "."))
+        unidad = coincidencia.group(3) or unidad
+        return campos_tipados(paquetes * peso_paquete, normalize_unit(unidad) or unidad, paquetes, peso_paquete)
+
+    cantidad = to_decimal(texto.replace(",", "."))
+    paquetes = peso_paquete = None
+    if fila.get("tipo") == "paquetes" and fila.get("precio_compra"):
+        estimado = to_decimal(fila["precio_total"]) / to_decimal(fila["precio_compra"])
+        if estimado > 0 and estimado == estimado.to_integral_value():
+            paquetes = int(estimado)
+            peso_paquete = cantidad / paquetes
+    return campos_tipados(cantidad, normalize_unit(unidad) or unidad, paquetes, peso_paquete)
+
+
+def hay_pendientes(cursor=None):
+    """True si quedan compras sin columnas tipadas (incluye las que no se pudieron interpretar)."""
+    if cursor is None:
+        from Core.database import transaction
+        with transaction() as cursor:
+            return hay_pendientes(cursor)
+    cursor.execute(SQL_HAY_PENDIENTES)
+    return cursor.fetchone() is not None
+
+
+def backfill_compras(batch_size=1000, cursor=None):
+    """
+    Completa las columnas tipadas de las compras que aún no las tienen.
+
+    Recorre la tabla por id en lotes de `batch_size` y actualiza cada lote con
+    executemany. Sin `cursor`, cada lote es su propia transacción, así que se
+    puede interrumpir y volver a lanzar. Las filas que no se pueden interpretar
+    quedan en NULL y se informan en el reporte.
+
+    Returns:
+        dict con revisadas, actualizadas y errores [(id, mensaje)]
+    """
+    reporte = {"revisadas": 0, "actualizadas": 0, "errores": []}
+    ultimo_id = 0
+    while True:
+        if cursor is None:
+            from Core.database import transaction
+            with transaction() as lote_cursor:
+                ultimo_id, cantidad = _procesar_lote(lote_cursor, ultimo_id, batch_size, reporte)
+        else:
+            ultimo_id, cantidad = _procesar_lote(cursor, ultimo_id, batch_size, reporte)
+        if cantidad < batch_size:
+            break
+
+    logger.info(
+        f"Backfill de compras: {reporte['actualizadas']}/{reporte['revisadas']} filas completadas, "
+        f"{len(reporte['errores'])} sin interpretar"
+    )
+    return reporte
+
+
+def _procesar_lote(cursor, ultimo_id, batch_size, reporte):
+    """Completa un lote de filas pendientes. Devuelve (último id visto, filas leídas)."""
+    cursor.execute(SQL_PENDIENTES, (ultimo_id, batch_size))
+    filas = cursor.fetchall()
+    actualizaciones = []
+    for fila in filas:
+        try:
+            actualizaciones.append(parse_compra(fila) + (fila["id"],))
+        except (ValueError, ArithmeticError) as e:
+            reporte["errores"].append((fila["id"], str(e)))
+    if actualizaciones:
+        cursor.executemany(SQL_ACTUALIZAR, actualizaciones)
+    reporte["revisadas"] += len(filas)
+    reporte["actualizadas"] += len(actualizaciones)
+    return (filas[-1]["id"] if filas else ultimo_id), len(filas)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Completar columnas tipadas de compras")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    resultado = backfill_compras(batch_size=args.batch_size)
+    for id_compra, mensaje in resultado["errores"]:
+        print(f"Compra {id_compra}: {mensaje}", file=sys.stderr)
+    print(f"revisadas: {resultado['revisadas']}, actualizadas: {resultado['actualizadas']}")
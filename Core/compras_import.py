@@ -0,0 +1,220 @@
+"""
+Importación masiva de compras (facturas de proveedores).
+
+Lee filas de un CSV o JSON sin cargar todo el archivo en memoria, las valida
+con Core.units, inserta las compras por lotes con executemany y aplica al
+inventario una sola actualización de costo promedio por producto.
+
+Uso desde consola:
+    python -m Core.compras_import factura.csv [--dry-run] [--batch-size 500]
+"""
+
+import csv
+import json
+import sys
+import time
+
+from Core.database import transaction
+from Core.inventario_backend import InventarioBackend
+from Core.logger import setup_logger
+from Core.compras_backfill import campos_tipados
+from Core.money import money, line_total, to_decimal
+from Core.units import normalize_unit
+
+logger = setup_logger(__name__)
+
+SQL_INSERT_COMPRA = (
+    "INSERT INTO compras (producto, cantidad, unidad, precio_compra, precio_total, proveedor, tipo, "
+    "cantidad_base, unidad_base, paquetes, peso_paquete) "
+    "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"
+)
+
+
+def leer_filas(origen):
+    """
+    Genera las filas (dicts) de un archivo .csv, .jsonl o .json.
+    `origen` también puede ser un iterable de dicts ya leídos.
+    Los .json deben contener una lista de objetos y sí se cargan completos.
+    """
+    if not isinstance(origen, str):
+        yield from origen
+        return
+
+    ruta = origen.lower()
+    with open(origen, newline="", encoding="utf-8") as f:
+        if ruta.endswith(".csv"):
+            yield from csv.DictReader(f)
+        elif ruta.endswith(".jsonl"):
+            for linea in f:
+                if linea.strip():
+                    yield json.loads(linea)
+        elif ruta.endswith(".json"):
+            datos = json.load(f)
+            if not isinstance(datos, list):
+                raise ValueError("El JSON debe contener una lista de compras")
+            yield from datos
+        else:
+            raise ValueError(f"Formato no soportado: {origen}")
+
+
+def _texto(fila, campo):
+    valor = fila.get(campo)
+    return str(valor).strip() if valor is not None else ""
+
+
+def validar_fila(fila):
+    """
+    Valida y normaliza una fila. Devuelve un dict con los valores para
+    `compras` y la entrada de stock, o lanza ValueError.
+
+    Columnas: producto, proveedor, tipo ('granel' o 'paquetes') y
+      - granel:   cantidad, unidad, precio_compra
+      - paquetes: cantidad_paq, precio_paq, peso_paq, unidad_peso
+    """
+    nombre = _texto(fila, "producto")
+    proveedor = _texto(fila, "proveedor")
+    tipo = _texto(fila, "tipo").lower() or "granel"
+    if not nombre or not proveedor:
+        raise ValueError("Nombre del producto y proveedor son obligatorios")
+
+    if tipo not in ("granel", "paquetes"):
+        raise ValueError(f"Tipo de compra inválido: '{tipo}'")
+
+    try:
+        if tipo == "granel":
+            cantidad = to_decimal(fila.get("cantidad"))
+            precio_compra = money(fila.get("precio_compra"))
+            unidad = _texto(fila, "unidad")
+            precio_total = line_total(cantidad, precio_compra)
+            cantidad_compra = str(cantidad)
+            paquetes = peso_paquete = None
+        else:
+            cantidad_paq = int(fila.get("cantidad_paq"))
+            precio_compra = money(fila.get("precio_paq"))
+            peso_paq = to_decimal(fila.get("peso_paq"))
+            unidad = _texto(fila, "unidad_peso")
+            cantidad = cantidad_paq * peso_paq
+            precio_total = line_total(cantidad_paq, precio_compra)
+            cantidad_compra = cantidad
+            paquetes, peso_paquete = cantidad_paq, peso_paq
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Valor numérico inválido: {e}")
+
+    if cantidad <= 0 or precio_total < 0:
+        raise ValueError("Cantidad y precio deben ser positivos")
+    if not unidad:
+        raise ValueError("Unidad es obligatoria")
+
+    unidad_canonica = normalize_unit(unidad)
+    if not unidad_canonica:
+        raise ValueError(f"Unidad '{unidad}' no reconocida")
+    unidad = unidad_canonica
+    cantidad_base, unidad_base, paquetes, peso_paquete = campos_tipados(cantidad, unidad, paquetes, peso_paquete)
+
+    return {
+        "compra": (nombre, cantidad_compra, unidad, precio_compra, precio_total, proveedor, tipo,
+                   cantidad_base, unidad_base, paquetes, peso_paquete),
+        "producto": nombre,
+        "cantidad_base": cantidad_base,
+        "unidad_base": unidad_base,
+        "precio_total": precio_total,
+    }
+
+
+def importar_compras(origen, dry_run=False, batch_size=500, inventario=None):
+    """
+    Importa compras en bloque.
+
+    Las filas inválidas se omiten y se informan en el reporte. Con
+    dry_run=True solo se valida y agrega, sin escribir en la base.
+    Todo lo válido se escribe en una única transacción.
+
+    Returns:
+        dict con filas_leidas, filas_validas, errores [(fila, mensaje)],
+        compras_insertadas, productos, productos_actualizados, segundos
+        y filas_por_segundo
+    """
+    inicio = time.perf_counter()
+    reporte = {
+        "dry_run": dry_run,
+        "filas_leidas": 0,
+        "filas_validas": 0,
+        "errores": [],
+        "compras_insertadas": 0,
+        "productos_actualizados": 0,
+    }
+    # producto -> [cantidad_base, precio_total, unidad_base]
+    stock = {}
+    lote = []
+
+    def acumular(numero, fila):
+        reporte["filas_leidas"] += 1
+        try:
+            valida = validar_fila(fila)
+            actual = stock.get(valida["producto"])
+            if actual and actual[2] != valida["unidad_base"]:
+                raise ValueError(
+                    f"Unidad base '{valida['unidad_base']}' no coincide con '{actual[2]}' "
+                    f"de filas anteriores de '{valida['producto']}'"
+                )
+        except ValueError as e:
+            reporte["errores"].append((numero, str(e)))
+            return
+        if actual:
+            actual[0] += valida["cantidad_base"]
+            actual[1] += valida["precio_total"]
+        else:
+            stock[valida["producto"]] = [valida["cantidad_base"], valida["precio_total"], valida["unidad_base"]]
+        lote.append(valida["compra"])
+        reporte["filas_validas"] += 1
+
+    if dry_run:
+        for numero, fila in enumerate(leer_filas(origen), start=1):
+            acumular(numero, fila)
+    else:
+        inventario = inventario or InventarioBackend()
+        with transaction() as cursor:
+            for numero, fila in enumerate(leer_filas(origen), start=1):
+                acumular(numero, fila)
+                if len(lote) >= batch_size:
+                    cursor.executemany(SQL_INSERT_COMPRA, lote)
+                    reporte["compras_insertadas"] += len(lote)
+                    lote.clear()
+            if lote:
+                cursor.executemany(SQL_INSERT_COMPRA, lote)
+                reporte["compras_insertadas"] += len(lote)
+                lote.clear()
+
+            # Una sola actualización de costo promedio por producto
+            for producto, (cantidad_base, precio_total, unidad_base) in stock.items():
+                inventario.actualizar_stock_desde_compra(
+                    producto, cantidad_base, unidad_base, precio_total, cursor=cursor
+                )
+            reporte["productos_actualizados"] = len(stock)
+
+    reporte["productos"] = len(stock)
+    segundos = time.perf_counter() - inicio
+    reporte["segundos"] = round(segundos, 3)
+    reporte["filas_por_segundo"] = round(reporte["filas_leidas"] / segundos, 1) if segundos else None
+    logger.info(
+        f"Importación de compras{' (dry-run)' if dry_run else ''}: "
+        f"{reporte['filas_validas']}/{reporte['filas_leidas']} filas válidas, "
+        f"{len(reporte['errores'])} errores, {reporte['productos']} productos, "
+        f"{reporte['filas_por_segundo']} filas/s"
+    )
+    return reporte
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Importar compras desde CSV/JSON")
+    parser.add_argument("archivo")
+    parser.add_argument("--dry-run", action="store_true", help="Validar sin escribir en la base")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    resultado = importar_compras(args.archivo, dry_run=args.dry_run, batch_size=args.batch_size)
+    for numero, mensaje in resultado["errores"]:
+        print(f"Fila {numero}: {mensaje}", file=sys.stderr)
+    print(json.dumps({k: v for k, v in resultado.items() if k != "errores"}, indent=2))
@@ -1,136 +1,189 @@
+import threading
 import pymysql
-from datetime import datetime
+from contextlib import contextmanager
+from datetime import datetime, timedelta
 from Core.logger import setup_logger
+from Core.pool import ConnectionPool, CountingDictCursor
+from Core.schema import run_migrations, load_schema_cache, schema_cache_loaded
+
+logger = setup_logger(__name__)
+
+DB_CONFIG = {
+    "host": "localhost",
+    "user": "pp",
+    "database": "pruebas",
+    "password": "1234",
+    "charset": "utf8mb4",
+    "cursorclass": CountingDictCursor,
+}
+
+POOL_CONFIG = {
+    "min_size": 1,
+    "max_size": 10,
+    "idle_timeout": 300,
+    "ping_after": 5,
+    "acquire_timeout": 10,
+}
+
+_pool = None
+_pool_lock = threading.Lock()
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+
+def get_pool():
+    """Devuelve el pool de conexiones compartido, creándolo la primera vez."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(DB_CONFIG, **POOL_CONFIG)
+                logger.info(f"Pool de conexiones creado (min={POOL_CONFIG['min_size']}, max={POOL_CONFIG['max_size']})")
+    return _pool
+
+
+def get_pool_stats():
+    """Métricas del pool (checkouts, waits, creations...) para monitoreo."""
+    if _pool is None:
+        return {}
+    return _pool.stats()
+
+
+def close_pool():
+    """Cierra el pool compartido. Se usa al salir de la aplicación."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            logger.info(f"Pool de conexiones cerrado: {_pool.stats()}")
+            _pool = None
+
+
+def init_database():
+    """
+    Prepara la base de datos una sola vez por proceso: crea el pool y aplica
+    las migraciones pendientes. Llamadas posteriores no hacen nada.
+    Devuelve True si la base quedó lista.
+    """
+    global _schema_ready
+    if _schema_ready:
+        return True
+    with _schema_lock:
+        if _schema_ready:
+            return True
+        try:
+            with get_pool().connection() as conn:
+                run_migrations(conn)
+                if not schema_cache_loaded():
+                    with conn.cursor() as cursor:
+                        load_schema_cache(cursor)
+            _schema_ready = True
+        except Exception as e:
+            logger.error(f"Error inicializando el esquema de MariaDb: {e}")
+            return _schema_ready
+    start_compras_backfill()
+    return _schema_ready
+
+
+def start_compras_backfill():
+    """
+    Completa las columnas tipadas de compras (migración 5) en un hilo aparte,
+    ya sin el lock de migraciones: una transacción por lote, así que cerrar la
+    aplicación a mitad de camino solo deshace el lote en curso. Se lanza en
+    cada arranque: si quedan filas pendientes (por ejemplo de un backfill
+    interrumpido) las retoma; si no, solo cuesta una consulta.
+    """
+    from Core.compras_backfill import backfill_compras, hay_pendientes
+
+    def run():
+        try:
+            if hay_pendientes():
+                logger.info("Hay compras sin columnas tipadas: retomando el backfill")
+                backfill_compras()
+        except Exception as e:
+            logger.error(f"Backfill de compras interrumpido, se retoma en el próximo arranque: {e}")
+
+    thread = threading.Thread(target=run, name="compras-backfill", daemon=True)
+    thread.start()
+    return thread
 
-logger = setup_logger()
 
 def get_connection():
+    """
+    Presta una conexión del pool. Al llamar a close() vuelve al pool.
+    No ejecuta DDL: el esquema se prepara una sola vez en init_database().
+    Devuelve None si no se pudo conectar.
+    """
+    if not _schema_ready and not init_database():
+        return None
     try:
-        conn = pymysql.connect(
-            host="localhost",
-            user="pp",
-            database="pruebas",
-            password="1234",
-            charset="utf8mb4",
-            cursorclass=pymysql.cursors.DictCursor,
-        )
-        # Tabla para compras 
-        with conn.cursor() as cursor:
-            sql = """
-                CREATE TABLE IF NOT EXISTS compras (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    producto VARCHAR(255) NOT NULL,
-                    cantidad VARCHAR(255) NOT NULL,
-                    unidad VARCHAR(255) NOT NULL,
-                    precio_compra DECIMAL(10,2) NOT NULL,
-                    precio_total DECIMAL(10,2) NOT NULL,
-                    proveedor VARCHAR(255) NOT NULL,
-                    tipo VARCHAR(50) NOT NULL,
-                    fecha TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """
-            cursor.execute(sql)
-            sql_inv = """
-                CREATE TABLE IF NOT EXISTS inventario (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    producto VARCHAR(100) UNIQUE NOT NULL,
-                    cantidad_stock DECIMAL(15,4) NOT NULL DEFAULT 0,
-                    unidad_base VARCHAR(20) NOT NULL,
-                    costo_promedio_ponderado DECIMAL(10,4) NOT NULL DEFAULT 0
-                )
-                """
-            cursor.execute(sql_inv)
-            sql_sub = """
-                CREATE TABLE IF NOT EXISTS subproductos (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    nombre VARCHAR(255) UNIQUE NOT NULL,
-                    costo_total_subproducto DECIMAL(10,2) NOT NULL
-                )
-                """
-            cursor.execute(sql_sub)
-            sql_ing = """
-                CREATE TABLE IF NOT EXISTS subproducto_ingredientes (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    subproducto_id INT NOT NULL,
-                    producto_ingrediente VARCHAR(255) NOT NULL,
-                    cantidad_usada DECIMAL(10,4) NOT NULL,
-                    unidad_usada VARCHAR(20) NOT NULL,
-                    FOREIGN KEY (subproducto_id) REFERENCES subproductos(id) ON DELETE CASCADE
-                )
-                """
-            cursor.execute(sql_ing)
-
-            sql_prod_final = """
-                CREATE TABLE IF NOT EXISTS productos_finales (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    nombre VARCHAR(255) UNIQUE NOT NULL,
-                    subproducto_id INT NOT NULL,
-                    unidades_producidas INT NOT NULL,
-                    FOREIGN KEY (subproducto_id) REFERENCES subproductos(id) ON DELETE CASCADE
-                )
-                """
-            cursor.execute(sql_prod_final)
-
-            # Ensure precio_venta column exists (migration-safe)
-            try:
-                cursor.execute("SHOW COLUMNS FROM productos_finales LIKE 'precio_venta'")
-                col = cursor.fetchone()
-                if not col:
-                    cursor.execute("ALTER TABLE productos_finales ADD COLUMN precio_venta DECIMAL(10,2) NULL DEFAULT NULL")
-                    logger.info("Columna 'precio_venta' agregada a 'productos_finales'")
-            except Exception as e:
-                logger.warning(f"No se pudo verificar/agregar columna 'precio_venta' en 'productos_finales': {e}")
-
-            sql_clientes = """
-                CREATE TABLE IF NOT EXISTS clientes(
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    nombre VARCHAR(255) UNIQUE NOT NULL
-                )
-                """
-            cursor.execute(sql_clientes)
-
-            # Ensure 'active' column exists in clientes (migration-safe)
-            try:
-                cursor.execute("SHOW COLUMNS FROM clientes LIKE 'active'")
-                col = cursor.fetchone()
-                if not col:
-                    # MariaDB/MySQL: add column if missing
-                    cursor.execute("ALTER TABLE clientes ADD COLUMN active TINYINT(1) NOT NULL DEFAULT 1")
-                    logger.info("Columna 'active' agregada a 'clientes'")
-            except Exception as e:
-                # If something goes wrong, log and continue. This is non-fatal.
-                logger.warning(f"No se pudo verificar/agregar columna 'active' en 'clientes': {e}")
-
-            sql_ventas = """
-                CREATE TABLE IF NOT EXISTS ventas(
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    cliente_id INT NOT NULL,
-                    producto_final_id INT NOT NULL,
-                    cantidad_vendida INT NOT NULL,
-                    precio_unitario_venta DECIMAL(10,2) NOT NULL,
-                    total_venta DECIMAL(10,2) NOT NULL,
-                    fecha_venta TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (cliente_id) REFERENCES clientes(id),
-                    FOREIGN KEY (producto_final_id) REFERENCES productos_finales(id)
-                )
-                """
-
-            conn.commit()
-            logger.info("Tables 'compras', 'inventario', 'subproductos', 'subproducto_ingredientes', 'productos_finales', 'clientes', and 'ventas' created or already exist")
-        return conn
+        return get_pool().acquire()
     except pymysql.Error as e:
         logger.error(f"Error obteniendo coneccion a MariaDb:{e}")
         return None
         
-def insert_compra(producto, cantidad, unidad, precio_compra, precio_total, proveedor, tipo):
+@contextmanager
+def transaction():
+    """
+    Unidad de trabajo: presta una conexión, entrega un cursor y hace commit
+    al salir del bloque, o rollback si hubo una excepción.
+
+        with transaction() as cursor:
+            insert_compra(..., cursor=cursor)
+            inventario.actualizar_stock_desde_compra(..., cursor=cursor)
+    """
+    conn = get_connection()
+    if not conn:
+        raise Exception("No database connection")
+    try:
+        with conn.cursor() as cursor:
+            yield cursor
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def keyset_page(rows, limit, key):
+    """
+    Arma una página de una consulta paginada por keyset pedida con LIMIT limit + 1:
+    descarta la fila extra y devuelve {"rows": [...], "next_cursor": key(última fila)
+    o None si no hay más}.
+    """
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return {"rows": rows, "next_cursor": key(rows[-1]) if has_more and rows else None}
+
+
+def insert_compra(producto, cantidad, unidad, precio_compra, precio_total, proveedor, tipo, cursor=None,
+                  cantidad_base=None, unidad_base=None, paquetes=None, peso_paquete=None):
+    """
+    Inserta una compra. Si se pasa `cursor`, se ejecuta dentro de esa
+    transacción (sin commit) y los errores se propagan; devuelve el id.
+    Las columnas tipadas (migración 5) se pueden armar con
+    Core.compras_backfill.campos_tipados.
+    """
+    sql = (
+        "INSERT INTO compras (producto, cantidad, unidad, precio_compra, precio_total, proveedor, tipo, "
+        "cantidad_base, unidad_base, paquetes, peso_paquete) "
+        "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"
+    )
+    params = (producto, cantidad, unidad, precio_compra, precio_total, proveedor, tipo,
+              cantidad_base, unidad_base, paquetes, peso_paquete)
+    if cursor is not None:
+        cursor.execute(sql, params)
+        return cursor.lastrowid
+
     conn = get_connection()
     if conn:
         try:
             with conn.cursor() as cursor:
-                sql = "INSERT INTO compras (producto, cantidad, unidad, precio_compra, precio_total, proveedor, tipo) VALUES (%s, %s, %s, %s, %s, %s, %s)"
-                cursor.execute(sql, (producto, cantidad, unidad, precio_compra, precio_total, proveedor, tipo))
+                cursor.execute(sql, params)
                 conn.commit()
                 logger.info(f"Inserted purchase: {producto}")
+                return cursor.lastrowid
         except Exception as e:
             logger.error(f"Error inserting purchase: {e}")
         finally:
@@ -150,7 +203,63 @@ def get_compras():
     return []
 
 
+COLUMNAS_HISTORIAL_COMPRAS = "id, producto, cantidad, unidad, precio_compra, precio_total, proveedor, tipo, fecha"
 
 
+def get_compra(compra_id, cursor=None):
+    """Una compra por id con las columnas del historial (None si no existe)."""
+    sql = f"SELECT {COLUMNAS_HISTORIAL_COMPRAS} FROM compras WHERE id = %s"
+    if cursor is not None:
+        cursor.execute(sql, (compra_id,))
+        return cursor.fetchone()
+    with transaction() as cursor:
+        cursor.execute(sql, (compra_id,))
+        return cursor.fetchone()
 
 
+def compras_page_query(after=None, limit=200, producto=None, proveedor=None, desde=None, hasta=None):
+    """(sql, params) de una página del historial de compras. Ver get_compras_page."""
+    where, params = [], []
+    if after is not None:
+        where.append("(fecha < %s OR (fecha = %s AND id < %s))")
+        params.extend((after[0], after[0], after[1]))
+    if producto:
+        where.append("producto = %s")
+        params.append(producto)
+    if proveedor:
+        where.append("proveedor = %s")
+        params.append(proveedor)
+    if desde is not None:
+        where.append("fecha >= %s")
+        params.append(desde)
+    if hasta is not None:
+        where.append("fecha < %s")
+        params.append(hasta + timedelta(days=1))
+    params.append(limit + 1)
+    where_sql = ("WHERE " + " AND ".join(where)) if where else ""
+    sql = f"SELECT {COLUMNAS_HISTORIAL_COMPRAS} FROM compras {where_sql} ORDER BY fecha DESC, id DESC LIMIT %s"
+    return sql, params
+
+
+def get_compras_page(after=None, limit=200, producto=None, proveedor=None, desde=None, hasta=None):
+    """
+    Una página del historial de compras, de la más nueva a la más vieja,
+    paginada por keyset sobre (fecha, id).
+
+    after: next_cursor de la página anterior (None para la primera)
+    producto / proveedor: filtros por nombre exacto
+    desde / hasta: rango de fechas (datetime.date), ambos inclusive
+    Devuelve {"rows": [...], "next_cursor": (fecha, id) o None}
+    """
+    sql, params = compras_page_query(after, limit, producto, proveedor, desde, hasta)
+    conn = get_connection()
+    if conn:
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(sql, params)
+                return keyset_page(cursor.fetchall(), limit, lambda r: (r["fecha"], r["id"]))
+        except Exception as e:
+            logger.error(f"Error retrieving purchases page: {e}")
+        finally:
+            conn.close()
+    return {"rows": [], "next_cursor": None}
@@ -1,105 +1,236 @@
 # Codigo 1 backend de la ui (refactorizado)
 
-from Core.database import get_connection
-from Core.logger import setup_logger
-from Core.units import convert_to_base, convert_from_base, CONVERSIONS
+from Core.database import get_connection, transaction
+from Core.logger import setup_logger, traced
+from Core.units import convert_to_base, convert_from_base, base_unit_of
+from Core.money import money, qty, to_decimal, to_base_quantity, unit_cost
+
+def clave_producto(nombre):
+    """
+    Clave para comparar nombres de producto en Python igual que la base:
+    `inventario.producto` usa una collation sin distinción de mayúsculas y
+    PAD SPACE, así que "Harina" y "harina " son la misma fila en un IN.
+    """
+    return str(nombre).strip().casefold()
+
+
+class StockInsuficienteError(ValueError):
+    """Uno o más productos no alcanzan para un consumo. `faltantes` tiene todos los problemas."""
+
+    def __init__(self, faltantes):
+        self.faltantes = faltantes
+        super().__init__("No se puede consumir el stock:\n" + "\n".join(faltantes))
+
 
 class InventarioBackend:
     def __init__(self):
-        self.database = get_connection()
-        self.logger = setup_logger()
+        self.logger = setup_logger(__name__)
         self.logger.info("InventarioBackend initialized")
 
     def _get_unidad_base(self, unidad):
         """Determina la unidad base a partir de una unidad dada."""
-        unidad = unidad.lower()
-        for category, units in CONVERSIONS.items():
-            if unidad in units:
-                if category == 'weight': return 'g'
-                if category == 'volume': return 'ml'
-                if category == 'count': return 'unit'
-        return None
-
-    def actualizar_stock_desde_compra(self, producto, cantidad, unidad, precio_total):
-        """Añade stock al inventario y recalcula el costo promedio."""
-        conn = get_connection()
-        if not conn: return
+        return base_unit_of(unidad)
+
+    # Upsert atómico: MariaDB/MySQL evalúa las asignaciones de izquierda a derecha,
+    # así que el costo promedio se calcula con el stock anterior a la suma.
+    # Los parámetros van como Decimal para que la cuenta sea DECIMAL y no DOUBLE
+    # (mismo redondeo que Core.money.weighted_average_cost).
+    SQL_ENTRADA_STOCK = """
+        INSERT INTO inventario (producto, cantidad_stock, unidad_base, costo_promedio_ponderado)
+        VALUES (%s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            costo_promedio_ponderado = (cantidad_stock * costo_promedio_ponderado + %s) / (cantidad_stock + %s),
+            cantidad_stock = cantidad_stock + %s
+    """
+
+    def _params_entrada_stock(self, producto, cantidad, unidad, precio_total):
+        """Valida una entrada de stock y arma los parámetros de SQL_ENTRADA_STOCK."""
+        unidad_base = self._get_unidad_base(unidad)
+        if not unidad_base:
+            raise ValueError(f"Unidad '{unidad}' no reconocida.")
+
+        cantidad_base = qty(to_base_quantity(cantidad, unidad))
+        if cantidad_base <= 0:
+            raise ValueError("No se pudo convertir la cantidad a la unidad base.")
+
+        precio_total = money(precio_total)
+        costo_unitario_base = unit_cost(precio_total, cantidad_base)
+        return (producto, cantidad_base, unidad_base, costo_unitario_base,
+                precio_total, cantidad_base, cantidad_base)
+
+    @traced("inventario.actualizar_stock_desde_compra", ids=("producto",))
+    def actualizar_stock_desde_compra(self, producto, cantidad, unidad, precio_total, cursor=None):
+        """
+        Añade stock al inventario y recalcula el costo promedio ponderado.
+
+        Si se pasa `cursor`, la actualización forma parte de esa transacción
+        (ver Core.database.transaction). Lanza ValueError si los datos no son válidos.
+        """
+        params = self._params_entrada_stock(producto, cantidad, unidad, precio_total)
+        if cursor is not None:
+            cursor.execute(self.SQL_ENTRADA_STOCK, params)
+            self.logger.info(f"Updated stock for {producto}: +{params[1]} {params[2]}")
+            return
+
         try:
-            with conn.cursor() as cursor:
-                unidad_base = self._get_unidad_base(unidad)
-                if not unidad_base:
-                    raise ValueError(f"Unidad '{unidad}' no reconocida.")
-
-                cantidad_base, _ = convert_to_base(float(cantidad), unidad)
-                if not cantidad_base:
-                    raise ValueError("No se pudo convertir la cantidad a la unidad base.")
-
-                # Verificar si el producto ya existe
-                cursor.execute("SELECT cantidad_stock, costo_promedio_ponderado FROM inventario WHERE producto = %s", (producto,))
-                result = cursor.fetchone()
-
-                if result:
-                    # Producto existe: actualizar stock y costo promedio
-                    stock_actual, costo_actual = float(result['cantidad_stock']), float(result['costo_promedio_ponderado'])
-                    nuevo_stock = stock_actual + cantidad_base
-                    # Fórmula del costo promedio ponderado
-                    nuevo_costo_promedio = ((stock_actual * costo_actual) + precio_total) / nuevo_stock
-                    cursor.execute(
-                        "UPDATE inventario SET cantidad_stock = %s, costo_promedio_ponderado = %s WHERE producto = %s",
-                        (nuevo_stock, nuevo_costo_promedio, producto)
-                    )
-                    self.logger.info(f"Updated stock for {producto}: +{cantidad_base} {unidad_base}, new total: {nuevo_stock}")
-                else:
-                    # Producto no existe: insertar nuevo
-                    costo_unitario_base = precio_total / cantidad_base
-                    cursor.execute(
-                        "INSERT INTO inventario (producto, cantidad_stock, unidad_base, costo_promedio_ponderado) VALUES (%s, %s, %s, %s)",
-                        (producto, cantidad_base, unidad_base, costo_unitario_base)
-                    )
-                    self.logger.info(f"Inserted new product in inventory: {producto}")
-
-            conn.commit()
+            with transaction() as cursor:
+                cursor.execute(self.SQL_ENTRADA_STOCK, params)
+            self.logger.info(f"Updated stock for {producto}: +{params[1]} {params[2]}")
         except Exception as e:
             self.logger.error(f"Error updating stock from purchase: {e}")
-            conn.rollback()
-        finally:
-            conn.close()
+            raise
+
+    def _descontar_stock(self, cursor, producto, cantidad_base, unidad_base):
+        """
+        Descuenta stock con un UPDATE condicional atómico: la base solo resta
+        si alcanza, así dos terminales consumiendo a la vez no pisan sus cambios.
+        """
+        cantidad_base = qty(cantidad_base)
+        if cantidad_base < 0:
+            raise ValueError(f"La cantidad a consumir de '{producto}' no puede ser negativa.")
+        if cantidad_base == 0:
+            # Nada que descontar. Además pymysql no usa CLIENT.FOUND_ROWS: un
+            # UPDATE que no cambia el valor da rowcount 0 y parecería un faltante.
+            return
+        cursor.execute(
+            "UPDATE inventario SET cantidad_stock = cantidad_stock - %s "
+            "WHERE producto = %s AND unidad_base = %s AND cantidad_stock >= %s",
+            (cantidad_base, producto, unidad_base, cantidad_base)
+        )
+        if cursor.rowcount == 1:
+            return
+
+        # No se actualizó nada: averiguar por qué para dar un error claro
+        cursor.execute("SELECT cantidad_stock, unidad_base FROM inventario WHERE producto = %s", (producto,))
+        result = cursor.fetchone()
+        if not result:
+            raise ValueError(f"El producto '{producto}' no existe en el inventario.")
+        stock_actual_base, unidad_base_db = to_decimal(result['cantidad_stock']), result['unidad_base']
+        if unidad_base_db != unidad_base:
+            raise ValueError(f"No se puede consumir '{producto}' en {unidad_base}: el inventario está en {unidad_base_db}")
+        raise ValueError(f"Stock insuficiente para '{producto}'. Disponible: {stock_actual_base:.2f} {unidad_base_db}, Requerido: {cantidad_base:.2f} {unidad_base_db}")
+
+    @traced("inventario.consumir_stock", ids=("producto",))
+    def consumir_stock(self, producto, cantidad_a_consumir, unidad_consumo, cursor=None):
+        """
+        Reduce el stock de un producto. Lanza un error si no hay suficiente
+        o si la cantidad es negativa; una cantidad 0 (también tras redondear a
+        4 decimales) no descuenta nada.
+        Si se pasa `cursor`, el descuento forma parte de esa transacción.
+        """
+        # Convertir la cantidad a consumir a la unidad base
+        cantidad_base_a_consumir = to_base_quantity(cantidad_a_consumir, unidad_consumo)
+        unidad_base = base_unit_of(unidad_consumo)
+        if cantidad_base_a_consumir is None:
+            raise ValueError(f"No se pudo convertir la cantidad de consumo '{cantidad_a_consumir} {unidad_consumo}'")
+
+        if cursor is not None:
+            self._descontar_stock(cursor, producto, cantidad_base_a_consumir, unidad_base)
+            return
 
-    def consumir_stock(self, producto, cantidad_a_consumir, unidad_consumo):
-        """Reduce el stock de un producto. Lanza un error si no hay suficiente."""
-        conn = get_connection()
-        if not conn: return
         try:
-            with conn.cursor() as cursor:
-                # Obtener stock actual
-                cursor.execute("SELECT cantidad_stock, unidad_base FROM inventario WHERE producto = %s", (producto,))
-                result = cursor.fetchone()
-                if not result:
-                    raise ValueError(f"El producto '{producto}' no existe en el inventario.")
-
-                stock_actual_base, unidad_base_db = float(result['cantidad_stock']), result['unidad_base']
-
-                # Convertir la cantidad a consumir a la unidad base de la DB
-                cantidad_base_a_consumir, _ = convert_to_base(float(cantidad_a_consumir), unidad_consumo)
-                if not cantidad_base_a_consumir:
-                    raise ValueError(f"No se pudo convertir la cantidad de consumo '{cantidad_a_consumir} {unidad_consumo}'")
-
-                if stock_actual_base < cantidad_base_a_consumir:
-                    raise ValueError(f"Stock insuficiente para '{producto}'. Disponible: {stock_actual_base:.2f} {unidad_base_db}, Requerido: {cantidad_base_a_consumir:.2f} {unidad_base_db}")
-
-                # Actualizar stock
-                nuevo_stock = stock_actual_base - cantidad_base_a_consumir
-                cursor.execute("UPDATE inventario SET cantidad_stock = %s WHERE producto = %s", (nuevo_stock, producto))
-            conn.commit()
+            with transaction() as cursor:
+                self._descontar_stock(cursor, producto, cantidad_base_a_consumir, unidad_base)
         except Exception as e:
             self.logger.error(f"Error consumiendo stock: {e}")
-            conn.rollback()
             raise
-        finally:
-            conn.close()
+
+    @traced("inventario.consumir_stock_lote", ids=("consumos",))
+    def consumir_stock_lote(self, consumos, cursor=None):
+        """
+        Consume varios productos de una vez, todo o nada.
+
+        Bloquea todas las filas necesarias con una sola consulta FOR UPDATE,
+        valida todos los faltantes juntos (StockInsuficienteError los lista
+        todos) y aplica los descuentos con un único UPDATE. Las cantidades
+        negativas son un error; los productos cuyo total redondeado es 0 no
+        se tocan.
+
+        Args:
+            consumos: Lista de dicts con 'producto', 'cantidad', 'unidad'
+            cursor: Cursor de una transacción abierta (opcional)
+        """
+        if cursor is None:
+            try:
+                with transaction() as cursor:
+                    return self.consumir_stock_lote(consumos, cursor=cursor)
+            except Exception as e:
+                self.logger.error(f"Error consumiendo stock en lote: {e}")
+                raise
+
+        faltantes = []
+        # clave_producto -> [cantidad_base total, unidad_base, nombre pedido]
+        requeridos = {}
+        nombres = set()
+        for c in consumos:
+            cantidad_base = to_base_quantity(c['cantidad'], c['unidad'])
+            unidad_base = base_unit_of(c['unidad'])
+            if cantidad_base is None:
+                faltantes.append(f"No se pudo convertir la cantidad de consumo '{c['cantidad']} {c['unidad']}' de '{c['producto']}'")
+                continue
+            if cantidad_base < 0:
+                faltantes.append(f"La cantidad a consumir de '{c['producto']}' no puede ser negativa ({c['cantidad']} {c['unidad']})")
+                continue
+            nombres.add(c['producto'])
+            clave = clave_producto(c['producto'])
+            actual = requeridos.get(clave)
+            if actual and actual[1] != unidad_base:
+                faltantes.append(f"'{c['producto']}' se pide en unidades incompatibles ({actual[1]} y {unidad_base})")
+            elif actual:
+                actual[0] += cantidad_base
+            else:
+                requeridos[clave] = [cantidad_base, unidad_base, c['producto']]
+
+        # Un total que redondea a 0 no descuenta nada (y no necesita fila)
+        requeridos = {clave: r for clave, r in requeridos.items() if qty(r[0]) > 0}
+        nombres = {n for n in nombres if clave_producto(n) in requeridos}
+
+        if not requeridos:
+            if faltantes:
+                raise StockInsuficienteError(faltantes)
+            return
+
+        nombres = sorted(nombres)
+        placeholders = ", ".join(["%s"] * len(nombres))
+        cursor.execute(
+            f"SELECT producto, cantidad_stock, unidad_base FROM inventario "
+            f"WHERE producto IN ({placeholders}) ORDER BY producto FOR UPDATE",
+            nombres
+        )
+        # Misma comparación que hizo el IN (ver clave_producto)
+        stock = {clave_producto(r['producto']): r for r in cursor.fetchall()}
+
+        for clave in sorted(requeridos):
+            cantidad_base, unidad_base, producto = requeridos[clave]
+            row = stock.get(clave)
+            if not row:
+                faltantes.append(f"El producto '{producto}' no existe en el inventario.")
+            elif row['unidad_base'] != unidad_base:
+                faltantes.append(f"No se puede consumir '{producto}' en {unidad_base}: el inventario está en {row['unidad_base']}")
+            elif to_decimal(row['cantidad_stock']) < cantidad_base:
+                faltantes.append(f"Stock insuficiente para '{producto}'. Disponible: {to_decimal(row['cantidad_stock']):.2f} {unidad_base}, Requerido: {cantidad_base:.2f} {unidad_base}")
+        if faltantes:
+            raise StockInsuficienteError(faltantes)
+
+        # Filas ya bloqueadas: un solo UPDATE con CASE para todos los productos,
+        # usando el nombre tal como está guardado
+        productos = [stock[clave]['producto'] for clave in sorted(requeridos)]
+        placeholders = ", ".join(["%s"] * len(productos))
+        casos = " ".join(["WHEN %s THEN %s"] * len(productos))
+        params = []
+        for clave, producto in zip(sorted(requeridos), productos):
+            params.extend((producto, qty(requeridos[clave][0])))
+        params.extend(productos)
+        cursor.execute(
+            f"UPDATE inventario SET cantidad_stock = cantidad_stock - CASE producto {casos} END "
+            f"WHERE producto IN ({placeholders})",
+            params
+        )
+        self.logger.info(f"Stock consumido en lote: {len(productos)} productos")
 
     # Core/inventario_backend.py (continuation)
 
+    @traced("inventario.get_inventario_para_resumen")
     def get_inventario_para_resumen(self):
         """
         Fetches all items from the inventory table, ready for display.
@@ -135,8 +266,8 @@ class InventarioBackend:
                     # You can add more rules here for other units if needed
 
                     # --- Calculate Display Values ---
-                    # The total value of the stock for this item
-                    total_valor = cantidad_base * costo_por_base
+                    # The total value of the stock for this item (Decimal exacto, a centavos)
+                    total_valor = money(to_decimal(item['cantidad_stock']) * to_decimal(item['costo_promedio_ponderado']))
 
                     # The cost per base unit (e.g., cost per g)
                     costo_por_display_unidad = costo_por_base
@@ -1,33 +1,255 @@
+import atexit
+import functools
+import inspect
+import json
 import logging
+import logging.handlers
 import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
 
+LOGGER_NAME = "economia_app"
+LOG_DIR = "logs"
+LOG_FILE = os.path.join(LOG_DIR, "app.log")
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
 
-def setup_logger():
+# Nivel general y niveles por módulo. Se pueden sobreescribir con variables de entorno:
+#   ECONOMIA_LOG_LEVEL=DEBUG
+#   ECONOMIA_LOG_LEVELS="Core.units=WARNING,Core.database=DEBUG"
+DEFAULT_LEVEL = os.environ.get("ECONOMIA_LOG_LEVEL", "INFO").upper()
+MODULE_LEVELS = {}
+
+# Log estructurado de eventos (JSON lines), apagado por defecto:
+#   ECONOMIA_EVENT_LOG=1  o  enable_event_log()
+EVENT_LOG_FILE = os.path.join(LOG_DIR, "events.jsonl")
+EVENT_LOGGER_NAME = f"{LOGGER_NAME}.events"
+
+_listener = None
+_event_listener = None
+_configure_lock = threading.Lock()
+_tls = threading.local()
+
+
+class _AsyncQueueHandler(logging.handlers.QueueHandler):
     """
-    Sets up a detailed logger for the application.
-    Logs to console and file with timestamps, levels, and messages.
+    QueueHandler que encola el record sin formatearlo: el formateo y la
+    escritura a consola/archivo los hace el hilo del QueueListener, no el
+    hilo que loguea (normalmente el de Tk).
     """
-    logger = logging.getLogger("economia_app")
-    logger.setLevel(logging.DEBUG)  # Set to DEBUG for detailed logging
 
-    # Create logs directory if it doesn't exist
-    if not os.path.exists("logs"):
-        os.makedirs("logs")
+    def prepare(self, record):
+        return record
+
+
+def _parse_module_levels(value):
+    levels = {}
+    for item in value.split(","):
+        if "=" in item:
+            name, level = item.split("=", 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def _configure():
+    """Configura una sola vez el logger raíz de la app con la cola y el listener."""
+    global _listener
+    if _listener is not None:
+        return
+    with _configure_lock:
+        if _listener is not None:
+            return
+
+        if not os.path.exists(LOG_DIR):
+            os.makedirs(LOG_DIR)
+
+        formatter = logging.Formatter(LOG_FORMAT)
+
+        # Console handler
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(formatter)
+
+        # File handler (rota para que app.log no crezca sin límite)
+        file_handler = logging.handlers.RotatingFileHandler(
+            LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="utf-8"
+        )
+        file_handler.setFormatter(formatter)
+
+        log_queue = queue.SimpleQueue()
+        logger = logging.getLogger(LOGGER_NAME)
+        logger.setLevel(DEFAULT_LEVEL)
+        logger.propagate = False
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+        logger.addHandler(_AsyncQueueHandler(log_queue))
+
+        MODULE_LEVELS.update(_parse_module_levels(os.environ.get("ECONOMIA_LOG_LEVELS", "")))
+        for name, level in MODULE_LEVELS.items():
+            logging.getLogger(f"{LOGGER_NAME}.{name}").setLevel(level)
+
+        _listener = logging.handlers.QueueListener(
+            log_queue, console_handler, file_handler, respect_handler_level=True
+        )
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+
+def setup_logger(name=None):
+    """
+    Devuelve el logger de la aplicación (o el hijo `economia_app.<name>`).
+
+    Es idempotente: los handlers se configuran una sola vez por proceso,
+    así que se puede llamar desde cada módulo y cada frame sin duplicar líneas.
+    Los mensajes pasan por una cola y se escriben en un hilo aparte.
+    """
+    _configure()
+    if name:
+        return logging.getLogger(f"{LOGGER_NAME}.{name}")
+    return logging.getLogger(LOGGER_NAME)
+
+
+def set_module_level(name, level):
+    """Cambia en caliente el nivel de log de un módulo (p. ej. 'Core.units')."""
+    _configure()
+    MODULE_LEVELS[name] = str(level).upper()
+    logging.getLogger(f"{LOGGER_NAME}.{name}").setLevel(MODULE_LEVELS[name])
+
+
+def shutdown_logging():
+    """Vacía la cola y detiene el hilo de logging."""
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+# ===== EVENTOS ESTRUCTURADOS =====
+
+class JsonLineFormatter(logging.Formatter):
+    """Formatea un evento como una línea JSON."""
+
+    def format(self, record):
+        event = {"ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds")}
+        event.update(getattr(record, "event", {}))
+        return json.dumps(event, ensure_ascii=False, default=str)
+
+
+def event_log_enabled():
+    return _event_listener is not None
+
+
+def enable_event_log(path=None):
+    """Activa el log de eventos JSON (una línea por operación de backend)."""
+    global _event_listener
+    with _configure_lock:
+        if _event_listener is not None:
+            return
+        path = path or EVENT_LOG_FILE
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="utf-8"
+        )
+        handler.setFormatter(JsonLineFormatter())
+        event_queue = queue.SimpleQueue()
+        event_logger = logging.getLogger(EVENT_LOGGER_NAME)
+        event_logger.setLevel(logging.INFO)
+        event_logger.propagate = False
+        for old in list(event_logger.handlers):
+            event_logger.removeHandler(old)
+        event_logger.addHandler(_AsyncQueueHandler(event_queue))
+        _event_listener = logging.handlers.QueueListener(event_queue, handler)
+        _event_listener.start()
+        atexit.register(disable_event_log)
+
+
+def disable_event_log():
+    """Apaga el log de eventos y vacía lo pendiente."""
+    global _event_listener
+    with _configure_lock:
+        if _event_listener is not None:
+            _event_listener.stop()
+            _event_listener = None
+
+
+def count_round_trip():
+    """Registra un viaje a la base en el hilo actual (lo llama el cursor del pool)."""
+    _tls.round_trips = getattr(_tls, "round_trips", 0) + 1
+
+
+def round_trips():
+    """Viajes a la base hechos por el hilo actual desde que arrancó el proceso."""
+    return getattr(_tls, "round_trips", 0)
+
+
+def log_event(operation, **fields):
+    """Emite un evento estructurado si el log de eventos está activo."""
+    if _event_listener is None:
+        return
+    event = {"operation": operation}
+    event.update(fields)
+    logging.getLogger(EVENT_LOGGER_NAME).info(operation, extra={"event": event})
+
+
+@contextmanager
+def timed_operation(operation, **fields):
+    """
+    Mide una operación y emite su evento al terminar:
+    operation, status, elapsed_ms, db_round_trips y los campos agregados.
+
+        with timed_operation("ventas.crear_venta_multiple", cliente_id=5) as ev:
+            ...
+            ev["rows"] = len(items)
+    """
+    event = dict(fields)
+    start_trips = round_trips()
+    start = time.perf_counter()
+    try:
+        yield event
+        event.setdefault("status", "ok")
+    except Exception as e:
+        event["status"] = "error"
+        event["error"] = str(e)
+        raise
+    finally:
+        event["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        event["db_round_trips"] = round_trips() - start_trips
+        log_event(operation, **event)
+
+
+def traced(operation, ids=()):
+    """
+    Decorador para métodos de backend: emite un evento por llamada con los
+    argumentos listados en `ids` (las listas se registran por su tamaño) y,
+    si el resultado es una lista, su tamaño como `rows`. Si el log de eventos está apagado solo cuesta un if.
+    """
+    def decorator(fn):
+        signature = inspect.signature(fn)
 
-    # Console handler
-    console_handler = logging.StreamHandler()
-    console_formatter = logging.Formatter(
-        "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-    )
-    console_handler.setFormatter(console_formatter)
-    logger.addHandler(console_handler)
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _event_listener is None:
+                return fn(*args, **kwargs)
+            fields = {}
+            if ids:
+                bound = signature.bind_partial(*args, **kwargs).arguments
+                for name in ids:
+                    value = bound.get(name)
+                    fields[name] = len(value) if isinstance(value, (list, tuple)) else value
+            with timed_operation(operation, **fields) as event:
+                result = fn(*args, **kwargs)
+                if isinstance(result, (list, tuple)):
+                    event["rows"] = len(result)
+                return result
+        return wrapper
+    return decorator
 
-    # File handler
-    file_handler = logging.FileHandler("logs/app.log")
-    file_formatter = logging.Formatter(
-        "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-    )
-    file_handler.setFormatter(file_formatter)
-    logger.addHandler(file_handler)
 
-    return logger
+if os.environ.get("ECONOMIA_EVENT_LOG") == "1":
+    enable_event_log()
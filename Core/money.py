@@ -0,0 +1,104 @@
+"""
+Dinero y cantidades con Decimal exacto.
+
+Los backends calculaban importes con float y los guardaban en columnas
+DECIMAL, así que el costo promedio ponderado se iba corriendo compra tras
+compra. Este módulo centraliza la aritmética con Decimal y las reglas de
+redondeo de cada tipo de columna:
+
+    money -> DECIMAL(10,2)   precios y totales
+    cost  -> DECIMAL(10,4)   costo por unidad base (costo_promedio_ponderado)
+    qty   -> DECIMAL(15,4)   cantidades en unidad base (cantidad_stock)
+
+Los valores se pasan a pymysql como Decimal, que los envía como literales
+exactos (los float se envían como DOUBLE y la base opera en coma flotante).
+"""
+
+from decimal import Decimal, Context, InvalidOperation, ROUND_HALF_UP
+
+from Core.units import lookup_unit
+
+# Mismo redondeo que aplica MariaDB/MySQL al guardar en una columna DECIMAL
+CONTEXT = Context(prec=28, rounding=ROUND_HALF_UP)
+
+MONEY = Decimal("0.01")
+COST = Decimal("0.0001")
+QTY = Decimal("0.0001")
+ZERO = Decimal(0)
+
+QUANTUMS = {"money": MONEY, "cost": COST, "qty": QTY}
+
+
+def to_decimal(value):
+    """
+    Convierte a Decimal sin pasar por la representación binaria del float
+    (0.1 -> Decimal('0.1')). Lanza ValueError si el valor no es numérico.
+    """
+    kind = type(value)
+    if kind is Decimal:
+        return value
+    if kind is int:
+        return Decimal(value)
+    if kind is float:
+        return Decimal(repr(value))
+    if value is None:
+        raise ValueError("Valor numérico vacío")
+    try:
+        return Decimal(str(value).strip())
+    except InvalidOperation:
+        raise ValueError(f"Valor numérico inválido: '{value}'")
+
+
+def quantize(value, kind):
+    """Redondea `value` a la escala de columna `kind` ('money', 'cost' o 'qty')."""
+    return to_decimal(value).quantize(QUANTUMS[kind], context=CONTEXT)
+
+
+def money(value):
+    """Importe a centavos (DECIMAL(10,2))."""
+    return to_decimal(value).quantize(MONEY, context=CONTEXT)
+
+
+def cost(value):
+    """Costo por unidad base a 4 decimales (DECIMAL(10,4))."""
+    return to_decimal(value).quantize(COST, context=CONTEXT)
+
+
+def qty(value):
+    """Cantidad en unidad base a 4 decimales (DECIMAL(15,4))."""
+    return to_decimal(value).quantize(QTY, context=CONTEXT)
+
+
+def line_total(cantidad, precio_unitario):
+    """Subtotal de una línea (cantidad x precio) redondeado a centavos."""
+    return CONTEXT.multiply(to_decimal(cantidad), to_decimal(precio_unitario)).quantize(MONEY, context=CONTEXT)
+
+
+def unit_cost(precio_total, cantidad):
+    """Costo por unidad (precio_total / cantidad) a 4 decimales."""
+    return CONTEXT.divide(to_decimal(precio_total), to_decimal(cantidad)).quantize(COST, context=CONTEXT)
+
+
+def weighted_average_cost(stock, costo_promedio, cantidad_entrada, precio_total):
+    """
+    Nuevo costo promedio ponderado tras una entrada de stock, con el mismo
+    redondeo que el upsert de InventarioBackend.SQL_ENTRADA_STOCK.
+    """
+    stock = to_decimal(stock)
+    cantidad_entrada = to_decimal(cantidad_entrada)
+    total = stock + cantidad_entrada
+    if total <= 0:
+        return ZERO.quantize(COST)
+    valor = CONTEXT.fma(stock, to_decimal(costo_promedio), to_decimal(precio_total))
+    return CONTEXT.divide(valor, total).quantize(COST, context=CONTEXT)
+
+
+def to_base_quantity(cantidad, unidad):
+    """Cantidad convertida a la unidad base como Decimal exacto (None si la unidad no existe)."""
+    entry = lookup_unit(unidad)
+    if entry is None:
+        return None
+    factor = entry[0]
+    if factor == 1:
+        return to_decimal(cantidad)
+    return CONTEXT.multiply(to_decimal(cantidad), to_decimal(factor))
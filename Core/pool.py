@@ -0,0 +1,251 @@
+"""
+Pool de conexiones a MariaDB/MySQL.
+
+Mantiene un conjunto acotado de conexiones pymysql abiertas para que los
+backends no paguen el handshake TCP + autenticación en cada consulta.
+"""
+
+import threading
+import time
+from collections import deque
+
+import pymysql
+
+from Core.logger import setup_logger, count_round_trip
+
+logger = setup_logger(__name__)
+
+
+class PoolTimeoutError(pymysql.OperationalError):
+    """No se pudo obtener una conexión del pool dentro del tiempo de espera."""
+
+
+class CountingDictCursor(pymysql.cursors.DictCursor):
+    """DictCursor que cuenta cada consulta enviada al servidor (ver Core.logger.round_trips)."""
+
+    def _query(self, q):
+        count_round_trip()
+        return super()._query(q)
+
+
+class PooledConnection:
+    """
+    Envoltorio de una conexión pymysql prestada por el pool.
+
+    Se comporta como la conexión original (cursor, commit, rollback...),
+    pero close() la devuelve al pool en lugar de cerrar el socket, así que
+    el patrón `conn = get_connection() ... finally: conn.close()` de los
+    backends sigue funcionando sin cambios.
+    """
+
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+        self._released = False
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def commit(self):
+        count_round_trip()
+        self._raw.commit()
+
+    def close(self):
+        if not self._released:
+            self._released = True
+            self._pool.release(self._raw)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class ConnectionPool:
+    """
+    Pool de conexiones thread-safe.
+
+    Args:
+        connect_kwargs: Parámetros para pymysql.connect
+        min_size: Conexiones que se mantienen abiertas aunque estén ociosas
+        max_size: Máximo de conexiones abiertas a la vez
+        idle_timeout: Segundos tras los cuales una conexión ociosa se cierra
+                      (solo por encima de min_size)
+        ping_after: Segundos de inactividad tras los cuales se hace ping
+                    antes de prestar la conexión
+        acquire_timeout: Segundos máximos esperando una conexión libre
+    """
+
+    def __init__(self, connect_kwargs, min_size=1, max_size=10, idle_timeout=300,
+                 ping_after=5, acquire_timeout=10):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("Tamaños de pool inválidos")
+        self.connect_kwargs = dict(connect_kwargs)
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.ping_after = ping_after
+        self.acquire_timeout = acquire_timeout
+
+        self._lock = threading.Condition()
+        self._idle = deque()  # (raw_conn, last_used)
+        self._size = 0
+        self._closed = False
+        self._stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "creations": 0,
+            "closed": 0,
+            "failed_pings": 0,
+            "timeouts": 0,
+        }
+
+    # ===== CICLO DE VIDA =====
+
+    def _create(self):
+        raw = pymysql.connect(**self.connect_kwargs)
+        with self._lock:
+            self._stats["creations"] += 1
+        return raw
+
+    def _discard(self, raw):
+        """Cierra una conexión física y libera su hueco en el pool."""
+        try:
+            raw.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._size -= 1
+            self._stats["closed"] += 1
+            self._lock.notify()
+
+    def _prune_idle(self, now):
+        """Quita conexiones ociosas vencidas. Debe llamarse con el lock tomado."""
+        expired = []
+        while len(self._idle) > 0 and self._size - len(expired) > self.min_size:
+            raw, last_used = self._idle[0]
+            if now - last_used < self.idle_timeout:
+                break
+            self._idle.popleft()
+            expired.append(raw)
+        return expired
+
+    def acquire(self, timeout=None):
+        """Presta una conexión. Lanza PoolTimeoutError si el pool está agotado."""
+        timeout = self.acquire_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        waited = False
+
+        while True:
+            raw = None
+            last_used = None
+            create = False
+            with self._lock:
+                if self._closed:
+                    raise pymysql.OperationalError("El pool de conexiones está cerrado")
+                expired = self._prune_idle(time.monotonic())
+                if self._idle:
+                    # LIFO: la conexión más reciente es la que menos probable está caída
+                    raw, last_used = self._idle.pop()
+                elif self._size < self.max_size:
+                    self._size += 1
+                    create = True
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolTimeoutError(
+                            f"Pool agotado: {self.max_size} conexiones en uso"
+                        )
+                    if not waited:
+                        self._stats["waits"] += 1
+                        waited = True
+                    self._lock.wait(remaining)
+                    continue
+
+            for old in expired:
+                self._discard(old)
+
+            if create:
+                try:
+                    raw = self._create()
+                except Exception:
+                    with self._lock:
+                        self._size -= 1
+                        self._lock.notify()
+                    raise
+            elif time.monotonic() - last_used >= self.ping_after:
+                try:
+                    raw.ping(reconnect=False)
+                except Exception as e:
+                    logger.warning(f"Conexión del pool descartada tras ping fallido: {e}")
+                    with self._lock:
+                        self._stats["failed_pings"] += 1
+                    self._discard(raw)
+                    continue
+
+            with self._lock:
+                self._stats["checkouts"] += 1
+            return PooledConnection(self, raw)
+
+    def release(self, raw):
+        """Devuelve una conexión al pool, descartando cualquier transacción abierta."""
+        try:
+            # Sin autocommit, hasta un SELECT deja abierta una transacción cuya
+            # instantánea vería datos viejos en el siguiente préstamo.
+            raw.rollback()
+        except Exception as e:
+            logger.warning(f"Conexión del pool descartada al devolverla: {e}")
+            self._discard(raw)
+            return
+        with self._lock:
+            if not self._closed:
+                self._idle.append((raw, time.monotonic()))
+                self._lock.notify()
+                return
+        self._discard(raw)
+
+    def warmup(self):
+        """Abre conexiones hasta llegar a min_size."""
+        while True:
+            with self._lock:
+                if self._closed or self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                raw = self._create()
+            except Exception:
+                with self._lock:
+                    self._size -= 1
+                raise
+            with self._lock:
+                self._idle.append((raw, time.monotonic()))
+                self._lock.notify()
+
+    def connection(self, timeout=None):
+        """Atajo para usar el pool como context manager: `with pool.connection() as conn:`."""
+        return self.acquire(timeout)
+
+    def close(self):
+        """Cierra todas las conexiones ociosas y rechaza nuevos préstamos."""
+        with self._lock:
+            self._closed = True
+            idle = [raw for raw, _ in self._idle]
+            self._idle.clear()
+        for raw in idle:
+            self._discard(raw)
+
+    # ===== MONITOREO =====
+
+    def stats(self):
+        """Devuelve un snapshot de las métricas del pool."""
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot["size"] = self._size
+            snapshot["idle"] = len(self._idle)
+            snapshot["in_use"] = self._size - len(self._idle)
+            snapshot["min_size"] = self.min_size
+            snapshot["max_size"] = self.max_size
+        return snapshot
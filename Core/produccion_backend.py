@@ -5,22 +5,23 @@ Maneja subproductos, productos finales e ingredientes.
 
 import pymysql
 from decimal import Decimal
-from Core.database import get_connection
-from Core.logger import setup_logger
-from Core.inventario_backend import InventarioBackend
-from Core.units import convert_to_base
+from Core.database import get_connection, transaction
+from Core.logger import setup_logger, traced
+from Core.schema import has_column
+from Core.inventario_backend import InventarioBackend, clave_producto
+from Core.money import money, to_base_quantity, to_decimal
 
-logger = setup_logger()
+logger = setup_logger(__name__)
 
 
 class ProduccionBackend: 
-    def __init__(self):
-        self.db = get_connection()
-        self.inventory_manager = InventarioBackend()
+    def __init__(self, inventario=None):
+        self.inventory_manager = inventario or InventarioBackend()
         logger.info("ProduccionBackend initialized")
 
     # ===== SUBPRODUCTOS =====
 
+    @traced("produccion.crear_subproducto", ids=("nombre_subproducto", "ingredientes"))
     def crear_subproducto(self, nombre_subproducto, ingredientes):
         """
         Crear un subproducto y consumir ingredientes del inventario. 
@@ -32,69 +33,79 @@ class ProduccionBackend:
         Returns: 
             El costo total del subproducto
         """
-        conn = get_connection()
-        if not conn:
-            raise Exception("No database connection")
-
-        total_costo = Decimal(0)
         try:
-            # Fase 1: Calcular costo y validar stock
-            with conn.cursor() as cursor:
-                for ing in ingredientes:
-                    producto = ing['producto']
-                    cantidad = ing['cantidad']
-                    unidad = ing['unidad']
-
-                    cursor.execute(
-                        "SELECT costo_promedio_ponderado FROM inventario WHERE producto = %s",
-                        (producto,)
-                    )
-                    result = cursor.fetchone()
-                    if not result:
-                        raise ValueError(f"El ingrediente '{producto}' no está en el inventario")
-
-                    costo_por_base = result['costo_promedio_ponderado']
-                    cantidad_base, _ = convert_to_base(cantidad, unidad)
-                    if not cantidad_base:
-                        raise ValueError(f"No se pudo convertir cantidad para '{producto}'")
-
-                    total_costo += Decimal(cantidad_base) * Decimal(costo_por_base)
-
-            # Fase 2: Consumir stock
-            for ing in ingredientes: 
-                self.inventory_manager.consumir_stock(
-                    ing['producto'],
-                    ing['cantidad'],
-                    ing['unidad']
-                )
+            # Todo en una transacción: si algo falla no queda consumo parcial
+            with transaction() as cursor:
+                # Fase 1: Calcular costo (una sola consulta para todos los ingredientes)
+                total_costo = money(self.cost_recipe(ingredientes, cursor=cursor))
 
-            # Fase 3: Guardar en BD
-            with conn.cursor() as cursor:
+                # Fase 2: Consumir stock (valida y descuenta todos los ingredientes juntos)
+                self.inventory_manager.consumir_stock_lote(ingredientes, cursor=cursor)
+
+                # Fase 3: Guardar en BD
                 cursor.execute(
                     "INSERT INTO subproductos (nombre, costo_total_subproducto) VALUES (%s, %s)",
                     (nombre_subproducto, total_costo)
                 )
-                subproducto_id = cursor. lastrowid
+                subproducto_id = cursor.lastrowid
 
-                for ing in ingredientes:
-                    cursor. execute(
-                        "INSERT INTO subproducto_ingredientes "
-                        "(subproducto_id, producto_ingrediente, cantidad_usada, unidad_usada) "
-                        "VALUES (%s, %s, %s, %s)",
-                        (subproducto_id, ing['producto'], ing['cantidad'], ing['unidad'])
-                    )
+                cursor.executemany(
+                    "INSERT INTO subproducto_ingredientes "
+                    "(subproducto_id, producto_ingrediente, cantidad_usada, unidad_usada) "
+                    "VALUES (%s, %s, %s, %s)",
+                    [(subproducto_id, ing['producto'], ing['cantidad'], ing['unidad']) for ing in ingredientes]
+                )
 
-            conn.commit()
             logger.info(f"Subproducto '{nombre_subproducto}' creado.  Costo: ${total_costo:.2f}")
             return total_costo
 
         except Exception as e:
             logger.error(f"Error al crear subproducto: {e}")
-            conn.rollback()
             raise
-        finally:
-            conn.close()
 
+    @traced("produccion.cost_recipe", ids=("ingredientes",))
+    def cost_recipe(self, ingredientes, cursor=None):
+        """
+        Calcular el costo de una receta sin tocar el stock.
+
+        Trae el costo promedio de todos los ingredientes con una sola consulta
+        y suma con Decimal exacto. Sirve para previsualizar costos en la GUI.
+
+        Args:
+            ingredientes: Lista de dicts con 'producto', 'cantidad', 'unidad'
+            cursor: Cursor de una transacción abierta (opcional)
+
+        Returns:
+            El costo total como Decimal
+        """
+        if not ingredientes:
+            return Decimal(0)
+        if cursor is None:
+            with transaction() as cursor:
+                return self.cost_recipe(ingredientes, cursor=cursor)
+
+        productos = sorted({ing['producto'] for ing in ingredientes})
+        placeholders = ", ".join(["%s"] * len(productos))
+        cursor.execute(
+            f"SELECT producto, costo_promedio_ponderado FROM inventario WHERE producto IN ({placeholders})",
+            productos
+        )
+        # Misma comparación que hizo el IN (ver clave_producto)
+        costos = {clave_producto(r['producto']): Decimal(r['costo_promedio_ponderado']) for r in cursor.fetchall()}
+
+        faltantes = [p for p in productos if clave_producto(p) not in costos]
+        if faltantes:
+            raise ValueError(f"Ingredientes que no están en el inventario: {', '.join(faltantes)}")
+
+        total_costo = Decimal(0)
+        for ing in ingredientes:
+            cantidad_base = to_base_quantity(ing['cantidad'], ing['unidad'])
+            if cantidad_base is None:
+                raise ValueError(f"No se pudo convertir cantidad para '{ing['producto']}'")
+            total_costo += cantidad_base * costos[clave_producto(ing['producto'])]
+        return total_costo
+
+    @traced("produccion.get_subproductos_disponibles")
     def get_subproductos_disponibles(self):
         """Obtener todos los subproductos disponibles."""
         conn = get_connection()
@@ -113,6 +124,7 @@ class ProduccionBackend:
         finally:
             conn.close()
 
+    @traced("produccion.get_subproducto_ingredientes", ids=("subproducto_id",))
     def get_subproducto_ingredientes(self, subproducto_id):
         """Obtener ingredientes de un subproducto específico."""
         conn = get_connection()
@@ -133,6 +145,7 @@ class ProduccionBackend:
         finally:
             conn.close()
 
+    @traced("produccion.producir_subproducto", ids=("subproducto_id", "cantidad_producida"))
     def producir_subproducto(self, subproducto_id, cantidad_producida):
         """
         Producir un subproducto (consume ingredientes).
@@ -144,12 +157,8 @@ class ProduccionBackend:
         Returns:
             Información del subproducto producido
         """
-        conn = get_connection()
-        if not conn:
-            raise Exception("No database connection")
-
         try:
-            with conn.cursor() as cursor:
+            with transaction() as cursor:
                 # Obtener datos del subproducto
                 cursor.execute(
                     "SELECT id, nombre, costo_total_subproducto FROM subproductos WHERE id = %s",
@@ -159,32 +168,34 @@ class ProduccionBackend:
                 if not subproducto:
                     raise ValueError("Subproducto no encontrado")
 
-                # Obtener ingredientes
-                ingredientes = self.get_subproducto_ingredientes(subproducto_id)
+                # Obtener ingredientes en la misma transacción
+                cursor.execute(
+                    "SELECT producto_ingrediente, cantidad_usada, unidad_usada "
+                    "FROM subproducto_ingredientes WHERE subproducto_id = %s",
+                    (subproducto_id,)
+                )
+                ingredientes = cursor.fetchall()
                 if not ingredientes:
                     raise ValueError("El subproducto no tiene ingredientes")
 
-                # Consumir ingredientes
-                for ing in ingredientes:
-                    # Multiplicar cantidad por la cantidad a producir
-                    cantidad_a_consumir = ing['cantidad_usada'] * cantidad_producida
-                    self.inventory_manager.consumir_stock(
-                        ing['producto_ingrediente'],
-                        cantidad_a_consumir,
-                        ing['unidad_usada']
-                    )
+                # Consumir ingredientes: cantidad de la receta por la cantidad a producir
+                self.inventory_manager.consumir_stock_lote([
+                    {
+                        'producto': ing['producto_ingrediente'],
+                        'cantidad': to_decimal(ing['cantidad_usada']) * to_decimal(cantidad_producida),
+                        'unidad': ing['unidad_usada'],
+                    }
+                    for ing in ingredientes
+                ], cursor=cursor)
 
-            conn.commit()
             logger.info(f"Subproducto {subproducto['nombre']} producido x{cantidad_producida}")
             return subproducto
 
         except Exception as e:
             logger.error(f"Error produciendo subproducto: {e}")
-            conn.rollback()
             raise
-        finally: 
-            conn.close()
 
+    @traced("produccion.eliminar_subproducto", ids=("subproducto_id",))
     def eliminar_subproducto(self, subproducto_id):
         """Eliminar un subproducto."""
         conn = get_connection()
@@ -213,21 +224,33 @@ class ProduccionBackend:
 
     # ===== PRODUCTOS FINALES =====
 
+    @traced("produccion.get_productos_finales_info")
     def get_productos_finales_info(self):
-        """Obtener todos los productos finales con información de costos y precios."""
+        """
+        Obtener todos los productos finales con información de costos y precios.
+        margen_ganancia es la ganancia sobre el costo unitario, en %, como
+        ganancia_pct en VentasBackend.get_catalogo_con_precios.
+        """
         conn = get_connection()
         if not conn: 
             return []
 
+        precio_sql = "pf.precio_venta" if has_column("productos_finales", "precio_venta") else "NULL"
         try: 
             with conn.cursor() as cursor:
-                sql = """
+                sql = f"""
                     SELECT 
                         pf.id,
                         pf.nombre,
                         pf.unidades_producidas,
+                        sp.nombre AS subproducto_nombre,
                         sp.costo_total_subproducto,
-                        (sp.costo_total_subproducto / pf.unidades_producidas) AS costo_por_unidad
+                        (sp.costo_total_subproducto / pf.unidades_producidas) AS costo_por_unidad,
+                        COALESCE({precio_sql}, 0) AS precio_venta,
+                        ROUND(
+                            (COALESCE({precio_sql}, 0) - sp.costo_total_subproducto / pf.unidades_producidas)
+                            / NULLIF(sp.costo_total_subproducto / pf.unidades_producidas, 0) * 100, 2
+                        ) AS margen_ganancia
                     FROM productos_finales pf
                     JOIN subproductos sp ON pf.subproducto_id = sp.id
                     ORDER BY pf.nombre
@@ -240,6 +263,7 @@ class ProduccionBackend:
         finally:
             conn.close()
 
+    @traced("produccion.crear_producto_final", ids=("nombre", "subproducto_id"))
     def crear_producto_final(self, nombre, subproducto_id, unidades_producidas, precio_venta):
         """Crear un nuevo producto final."""
         conn = get_connection()
@@ -265,6 +289,7 @@ class ProduccionBackend:
         finally:
             conn.close()
 
+    @traced("produccion.actualizar_producto_final", ids=("producto_id",))
     def actualizar_producto_final(self, producto_id, precio_venta):
         """Actualizar precio de venta de un producto final."""
         conn = get_connection()
@@ -288,6 +313,7 @@ class ProduccionBackend:
         finally: 
             conn.close()
 
+    @traced("produccion.eliminar_producto_final", ids=("producto_id",))
     def eliminar_producto_final(self, producto_id):
         """Eliminar un producto final."""
         conn = get_connection()
@@ -0,0 +1,304 @@
+"""
+Esquema de la base de datos y migraciones versionadas.
+
+Cada migración tiene un número de versión, una descripción y una lista de
+pasos (sentencias SQL o funciones que reciben el cursor). La versión aplicada
+se guarda en la tabla `schema_version`, así que ejecutar run_migrations() más
+de una vez no vuelve a tocar las tablas.
+"""
+
+from Core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Nombre del lock de servidor que serializa migraciones entre terminales
+MIGRATION_LOCK = "economia_app_schema"
+
+
+def _add_column(table, column, definition):
+    """Paso de migración que agrega una columna solo si aún no existe."""
+    def step(cursor):
+        cursor.execute(
+            "SELECT 1 FROM information_schema.COLUMNS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s",
+            (table, column)
+        )
+        if not cursor.fetchone():
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+            logger.info(f"Columna '{column}' agregada a '{table}'")
+    return step
+
+
+def _add_index(table, name, columns):
+    """Paso de migración que crea un índice solo si aún no existe."""
+    def step(cursor):
+        cursor.execute(
+            "SELECT 1 FROM information_schema.STATISTICS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s",
+            (table, name)
+        )
+        if not cursor.fetchone():
+            cursor.execute(f"CREATE INDEX {name} ON {table} ({columns})")
+            logger.info(f"Índice '{name}' creado en '{table}'")
+    return step
+
+
+# ===== MIGRACIONES =====
+# Nunca modificar una migración ya publicada: agregar una nueva al final.
+
+MIGRATIONS = [
+    (1, "Tablas base", [
+        """
+        CREATE TABLE IF NOT EXISTS compras (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            producto VARCHAR(255) NOT NULL,
+            cantidad VARCHAR(255) NOT NULL,
+            unidad VARCHAR(255) NOT NULL,
+            precio_compra DECIMAL(10,2) NOT NULL,
+            precio_total DECIMAL(10,2) NOT NULL,
+            proveedor VARCHAR(255) NOT NULL,
+            tipo VARCHAR(50) NOT NULL,
+            fecha TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS inventario (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            producto VARCHAR(100) UNIQUE NOT NULL,
+            cantidad_stock DECIMAL(15,4) NOT NULL DEFAULT 0,
+            unidad_base VARCHAR(20) NOT NULL,
+            costo_promedio_ponderado DECIMAL(10,4) NOT NULL DEFAULT 0
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS subproductos (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            nombre VARCHAR(255) UNIQUE NOT NULL,
+            costo_total_subproducto DECIMAL(10,2) NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS subproducto_ingredientes (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            subproducto_id INT NOT NULL,
+            producto_ingrediente VARCHAR(255) NOT NULL,
+            cantidad_usada DECIMAL(10,4) NOT NULL,
+            unidad_usada VARCHAR(20) NOT NULL,
+            FOREIGN KEY (subproducto_id) REFERENCES subproductos(id) ON DELETE CASCADE
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS productos_finales (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            nombre VARCHAR(255) UNIQUE NOT NULL,
+            subproducto_id INT NOT NULL,
+            unidades_producidas INT NOT NULL,
+            FOREIGN KEY (subproducto_id) REFERENCES subproductos(id) ON DELETE CASCADE
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS clientes(
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            nombre VARCHAR(255) UNIQUE NOT NULL
+        )
+        """,
+    ]),
+    (2, "Precio de venta en productos_finales", [
+        _add_column("productos_finales", "precio_venta", "DECIMAL(10,2) NULL DEFAULT NULL"),
+    ]),
+    (3, "Clientes activos/inactivos", [
+        _add_column("clientes", "active", "TINYINT(1) NOT NULL DEFAULT 1"),
+    ]),
+    (4, "Tabla ventas", [
+        """
+        CREATE TABLE IF NOT EXISTS ventas(
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            cliente_id INT NOT NULL,
+            producto_final_id INT NOT NULL,
+            cantidad_vendida INT NOT NULL,
+            precio_unitario_venta DECIMAL(10,2) NOT NULL,
+            total_venta DECIMAL(10,2) NOT NULL,
+            fecha_venta TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (cliente_id) REFERENCES clientes(id),
+            FOREIGN KEY (producto_final_id) REFERENCES productos_finales(id)
+        )
+        """,
+    ]),
+    (5, "Columnas tipadas en compras (cantidad_base, unidad_base, paquetes, peso_paquete)", [
+        _add_column("compras", "cantidad_base", "DECIMAL(15,4) NULL DEFAULT NULL"),
+        _add_column("compras", "unidad_base", "VARCHAR(20) NULL DEFAULT NULL"),
+        _add_column("compras", "paquetes", "INT NULL DEFAULT NULL"),
+        _add_column("compras", "peso_paquete", "DECIMAL(15,4) NULL DEFAULT NULL"),
+        # Las filas existentes se completan fuera de la migración, por lotes
+        # (ver Core.database.init_database y Core.compras_backfill)
+    ]),
+    (6, "Índices para historial y estadísticas de compras y ventas", [
+        # InnoDB agrega el id a cada índice secundario, así que (fecha) ya sirve
+        # para ordenar y paginar por (fecha, id).
+        _add_index("compras", "idx_compras_fecha", "fecha"),
+        _add_index("compras", "idx_compras_producto_fecha", "producto, fecha"),
+        _add_index("ventas", "idx_ventas_cliente_fecha", "cliente_id, fecha_venta"),
+        _add_index("ventas", "idx_ventas_fecha", "fecha_venta"),
+    ]),
+    (7, "Índice de ventas por producto para el historial filtrado", [
+        _add_index("ventas", "idx_ventas_producto_fecha", "producto_final_id, fecha_venta"),
+    ]),
+    (8, "Índice de compras por proveedor para el historial filtrado", [
+        _add_index("compras", "idx_compras_proveedor_fecha", "proveedor, fecha"),
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+# Cache de columnas por tabla: {"clientes": {"id", "nombre", "active"}, ...}
+# Se carga una vez tras las migraciones y solo se invalida cuando se aplica una.
+_columns_cache = None
+
+
+def load_schema_cache(cursor):
+    """Carga en memoria las columnas de todas las tablas de la base actual."""
+    global _columns_cache
+    cursor.execute(
+        "SELECT TABLE_NAME, COLUMN_NAME FROM information_schema.COLUMNS "
+        "WHERE TABLE_SCHEMA = DATABASE()"
+    )
+    columns = {}
+    for row in cursor.fetchall():
+        columns.setdefault(row["TABLE_NAME"].lower(), set()).add(row["COLUMN_NAME"].lower())
+    _columns_cache = columns
+    logger.info(f"Cache de esquema cargada ({len(columns)} tablas)")
+
+
+def invalidate_schema_cache():
+    """Descarta la cache de columnas (se recarga en la próxima inicialización)."""
+    global _columns_cache
+    _columns_cache = None
+
+
+def schema_cache_loaded():
+    return _columns_cache is not None
+
+
+def has_column(table, column):
+    """Indica, sin consultar la base, si la tabla tiene la columna dada."""
+    if _columns_cache is None:
+        logger.warning(f"Cache de esquema no cargada al consultar {table}.{column}")
+        return False
+    return column.lower() in _columns_cache.get(table.lower(), ())
+
+
+# Muestra con la que se revisan los historiales: la GUI los pide paginados con LIMIT
+HOT_QUERIES_LIMIT = 50
+
+
+def hot_queries():
+    """
+    Consultas calientes: nombre -> (sql, params, índice esperado, ordena por el índice).
+
+    Las sentencias salen de los mismos builders/constantes que usan los
+    backends, así que EXPLAIN revisa exactamente lo que corre la aplicación.
+    ventas.por_dia agrupa por DATE(), así que ahí el filesort es esperable.
+    compras.resumen_producto agrega toda la tabla: índice esperado None, solo
+    se verifica que la sentencia sea válida contra el esquema actual.
+    """
+    from Core.database import compras_page_query
+    from Core.compras_backend import SQL_RESUMEN_POR_PRODUCTO
+    from Core.ventas_backend import SQL_CLIENTE_STATS, SQL_VENTAS_POR_DIA, historial_ventas_query
+
+    limit = HOT_QUERIES_LIMIT
+    return {
+        "compras.historial": (*compras_page_query(limit=limit), "idx_compras_fecha", True),
+        "compras.por_producto": (
+            *compras_page_query(limit=limit, producto="__explain__"), "idx_compras_producto_fecha", True,
+        ),
+        "compras.por_proveedor": (
+            *compras_page_query(limit=limit, proveedor="__explain__"), "idx_compras_proveedor_fecha", True,
+        ),
+        "compras.resumen_producto": (SQL_RESUMEN_POR_PRODUCTO, (), None, False),
+        "ventas.cliente_stats": (SQL_CLIENTE_STATS, (0,), "idx_ventas_cliente_fecha", False),
+        "ventas.por_dia": (SQL_VENTAS_POR_DIA, (0,), "idx_ventas_cliente_fecha", False),
+        "ventas.historial": (*historial_ventas_query(limit=limit), "idx_ventas_fecha", True),
+        "ventas.historial_producto": (
+            *historial_ventas_query(limit=limit, producto_final_id=0), "idx_ventas_producto_fecha", True,
+        ),
+    }
+
+
+def check_query_plans(cursor, queries=None):
+    """
+    Ejecuta EXPLAIN sobre las consultas calientes (hot_queries()) y devuelve
+    una lista de problemas (vacía si todas usan el índice esperado, sin full
+    scan ni filesort).
+
+    Con tablas casi vacías el optimizador puede preferir un full scan aunque el
+    índice exista; conviene correrlo sobre una base con datos reales.
+    """
+    problems = []
+    for name, (sql, params, expected, ordered) in (queries or hot_queries()).items():
+        cursor.execute("EXPLAIN " + sql, params)
+        plan = cursor.fetchall()
+        if expected is None:
+            continue
+        first = plan[0] if plan else {}
+        key = first.get("key")
+        extra = first.get("Extra") or ""
+        if key != expected:
+            problems.append(f"{name}: usa índice {key!r}, se esperaba {expected!r} (type={first.get('type')})")
+        elif ordered and "filesort" in extra:
+            problems.append(f"{name}: usa {expected} pero ordena con filesort ({extra})")
+    return problems
+
+
+def get_schema_version(cursor):
+    """Versión de esquema aplicada en la base (0 si nunca se migró)."""
+    cursor.execute("SELECT COALESCE(MAX(version), 0) AS version FROM schema_version")
+    row = cursor.fetchone()
+    return int(row["version"]) if row else 0
+
+
+def run_migrations(conn):
+    """
+    Aplica en orden las migraciones pendientes.
+
+    Es idempotente: si la base ya está en LATEST_VERSION solo hace una
+    consulta a `schema_version`. Devuelve la lista de versiones aplicadas.
+    """
+    applied = []
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT GET_LOCK(%s, 30) AS got", (MIGRATION_LOCK,))
+        row = cursor.fetchone()
+        if not row or not row["got"]:
+            raise RuntimeError("No se pudo obtener el lock de migraciones")
+        try:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS schema_version (
+                    version INT PRIMARY KEY,
+                    descripcion VARCHAR(255) NOT NULL,
+                    aplicada_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            current = get_schema_version(cursor)
+            for version, descripcion, steps in MIGRATIONS:
+                if version <= current:
+                    continue
+                logger.info(f"Aplicando migración {version}: {descripcion}")
+                for step in steps:
+                    if callable(step):
+                        step(cursor)
+                    else:
+                        cursor.execute(step)
+                cursor.execute(
+                    "INSERT INTO schema_version (version, descripcion) VALUES (%s, %s)",
+                    (version, descripcion)
+                )
+                conn.commit()
+                applied.append(version)
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (MIGRATION_LOCK,))
+
+    if applied:
+        invalidate_schema_cache()
+        logger.info(f"Esquema actualizado a la versión {LATEST_VERSION} (aplicadas: {applied})")
+    else:
+        logger.info(f"Esquema al día (versión {LATEST_VERSION})")
+    return applied
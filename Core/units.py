@@ -1,10 +1,24 @@
 # Core/units.py
 
-from Core.logger import setup_logger
+import logging
+import os
 
-logger = setup_logger()
+from Core.logger import setup_logger, set_module_level
 
-# --- (Tu código de conversiones existente no cambia) ---
+logger = setup_logger(__name__)
+
+# Traza de cada conversión, apagada por defecto porque estas funciones se
+# llaman dentro de los bucles de inventario y producción.
+# Se activa con ECONOMIA_TRACE_UNITS=1 o set_unit_tracing(True).
+_trace = os.environ.get("ECONOMIA_TRACE_UNITS") == "1"
+
+
+def set_unit_tracing(enabled=True):
+    """Activa/desactiva la traza DEBUG de conversiones de unidades."""
+    global _trace
+    _trace = bool(enabled)
+    if _trace and not logger.isEnabledFor(logging.DEBUG):
+        set_module_level(__name__, "DEBUG")
 
 # Conversion factors to base units
 # Base units: grams for weight, ml for volume, units for count
@@ -26,6 +40,26 @@ CONVERSIONS = {
     }
 }
 
+# Alias aceptados para cada unidad de CONVERSIONS. Es el registro único de
+# unidades: la GUI muestra unit_choices() y el backend acepta cualquier alias.
+UNIT_ALIASES = {
+    'g': ['gr', 'grs', 'gramo', 'gramos'],
+    'kg': ['kgs', 'kilo', 'kilos'],
+    'lb': ['lbs', 'libra', 'libras'],
+    'oz': ['onza', 'onzas'],
+    'ml': ['mililitro', 'mililitros'],
+    'lt': ['l', 'ltr', 'litro', 'litros', 'liter', 'liters'],
+    'unit': ['u', 'units', 'und', 'unidad', 'unidades'],
+    'decen': ['decena', 'decenas'],
+    'docen': ['docena', 'docenas', 'dozen'],
+}
+
+try:
+    import numpy as np
+except ImportError:  # NumPy es opcional: convert_many_to_base tiene fallback en Python
+    np = None
+
+
 def get_base_unit(category):
     if category == 'weight':
         return 'g'
@@ -37,49 +71,151 @@ def get_base_unit(category):
         logger.error(f"Unknown category: {category}")
         return None
 
+
+def _build_unit_index():
+    """Índice plano unidad/alias (en minúsculas) -> (factor, unidad_base, categoría, unidad canónica)."""
+    index = {}
+    for category, factors in CONVERSIONS.items():
+        base_unit = get_base_unit(category)
+        for unit, factor in factors.items():
+            entry = (factor, base_unit, category, unit)
+            index[unit] = entry
+            for alias in UNIT_ALIASES.get(unit, ()):
+                index[alias.lower()] = entry
+    return index
+
+
+# Construido una sola vez al importar el módulo
+_UNIT_INDEX = _build_unit_index()
+# Cache de las grafías exactas ya vistas ('Kg', ' L ', ...) para no normalizar en cada llamada
+_LOOKUP_CACHE = dict(_UNIT_INDEX)
+
+
+def lookup_unit(unit):
+    """Devuelve (factor, unidad_base, categoría, unidad canónica) para una unidad o alias, o None."""
+    entry = _LOOKUP_CACHE.get(unit)
+    if entry is None and isinstance(unit, str):
+        entry = _UNIT_INDEX.get(unit.strip().lower())
+        if entry is not None:
+            _LOOKUP_CACHE[unit] = entry
+    return entry
+
+
+def base_unit_of(unit):
+    """Unidad base ('g', 'ml', 'unit') de una unidad o alias, o None si no se reconoce."""
+    entry = lookup_unit(unit)
+    return entry[1] if entry else None
+
+
+def normalize_unit(unit):
+    """Unidad canónica de CONVERSIONS para una unidad o alias ('L' -> 'lt'), o None."""
+    entry = lookup_unit(unit)
+    return entry[3] if entry else None
+
+
+def unit_choices(categories=None):
+    """
+    Unidades canónicas para mostrar en los combobox de la GUI, en el orden
+    de CONVERSIONS. `categories` limita a ciertas categorías ('weight', ...).
+    Todas se pueden pasar tal cual a convert_to_base.
+    """
+    return [
+        unit
+        for category, factors in CONVERSIONS.items()
+        if categories is None or category in categories
+        for unit in factors
+    ]
+
+
+def check_unit_registry():
+    """
+    Recorre la matriz de unidades ofrecidas (unit_choices) y alias, en sus
+    grafías minúscula/mayúscula/título, y comprueba que todas conviertan a su
+    base y de vuelta. Devuelve la lista de problemas (vacía si todo está bien).
+    """
+    problems = []
+    for canonical in unit_choices():
+        spellings = [canonical] + UNIT_ALIASES.get(canonical, [])
+        for name in spellings:
+            for variant in {name, name.upper(), name.title()}:
+                converted, base_unit = convert_to_base(2, variant)
+                if converted is None:
+                    problems.append(f"'{variant}' no convierte a unidad base")
+                elif convert_from_base(converted, base_unit, variant) is None:
+                    problems.append(f"'{variant}' no convierte desde '{base_unit}'")
+                elif normalize_unit(variant) != canonical:
+                    problems.append(f"'{variant}' normaliza a '{normalize_unit(variant)}' en vez de '{canonical}'")
+    return problems
+
+
 def convert_to_base(quantity, unit):
     """ Convert quantity to base unit. Returns (converted_quantity, base_unit) or (None, None) if error. """
     try:
         quantity = float(quantity)
-        unit = unit.lower()
-        for category, factors in CONVERSIONS.items():
-            if unit in factors:
-                base_unit = get_base_unit(category)
-                converted = quantity * factors[unit]
-                logger.debug(f"Converted {quantity} {unit} to {converted} {base_unit}")
-                return converted, base_unit
-        logger.error(f"Unit {unit} not recognized")
-        return None, None
-    except ValueError as e:
+    except (TypeError, ValueError) as e:
         logger.error(f"Error converting quantity: {e}")
         return None, None
+    entry = lookup_unit(unit)
+    if entry is None:
+        logger.error(f"Unit {unit} not recognized")
+        return None, None
+    factor, base_unit = entry[0], entry[1]
+    converted = quantity * factor
+    if _trace:
+        logger.debug("Converted %s %s to %s %s", quantity, unit, converted, base_unit)
+    return converted, base_unit
+
 
 def convert_from_base(quantity, from_unit, to_unit):
     """ Convert from base unit to another unit. """
     try:
         quantity = float(quantity)
-        from_unit = from_unit.lower()
-        to_unit = to_unit.lower()
-        # Find category
-        category = None
-        for cat, factors in CONVERSIONS.items():
-            if from_unit in factors:
-                category = cat
-                break
-        if not category or to_unit not in CONVERSIONS[category]:
-            logger.error(f"Cannot convert from {from_unit} to {to_unit}")
-            return None
-        # Convert to base first if not already
-        if from_unit != get_base_unit(category):
-            quantity, _ = convert_to_base(quantity, from_unit)
-        # Then to target
-        factor = CONVERSIONS[category][to_unit]
-        converted = quantity / factor
-        logger.debug(f"Converted {quantity} {get_base_unit(category)} to {converted} {to_unit}")
-        return converted
-    except ValueError as e:
+    except (TypeError, ValueError) as e:
         logger.error(f"Error converting: {e}")
         return None
+    source = lookup_unit(from_unit)
+    target = lookup_unit(to_unit)
+    if source is None or target is None or source[2] != target[2]:
+        logger.error(f"Cannot convert from {from_unit} to {to_unit}")
+        return None
+    # A la unidad base y de ahí a la unidad destino
+    converted = quantity * source[0] / target[0]
+    if _trace:
+        logger.debug("Converted %s %s to %s %s", quantity, from_unit, converted, to_unit)
+    return converted
+
+
+def convert_many_to_base(quantities, units, use_numpy=None):
+    """
+    Convierte muchas cantidades a su unidad base de una vez.
+
+    Args:
+        quantities: Secuencia de cantidades
+        units: Secuencia de unidades (misma longitud) o una sola unidad para todas
+        use_numpy: Forzar (True) o evitar (False) NumPy; por defecto se usa si está instalado
+
+    Returns:
+        (valores, unidades_base): los valores son un ndarray con NumPy o una
+        lista de floats sin él; las unidades no reconocidas dan NaN y None.
+    """
+    if isinstance(units, str):
+        units = [units] * len(quantities)
+    if len(units) != len(quantities):
+        raise ValueError("quantities y units deben tener la misma longitud")
+
+    entries = [lookup_unit(u) for u in units]
+    factors = [e[0] if e else float("nan") for e in entries]
+    base_units = [e[1] if e else None for e in entries]
+
+    if use_numpy is None:
+        use_numpy = np is not None
+    if use_numpy:
+        if np is None:
+            raise RuntimeError("NumPy no está instalado")
+        values = np.asarray(quantities, dtype=float) * np.asarray(factors, dtype=float)
+    else:
+        values = [float(q) * f for q, f in zip(quantities, factors)]
+    return values, base_units
 
 # --- NUEVA FUNCIÓN AÑADIDA AQUÍ ---
 
@@ -1,16 +1,68 @@
 import pymysql
-from Core.database import get_connection
-from Core.logger import setup_logger
+from datetime import timedelta
+from Core.database import get_connection, keyset_page
+from Core.schema import has_column
+from Core.logger import setup_logger, traced
+from Core.money import money, cost, line_total, to_decimal, ZERO
 from Core.produccion_backend import ProduccionBackend
 
-logger = setup_logger()
+logger = setup_logger(__name__)
+
+SQL_CLIENTE_STATS = "SELECT COUNT(*) AS cnt, COALESCE(SUM(total_venta),0) AS total FROM ventas WHERE cliente_id = %s"
+SQL_VENTAS_POR_DIA = """
+    SELECT DATE(fecha_venta) AS dia, COUNT(*) AS ventas_count, COALESCE(SUM(total_venta),0) AS total_sum
+    FROM ventas
+    WHERE cliente_id = %s
+    GROUP BY dia
+    ORDER BY dia DESC
+"""
+
+
+def historial_ventas_query(after=None, limit=200, cliente_id=None, producto_final_id=None, desde=None, hasta=None):
+    """(sql, params) for one page of the sales history. See VentasBackend.get_historial_ventas_page."""
+    where, params = [], []
+    if after is not None:
+        where.append("(v.fecha_venta < %s OR (v.fecha_venta = %s AND v.id < %s))")
+        params.extend((after[0], after[0], after[1]))
+    if cliente_id is not None:
+        where.append("v.cliente_id = %s")
+        params.append(cliente_id)
+    if producto_final_id is not None:
+        where.append("v.producto_final_id = %s")
+        params.append(producto_final_id)
+    if desde is not None:
+        where.append("v.fecha_venta >= %s")
+        params.append(desde)
+    if hasta is not None:
+        where.append("v.fecha_venta < %s")
+        params.append(hasta + timedelta(days=1))
+    params.append(limit + 1)
+    where_sql = ("WHERE " + " AND ".join(where)) if where else ""
+    sql = f"""
+    SELECT
+        v.id,
+        v.fecha_venta,
+        c.nombre AS cliente,
+        pf.nombre AS producto,
+        v.cantidad_vendida,
+        v.precio_unitario_venta,
+        v.total_venta
+    FROM ventas v
+    LEFT JOIN clientes c ON v.cliente_id = c.id
+    LEFT JOIN productos_finales pf ON v.producto_final_id = pf.id
+    {where_sql}
+    ORDER BY v.fecha_venta DESC, v.id DESC
+    LIMIT %s
+    """
+    return sql, params
+
 
 class VentasBackend:
-    def __init__(self):
-        self.db = get_connection()
-        self.prod_backend = ProduccionBackend() # To get product costs
+    def __init__(self, produccion=None):
+        self.prod_backend = produccion or ProduccionBackend() # To get product costs
         logger.info("VentasBackend initialized")
 
+    @traced("ventas.add_cliente", ids=("nombre_cliente",))
     def add_cliente(self, nombre_cliente):
         """Adds a new client to the database."""
         conn = get_connection()
@@ -31,16 +83,14 @@ class VentasBackend:
         finally:
             conn.close()
 
+    @traced("ventas.get_clientes", ids=("only_active",))
     def get_clientes(self, only_active=False):
         """Returns a list of clients. If only_active=True, filter active clients."""
         conn = get_connection()
         if not conn: return []
         try:
             with conn.cursor() as cursor:
-                # Check if 'active' column exists
-                cursor.execute("SHOW COLUMNS FROM clientes LIKE 'active'")
-                has_active = bool(cursor.fetchone())
-                if has_active:
+                if has_column("clientes", "active"):
                     if only_active:
                         cursor.execute("SELECT id, nombre, active FROM clientes WHERE active = 1 ORDER BY nombre")
                     else:
@@ -58,17 +108,16 @@ class VentasBackend:
         finally:
             conn.close()
 
+    @traced("ventas.toggle_cliente_active", ids=("cliente_id",))
     def toggle_cliente_active(self, cliente_id):
         """Toggle active state for a client. Returns new state (1 or 0)."""
         conn = get_connection()
         if not conn: raise Exception("No database connection")
         try:
             with conn.cursor() as cursor:
-                # ensure column exists
-                cursor.execute("SHOW COLUMNS FROM clientes LIKE 'active'")
-                if not cursor.fetchone():
-                    # create column if missing (safe)
-                    cursor.execute("ALTER TABLE clientes ADD COLUMN active TINYINT(1) NOT NULL DEFAULT 1")
+                # Column is added by schema migration 3
+                if not has_column("clientes", "active"):
+                    raise Exception("La tabla 'clientes' no tiene la columna 'active'. Ejecuta las migraciones.")
                 # Toggle
                 cursor.execute("SELECT active FROM clientes WHERE id = %s", (cliente_id,))
                 row = cursor.fetchone()
@@ -89,69 +138,79 @@ class VentasBackend:
         """Convenience wrapper to get active clients."""
         return self.get_clientes(only_active=True)
 
-    def get_productos_con_costo(self):
+    @traced("ventas.get_catalogo_con_precios")
+    def get_catalogo_con_precios(self):
         """
-        Gets final products and adds their calculated cost for the sales UI.
-        Also reads precio_venta from productos_finales if present.
+        Returns the whole priced catalog in a single query:
+        cost, units, unit cost, sale price and margin for every final product.
+        Money fields are Decimal (see Core.money).
         """
-        productos_info = self.prod_backend.get_productos_finales_info()
-        result = []
         conn = get_connection()
+        if not conn: return []
+        precio_sql = "pf.precio_venta" if has_column("productos_finales", "precio_venta") else "NULL"
         try:
-            for p in productos_info:
-                pid = p.get("id")
-                # get precio_venta from DB if available
-                precio_venta = None
-                try:
-                    if conn:
-                        with conn.cursor() as cursor:
-                            cursor.execute("SELECT precio_venta FROM productos_finales WHERE id = %s", (pid,))
-                            row = cursor.fetchone()
-                            if row and row.get("precio_venta") is not None:
-                                precio_venta = float(row.get("precio_venta") or 0)
-                except Exception:
-                    precio_venta = None
-
-                try:
-                    unidades_prod = float(p.get("unidades_producidas", 1)) if p.get("unidades_producidas") else 1.0
-                except Exception:
-                    unidades_prod = 1.0
-                costo_total = float(p.get("costo_total_subproducto", 0) or 0)
-                costo_unitario = round(costo_total / unidades_prod, 4) if unidades_prod else 0.0
-
-                # Prefer precio_venta from DB; otherwise try from p dict, otherwise 0
-                precio_venta_final = precio_venta if precio_venta is not None else float(p.get("precio_venta", 0) or 0)
-                ganancia = round(precio_venta_final - costo_unitario, 4)
-                ganancia_pct = round((ganancia / costo_unitario * 100), 2) if costo_unitario else None
-                result.append({
-                    "id": pid,
-                    "nombre": p.get("nombre"),
-                    "costo_total_subproducto": costo_total,
-                    "unidades_producidas": unidades_prod,
-                    "costo_unitario": costo_unitario,
-                    "precio_venta": precio_venta_final,
-                    "ganancia_unitaria": ganancia,
-                    "ganancia_pct": ganancia_pct
-                })
-            return result
+            with conn.cursor() as cursor:
+                sql = f"""
+                    SELECT
+                        c.id,
+                        c.nombre,
+                        c.costo_total_subproducto,
+                        c.unidades_producidas,
+                        c.costo_unitario,
+                        c.precio_venta,
+                        ROUND(c.precio_venta - c.costo_unitario, 4) AS ganancia_unitaria,
+                        ROUND((c.precio_venta - c.costo_unitario) / NULLIF(c.costo_unitario, 0) * 100, 2) AS ganancia_pct
+                    FROM (
+                        SELECT
+                            pf.id,
+                            pf.nombre,
+                            COALESCE(sp.costo_total_subproducto, 0) AS costo_total_subproducto,
+                            COALESCE(NULLIF(pf.unidades_producidas, 0), 1) AS unidades_producidas,
+                            ROUND(COALESCE(sp.costo_total_subproducto, 0) / COALESCE(NULLIF(pf.unidades_producidas, 0), 1), 4) AS costo_unitario,
+                            COALESCE({precio_sql}, 0) AS precio_venta
+                        FROM productos_finales pf
+                        JOIN subproductos sp ON pf.subproducto_id = sp.id
+                    ) c
+                    ORDER BY c.nombre
+                """
+                cursor.execute(sql)
+                rows = cursor.fetchall()
+            return [{
+                "id": r["id"],
+                "nombre": r["nombre"],
+                "costo_total_subproducto": money(r["costo_total_subproducto"]),
+                "unidades_producidas": float(r["unidades_producidas"]),
+                "costo_unitario": cost(r["costo_unitario"]),
+                "precio_venta": money(r["precio_venta"]),
+                "ganancia_unitaria": cost(r["ganancia_unitaria"]),
+                "ganancia_pct": to_decimal(r["ganancia_pct"]) if r["ganancia_pct"] is not None else None
+            } for r in rows]
+        except Exception as e:
+            logger.error(f"Error al obtener catalogo con precios: {e}")
+            return []
         finally:
-            if conn:
-                conn.close()
+            conn.close()
+
+    def get_productos_con_costo(self):
+        """
+        Gets final products with their calculated cost and precio_venta for the sales UI.
+        Kept for the GUI tabs; delegates to the single-query catalog.
+        """
+        return self.get_catalogo_con_precios()
 
+    @traced("ventas.set_precio_venta", ids=("producto_final_id",))
     def set_precio_venta(self, producto_final_id, precio):
         """
         Set or update the precio_venta for a producto_final.
-        Adds the column if it doesn't exist (migration-safe).
+        The column is added by schema migration 2.
         """
         conn = get_connection()
         if not conn: raise Exception("No database connection")
         try:
             with conn.cursor() as cursor:
-                # Ensure column exists
-                cursor.execute("SHOW COLUMNS FROM productos_finales LIKE 'precio_venta'")
-                if not cursor.fetchone():
-                    cursor.execute("ALTER TABLE productos_finales ADD COLUMN precio_venta DECIMAL(10,2) NULL DEFAULT NULL")
-                cursor.execute("UPDATE productos_finales SET precio_venta = %s WHERE id = %s", (round(float(precio),2), producto_final_id))
+                if not has_column("productos_finales", "precio_venta"):
+                    raise Exception("La tabla 'productos_finales' no tiene la columna 'precio_venta'. Ejecuta las migraciones.")
+                cursor.execute("UPDATE productos_finales SET precio_venta = %s WHERE id = %s", (money(precio), producto_final_id))
             conn.commit()
             logger.info(f"Precio de venta actualizado: ProductoID {producto_final_id} -> {precio}")
         except Exception as e:
@@ -161,6 +220,7 @@ class VentasBackend:
         finally:
             conn.close()
 
+    @traced("ventas.registrar_venta", ids=("cliente_id", "producto_final_id"))
     def registrar_venta(self, cliente_id, producto_final_id, cantidad_vendida, precio_unitario_venta):
         """
         Records a single sale transaction.
@@ -185,6 +245,7 @@ class VentasBackend:
         finally:
             conn.close()
 
+    @traced("ventas.crear_venta_multiple", ids=("cliente_id", "items"))
     def crear_venta_multiple(self, cliente_id, items):
         """
         Create a sale composed of multiple items.
@@ -196,7 +257,7 @@ class VentasBackend:
         conn = get_connection()
         if not conn: raise Exception("No database connection")
         try:
-            total_venta = 0
+            total_venta = ZERO
             with conn.cursor() as cursor:
                 # Optional: check cliente exists and active
                 cursor.execute("SELECT id, COALESCE(active,1) as active FROM clientes WHERE id = %s", (cliente_id,))
@@ -209,8 +270,8 @@ class VentasBackend:
                 for it in items:
                     producto_id = it["product_id"]
                     cantidad = int(it.get("quantity", 1))
-                    unit_price = float(it.get("unit_price", 0))
-                    subtotal = round(cantidad * unit_price, 2)
+                    unit_price = money(it.get("unit_price", 0))
+                    subtotal = line_total(cantidad, unit_price)
                     total_venta += subtotal
                     cursor.execute(
                         "INSERT INTO ventas (cliente_id, producto_final_id, cantidad_vendida, precio_unitario_venta, total_venta) VALUES (%s, %s, %s, %s, %s)",
@@ -226,13 +287,14 @@ class VentasBackend:
         finally:
             conn.close()
 
+    @traced("ventas.get_cliente_stats", ids=("cliente_id",))
     def get_cliente_stats(self, cliente_id):
         """Return purchases_count and total_revenue for a given client."""
         conn = get_connection()
         if not conn: return {"purchases_count": 0, "total_revenue": 0.0}
         try:
             with conn.cursor() as cursor:
-                cursor.execute("SELECT COUNT(*) AS cnt, COALESCE(SUM(total_venta),0) AS total FROM ventas WHERE cliente_id = %s", (cliente_id,))
+                cursor.execute(SQL_CLIENTE_STATS, (cliente_id,))
                 row = cursor.fetchone() or {"cnt": 0, "total": 0}
                 return {"purchases_count": int(row.get("cnt", 0)), "total_revenue": float(row.get("total", 0.0))}
         except Exception as e:
@@ -241,6 +303,7 @@ class VentasBackend:
         finally:
             conn.close()
 
+    @traced("ventas.get_ventas_por_dia", ids=("cliente_id",))
     def get_ventas_por_dia(self, cliente_id):
         """
         Returns list grouped by day:
@@ -250,14 +313,7 @@ class VentasBackend:
         if not conn: return []
         try:
             with conn.cursor() as cursor:
-                sql = """
-                    SELECT DATE(fecha_venta) AS dia, COUNT(*) AS ventas_count, COALESCE(SUM(total_venta),0) AS total_sum
-                    FROM ventas
-                    WHERE cliente_id = %s
-                    GROUP BY dia
-                    ORDER BY dia DESC
-                """
-                cursor.execute(sql, (cliente_id,))
+                cursor.execute(SQL_VENTAS_POR_DIA, (cliente_id,))
                 rows = cursor.fetchall()
                 return [{"day": str(r["dia"]), "sales_count": int(r["ventas_count"]), "total_sum": float(r["total_sum"])} for r in rows]
         except Exception as e:
@@ -266,8 +322,38 @@ class VentasBackend:
         finally:
             conn.close()
 
+    HISTORIAL_PAGE_SIZE = 200
+
+    @traced("ventas.get_historial_ventas_page", ids=("cliente_id", "producto_final_id", "limit"))
+    def get_historial_ventas_page(self, after=None, limit=HISTORIAL_PAGE_SIZE, cliente_id=None,
+                                  producto_final_id=None, desde=None, hasta=None):
+        """
+        One page of the sales history, newest first, paginated by keyset on
+        (fecha_venta, id) so every page costs the same no matter how deep.
+
+        after: next_cursor of the previous page (None for the first page)
+        desde / hasta: date range (datetime.date), both inclusive
+        Returns {"rows": [...], "next_cursor": (fecha_venta, id) or None}
+        """
+        sql, params = historial_ventas_query(after, limit, cliente_id, producto_final_id, desde, hasta)
+        conn = get_connection()
+        if not conn: return {"rows": [], "next_cursor": None}
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(sql, params)
+                return keyset_page(cursor.fetchall(), limit, lambda r: (r["fecha_venta"], r["id"]))
+        except Exception as e:
+            logger.error(f"Error al obtener página de historial de ventas: {e}")
+            return {"rows": [], "next_cursor": None}
+        finally:
+            conn.close()
+
+    @traced("ventas.get_historial_ventas")
     def get_historial_ventas(self):
-        """Returns the full sales history with client and product names."""
+        """
+        Returns the full sales history with client and product names.
+        Prefer get_historial_ventas_page for the GUI: this loads every row.
+        """
         conn = get_connection()
         if not conn: return []
         try:
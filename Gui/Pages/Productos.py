@@ -1,13 +1,17 @@
 import tkinter as tk 
 from tkinter import ttk
 from Gui.Pages.Ventas_Tabs.precios_tab import PreciosTab
-from Core.ventas_backend import VentasBackend
+from Core.app_context import get_app_context
 from Gui.Pages.Styles.ventas_styles import VentasStyles
+from Gui.lazy_notebook import LazyNotebook
 
 class ProductosFrame(ttk.Frame):
+    # Datos que muestra; si cambian mientras la página está oculta, refresh()
+    datasets = ("produccion", "precios")
+
     def __init__(self, parent):
         super().__init__(parent)
-        self.backend = VentasBackend()
+        self.backend = get_app_context().ventas
         self.styles = VentasStyles()
         self.setup_ui()
 
@@ -15,5 +19,9 @@ class ProductosFrame(ttk.Frame):
         self.notebook.add(self.precios_tab, text="Precios de Venta")
 
     def setup_ui(self):
-        self.notebook = ttk.Notebook(self)
-        self.notebook.pack(fill=tk.BOTH, expand=True)
\ No newline at end of file
+        self.notebook = LazyNotebook(self)
+        self.notebook.pack(fill=tk.BOTH, expand=True)
+
+    def refresh(self):
+        """Recargar precios tras cambios en productos finales o en sus precios de venta."""
+        self.notebook.refresh()
@@ -8,6 +8,8 @@ from datetime import datetime
 from Core.inventario_backend import InventarioBackend
 from Core.logger import setup_logger
 from decimal import Decimal
+from Gui.task_runner import SharedQuery
+from Gui.virtual_table import VirtualTable, Column
 
 
 class ContabilidadTab(ttk.Frame):
@@ -15,9 +17,11 @@ class ContabilidadTab(ttk.Frame):
     
     tab_name = "Contabilidad"
     
-    def __init__(self, parent, backend:  InventarioBackend):
+    def __init__(self, parent, backend:  InventarioBackend, inventario_query=None):
         super().__init__(parent)
         self.backend = backend
+        # Consulta compartida con InventarioTab (mismo get_inventario_para_resumen)
+        self.inventario_query = inventario_query or SharedQuery(backend.get_inventario_para_resumen)
         self.logger = setup_logger()
         
         # Variables de contabilidad
@@ -28,8 +32,13 @@ class ContabilidadTab(ttk.Frame):
         self.capital_disponible = Decimal(0)
         
         self.setup_ui()
-        self.load_contabilidad()
+        # Los datos se cargan al seleccionar el tab (LazyNotebook); un
+        # "Actualizar" de InventarioTab también refresca estos totales
+        self.inventario_query.subscribe(self.show_contabilidad)
         self.logger.info("ContabilidadTab initialized")
+
+    def load_data(self):
+        self.load_contabilidad()
     
     def setup_ui(self):
         """Configurar la interfaz."""
@@ -113,37 +122,15 @@ class ContabilidadTab(ttk.Frame):
         )
         detalles_card.pack(fill=tk. BOTH, expand=True, pady=(0, 15))
         
-        # Tabla de inventario con costos
-        cols = ("Producto", "Cantidad", "Unidad", "Costo Unit.", "Inversión Total")
-        self.inventario_tree = ttk.Treeview(
-            detalles_card,
-            columns=cols,
-            show="headings",
-            height=10
-        )
-        
-        self.inventario_tree. heading("Producto", text="📦 Producto")
-        self.inventario_tree.heading("Cantidad", text="Cantidad")
-        self.inventario_tree.heading("Unidad", text="Unidad")
-        self.inventario_tree.heading("Costo Unit.", text="Costo Unit.")
-        self.inventario_tree.heading("Inversión Total", text="Inversión Total")
-        
-        self.inventario_tree.column("Producto", width=200)
-        self.inventario_tree.column("Cantidad", width=100, anchor=tk.CENTER)
-        self.inventario_tree.column("Unidad", width=80, anchor=tk.CENTER)
-        self.inventario_tree. column("Costo Unit.", width=100, anchor=tk.E)
-        self.inventario_tree.column("Inversión Total", width=150, anchor=tk.E)
-        
-        self.inventario_tree.pack(fill=tk.BOTH, expand=True, pady=(0, 10))
-        
-        # Scrollbar
-        scrollbar = ttk. Scrollbar(
-            detalles_card,
-            orient=tk.VERTICAL,
-            command=self.inventario_tree.yview
-        )
-        self.inventario_tree.configure(yscroll=scrollbar.set)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        # Tabla de inventario con costos (virtualizada, incluye scrollbar)
+        self.inventario_table = VirtualTable(detalles_card, [
+            Column("producto", "📦 Producto", width=200),
+            Column("cantidad_display", "Cantidad", width=100, anchor=tk.CENTER),
+            Column("unidad_display", "Unidad", width=80, anchor=tk.CENTER),
+            Column("costo_promedio_display", "Costo Unit.", width=100, anchor=tk.E),
+            Column("total_valor", "Inversión Total", width=150, anchor=tk.E, fmt=lambda v, r: f"${v:.2f}"),
+        ], height=10)
+        self.inventario_table.pack(fill=tk.BOTH, expand=True, pady=(0, 10))
         
         # ===== SECCIÓN 3: Historial de Movimientos =====
         movimientos_card = tk.LabelFrame(
@@ -158,40 +145,19 @@ class ContabilidadTab(ttk.Frame):
         movimientos_card.pack(fill=tk.BOTH, expand=True)
         
         # Tabla de movimientos
-        mov_cols = ("Fecha", "Tipo", "Descripción", "Monto")
-        self.movimientos_tree = ttk.Treeview(
-            movimientos_card,
-            columns=mov_cols,
-            show="headings",
-            height=8
-        )
-        
-        self.movimientos_tree.heading("Fecha", text="📅 Fecha")
-        self.movimientos_tree.heading("Tipo", text="Tipo")
-        self.movimientos_tree.heading("Descripción", text="Descripción")
-        self.movimientos_tree.heading("Monto", text="Monto")
-        
-        self.movimientos_tree.column("Fecha", width=120, anchor=tk.CENTER)
-        self.movimientos_tree.column("Tipo", width=80, anchor=tk.CENTER)
-        self.movimientos_tree.column("Descripción", width=300)
-        self.movimientos_tree.column("Monto", width=100, anchor=tk.E)
-        
-        self.movimientos_tree.pack(fill=tk.BOTH, expand=True, pady=(0, 10))
-        
-        # Scrollbar
-        mov_scrollbar = ttk. Scrollbar(
-            movimientos_card,
-            orient=tk. VERTICAL,
-            command=self.movimientos_tree.yview
-        )
-        self.movimientos_tree.configure(yscroll=mov_scrollbar.set)
-        mov_scrollbar. pack(side=tk.RIGHT, fill=tk.Y)
+        self.movimientos_table = VirtualTable(movimientos_card, [
+            Column("fecha", "📅 Fecha", width=120, anchor=tk.CENTER),
+            Column("tipo", "Tipo", width=80, anchor=tk.CENTER),
+            Column("descripcion", "Descripción", width=300),
+            Column("monto", "Monto", width=100, anchor=tk.E, fmt=lambda v, r: f"${v:.2f}"),
+        ], height=8)
+        self.movimientos_table.pack(fill=tk.BOTH, expand=True, pady=(0, 10))
         
         # Botón de actualizar
         refresh_btn = tk.Button(
             movimientos_card,
             text="🔄 Actualizar",
-            command=self.load_contabilidad,
+            command=lambda: self.load_contabilidad(force=True),
             bg="#0078d4",
             fg="white",
             font=("Segoe UI", 10, "bold"),
@@ -230,34 +196,21 @@ class ContabilidadTab(ttk.Frame):
         # Guardar referencia al label para actualizarlo después
         setattr(self, attr_name, value_label)
     
-    def load_contabilidad(self):
+    def load_contabilidad(self, force=False):
         """Cargar datos de contabilidad."""
+        # Obtener datos del inventario fuera del hilo de Tk
+        self.inventario_query.get(self, on_success=self.show_contabilidad, on_error=self.on_load_error, force=force)
+
+    def on_load_error(self, e):
+        messagebox.showerror("Error", f"Error cargando contabilidad: {e}")
+        self.logger.error(f"Error en load_contabilidad: {e}")
+
+    def show_contabilidad(self, inventario):
+        """Mostrar los datos de contabilidad ya cargados."""
         try:
-            # Limpiar tablas
-            for item in self.inventario_tree. get_children():
-                self. inventario_tree.delete(item)
-            for item in self. movimientos_tree.get_children():
-                self.movimientos_tree.delete(item)
-            
-            # Obtener datos del inventario
-            inventario = self.backend.get_inventario_para_resumen()
-            
-            total_inversiones = Decimal(0)
-            
-            for item in inventario: 
-                total_inversiones += Decimal(str(item['total_valor']))
-                
-                self.inventario_tree.insert(
-                    "",
-                    tk.END,
-                    values=(
-                        item['producto'],
-                        item['cantidad_display'],
-                        item['unidad_display'],
-                        item['costo_promedio_display'],
-                        f"${item['total_valor']:.2f}"
-                    )
-                )
+            self.inventario_table.set_rows(inventario)
+
+            total_inversiones = sum((Decimal(str(item['total_valor'])) for item in inventario), Decimal(0))
             
             self.total_inversiones = total_inversiones
             
@@ -313,14 +266,4 @@ class ContabilidadTab(ttk.Frame):
             }
         ]
         
-        for mov in movements:
-            self. movimientos_tree.insert(
-                "",
-                tk.END,
-                values=(
-                    mov['fecha'],
-                    mov['tipo'],
-                    mov['descripcion'],
-                    f"${mov['monto']:.2f}"
-                )
-            )
\ No newline at end of file
+        self.movimientos_table.set_rows(movements)
\ No newline at end of file
@@ -2,16 +2,23 @@ import tkinter as tk
 from tkinter import ttk
 from decimal import Decimal
 from Core.inventario_backend import InventarioBackend
+from Gui.task_runner import SharedQuery
+from Gui.virtual_table import VirtualTable, Column
 
 class InventarioTab(ttk.Frame):
     tab_name = "Inventario"
     
-    def __init__(self, parent, backend):
+    def __init__(self, parent, backend, inventario_query=None):
         super().__init__(parent)
         self.backend = backend
+        # Consulta compartida con otros tabs que muestran el mismo inventario
+        self.inventario_query = inventario_query or SharedQuery(
+            backend.get_inventario_para_resumen, error_message="No se pudo cargar el inventario"
+        )
         self.display_units = {}
-        self.available_units = ['gr', 'Kg', 'Lb', 'Oz', 'L', 'ml'] # unidades comunes
         self.setup_ui()
+        # Un "Actualizar" de otro tab también refresca esta tabla
+        self.inventario_query.subscribe(self.show_inventario)
 
     def setup_ui(self):
         # Frame Inventario
@@ -20,28 +27,18 @@ class InventarioTab(ttk.Frame):
 
         ttk.Label(inv_frame, text="Materias Primas en Inventario", font=("Arial", 14)).pack(pady=5)
 
-        # Treeview para inventario
-        columns = ("Producto", "Cantidad", "Unidad", "Costo Promedio", "Total Precio")
-        self.inv_tree = ttk.Treeview(inv_frame, columns=columns, show="headings", height=10)
-        self.inv_tree.heading("Producto", text="Producto")
-        self.inv_tree.heading("Cantidad", text="Cantidad")
-        self.inv_tree.heading("Unidad", text="Unidad")
-        self.inv_tree.heading("Costo Promedio", text="Costo Promedio")
-        self.inv_tree.heading("Total Precio", text="Total Precio")
-        self.inv_tree.column("Producto", width=150)
-        self.inv_tree.column("Cantidad", width=100)
-        self.inv_tree.column("Unidad", width=100)
-        self.inv_tree.column("Costo Promedio", width=100)
-        self.inv_tree.column("Total Precio", width=100)
-        self.inv_tree.pack(fill=tk.BOTH, expand=True)
+        # Tabla virtualizada para inventario (incluye su scrollbar)
+        self.inv_table = VirtualTable(inv_frame, [
+            Column("producto", "Producto", width=150),
+            Column("cantidad_display", "Cantidad", width=100),
+            Column("unidad_display", "Unidad", width=100),
+            Column("costo_promedio_display", "Costo Promedio", width=100),
+            Column("total_valor", "Total Precio", width=100, fmt=lambda v, r: f"${v:.2f}"),
+        ], height=10)
+        self.inv_table.pack(fill=tk.BOTH, expand=True)
 
         # Doble click para seleccion de unidades
-        self.inv_tree.bind("<Double-1>", self.on_tree_double_click)
-
-        #Scrollbar
-        scrollbar = ttk.Scrollbar(inv_frame, orient=tk.VERTICAL, command=self.inv_tree.yview)
-        self.inv_tree.configure(yscroll=scrollbar.set)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.inv_table.tree.bind("<Double-1>", self.on_tree_double_click)
 
         # Total invertido
         total_frame = tk.Frame(self)
@@ -51,32 +48,22 @@ class InventarioTab(ttk.Frame):
         self.total_label.pack()
 
         # Boton para refrescar 
-        refresh_btn = tk.Button(self, text="Actualizar", command=self.load_inventario)
-        refresh_btn.pack(pady=5)
+        self.refresh_btn = tk.Button(self, text="Actualizar", command=lambda: self.load_inventario(force=True))
+        self.refresh_btn.pack(pady=5)
 
+    def load_data(self):
         self.load_inventario()
 
-    def load_inventario(self):
-        # Limpiar inventario
-        for item in self.inv_tree.get_children():
-            self.inv_tree.delete(item)
-        
-        # --- CHANGE THIS LINE ---
+    def load_inventario(self, force=False):
         # obtener datos del backend usando el nuevo método
-        inventario_data = self.backend.get_inventario_para_resumen()
-        
-        total_invertido = 0
-        for item in inventario_data:
-            # The new method already prepares the data for display
-            self.inv_tree.insert("", tk.END, values=(
-                item['producto'],
-                item['cantidad_display'], # e.g., "0.80"
-                item['unidad_display'],    # e.g., "kg"
-                item['costo_promedio_display'], # e.g., "$0.1750"
-                f"${item['total_valor']:.2f}"
-            ))
-            total_invertido += item['total_valor']
-            
+        # (ya vienen preparados para mostrar: "0.80", "kg", "$0.1750")
+        self.inventario_query.get(self, on_success=self.show_inventario, force=force, busy=self.refresh_btn)
+
+    def show_inventario(self, inventario_data):
+        self.inv_table.set_rows(inventario_data)
+
+        total_invertido = sum((item['total_valor'] for item in inventario_data), Decimal(0))
+
         self.total_label.config(text=f"Total invertido: ${total_invertido:.2f}")
 
     def on_tree_double_click(self, event):
@@ -1,6 +1,8 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 from Core.ventas_backend import VentasBackend
+from Core.app_context import get_app_context
+from Gui.task_runner import get_task_runner
 
 class ClientesTab(ttk.Frame):
     tab_name = "Clientes"
@@ -9,6 +11,9 @@ class ClientesTab(ttk.Frame):
         super().__init__(parent)
         self.backend = backend
         self.setup_ui()
+        # Los datos se cargan al seleccionar el tab (LazyNotebook)
+
+    def load_data(self):
         self.load_clients()
 
     def setup_ui(self):
@@ -21,7 +26,8 @@ class ClientesTab(ttk.Frame):
         ttk.Label(create_frame, text="Nuevo cliente:").pack(side=tk.LEFT)
         self.new_client_entry = ttk.Entry(create_frame)
         self.new_client_entry.pack(side=tk.LEFT, padx=5)
-        ttk.Button(create_frame, text="Crear", command=self.create_client, style="Primary.TButton").pack(side=tk.LEFT, padx=5)
+        self.create_btn = ttk.Button(create_frame, text="Crear", command=self.create_client, style="Primary.TButton")
+        self.create_btn.pack(side=tk.LEFT, padx=5)
 
         # Middle: clientes list + acciones
         mid = ttk.Frame(main)
@@ -61,60 +67,98 @@ class ClientesTab(ttk.Frame):
         self.ventas_tree.pack(fill=tk.BOTH, expand=True)
 
     def load_clients(self):
-        try:
-            rows = self.backend.get_clientes()
-            # Clear
-            for i in self.clients_tree.get_children():
-                self.clients_tree.delete(i)
-            for r in rows:
-                active = r.get("active", 1)
-                self.clients_tree.insert("", tk.END, iid=str(r["id"]), values=(r["nombre"], "Sí" if active else "No"))
-        except Exception as e:
-            messagebox.showerror("Error", f"No se pudieron cargar clientes: {e}")
+        get_task_runner(self).submit(
+            self.backend.get_clientes,
+            on_success=self.show_clients, on_error=self.on_load_error,
+            key="clientes.load", busy=self.create_btn,
+        )
+
+    def show_clients(self, rows):
+        # Clear
+        for i in self.clients_tree.get_children():
+            self.clients_tree.delete(i)
+        for r in rows:
+            active = r.get("active", 1)
+            self.clients_tree.insert("", tk.END, iid=str(r["id"]), values=(r["nombre"], "Sí" if active else "No"))
+
+    def on_load_error(self, e):
+        messagebox.showerror("Error", f"No se pudieron cargar clientes: {e}")
 
     def create_client(self):
         name = self.new_client_entry.get().strip()
         if not name:
             messagebox.showwarning("Aviso", "Ingresa el nombre del cliente")
             return
-        try:
-            self.backend.add_cliente(name)
+
+        def on_success(_):
+            get_app_context().mark_changed("clientes")
             self.new_client_entry.delete(0, tk.END)
             self.load_clients()
             messagebox.showinfo("OK", "Cliente creado")
-        except ValueError as ve:
-            messagebox.showwarning("Aviso", str(ve))
-        except Exception as e:
-            messagebox.showerror("Error", f"No se pudo crear cliente: {e}")
+
+        def on_error(e):
+            if isinstance(e, ValueError):
+                messagebox.showwarning("Aviso", str(e))
+            else:
+                messagebox.showerror("Error", f"No se pudo crear cliente: {e}")
+
+        get_task_runner(self).submit(
+            self.backend.add_cliente, name,
+            on_success=on_success, on_error=on_error, busy=self.create_btn,
+        )
 
     def on_client_select(self, _evt):
+        runner = get_task_runner(self)
         selected = self.clients_tree.selection()
         if not selected:
+            runner.cancel("clientes.stats")
             self.toggle_btn.config(state=tk.DISABLED)
             self.stats_label.config(text="Selecciona un cliente")
             return
         cliente_id = int(selected[0])
         self.toggle_btn.config(state=tk.NORMAL)
-        # load stats
-        stats = self.backend.get_cliente_stats(cliente_id)
+        self.stats_label.config(text="Cargando...")
+        # Al recorrer la lista con el teclado solo se muestra el último cliente
+        runner.submit(
+            self.load_client_details, cliente_id,
+            on_success=self.show_client_details,
+            on_error=self.on_details_error,
+            key="clientes.stats",
+        )
+
+    def load_client_details(self, cliente_id):
+        # Corre en el pool de TaskRunner
+        return self.backend.get_cliente_stats(cliente_id), self.backend.get_ventas_por_dia(cliente_id)
+
+    def show_client_details(self, result):
+        stats, ventas = result
         self.stats_label.config(text=f"Compras: {stats['purchases_count']}  —  Ganancias: ${stats['total_revenue']:.2f}")
-        # ventas por día
-        ventas = self.backend.get_ventas_por_dia(cliente_id)
         for i in self.ventas_tree.get_children():
             self.ventas_tree.delete(i)
         for v in ventas:
             self.ventas_tree.insert("", tk.END, values=(v["day"], v["sales_count"], f"${v['total_sum']:.2f}"))
 
+    def on_details_error(self, error):
+        self.stats_label.config(text="Selecciona un cliente")
+        messagebox.showerror("Error", f"No se pudieron cargar las estadísticas: {error}")
+
     def toggle_active(self):
         selected = self.clients_tree.selection()
         if not selected:
             return
         cliente_id = int(selected[0])
-        try:
-            new_state = self.backend.toggle_cliente_active(cliente_id)
+
+        def on_success(new_state):
+            get_app_context().mark_changed("clientes")
             self.load_clients()
             state_text = "Activo" if new_state == 1 else "Inactivo"
             messagebox.showinfo("OK", f"Cliente ahora: {state_text}")
-        except Exception as e:
+
+        def on_error(e):
             messagebox.showerror("Error", f"No se pudo cambiar estado: {e}")
 
+        get_task_runner(self).submit(
+            self.backend.toggle_cliente_active, cliente_id,
+            on_success=on_success, on_error=on_error, busy=self.toggle_btn,
+        )
+
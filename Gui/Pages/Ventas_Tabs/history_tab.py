@@ -1,44 +1,143 @@
 import tkinter as tk
+from datetime import datetime
 from tkinter import ttk, messagebox
 from Core.ventas_backend import VentasBackend
+from Gui.task_runner import get_task_runner
+from Gui.virtual_table import VirtualTable, Column
+
+TODOS = "Todos"
+
+
+def _money(value, row):
+    return f"${float(value or 0):.2f}"
+
 
 class HistorialTab(ttk.Frame):
     tab_name = "Historial"
-    
+
     def __init__(self, parent, backend: VentasBackend):
         super().__init__(parent)
         self.backend = backend
+        self.loaded_count = 0
+        self.filtros = {}
+        self.clientes = {}
+        self.productos = {}
         self.setup_ui()
+        # Los datos se cargan al seleccionar el tab (LazyNotebook)
+
+    def load_data(self):
+        self.load_filter_options()
         self.load_historial()
 
     def setup_ui(self):
         frame = ttk.Frame(self)
         frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
-        cols = ("Fecha", "Cliente", "Producto", "Cantidad", "Precio/u", "Total")
-        self.tree = ttk.Treeview(frame, columns=cols, show="headings", height=15, style="Modern.Treeview")
-        for c in cols:
-            self.tree.heading(c, text=c)
-        self.tree.column("Fecha", width=140)
-        self.tree.column("Cliente", width=160)
-        self.tree.column("Producto", width=160)
-        self.tree.column("Cantidad", width=80, anchor=tk.E)
-        self.tree.column("Precio/u", width=100, anchor=tk.E)
-        self.tree.column("Total", width=100, anchor=tk.E)
-        self.tree.pack(fill=tk.BOTH, expand=True)
 
-    def load_historial(self):
+        # Filtros
+        filtros = ttk.Frame(frame)
+        filtros.pack(fill=tk.X, pady=(0, 10))
+        ttk.Label(filtros, text="Cliente:").pack(side=tk.LEFT)
+        self.cliente_combo = ttk.Combobox(filtros, state="readonly", width=18)
+        self.cliente_combo.pack(side=tk.LEFT, padx=(5, 10))
+        ttk.Label(filtros, text="Producto:").pack(side=tk.LEFT)
+        self.producto_combo = ttk.Combobox(filtros, state="readonly", width=18)
+        self.producto_combo.pack(side=tk.LEFT, padx=(5, 10))
+        ttk.Label(filtros, text="Desde:").pack(side=tk.LEFT)
+        self.desde_entry = ttk.Entry(filtros, width=11)
+        self.desde_entry.pack(side=tk.LEFT, padx=(5, 10))
+        ttk.Label(filtros, text="Hasta:").pack(side=tk.LEFT)
+        self.hasta_entry = ttk.Entry(filtros, width=11)
+        self.hasta_entry.pack(side=tk.LEFT, padx=(5, 10))
+        ttk.Button(filtros, text="Filtrar", command=self.apply_filters, style="Primary.TButton").pack(side=tk.LEFT, padx=5)
+        ttk.Button(filtros, text="Limpiar", command=self.clear_filters).pack(side=tk.LEFT)
+
+        # Tabla virtualizada con scroll infinito sobre el historial paginado
+        self.table = VirtualTable(frame, [
+            Column("fecha_venta", "Fecha", width=140, fmt=lambda v, r: str(v)),
+            Column("cliente", "Cliente", width=160),
+            Column("producto", "Producto", width=160),
+            Column("cantidad_vendida", "Cantidad", width=80, anchor=tk.E),
+            Column("precio_unitario_venta", "Precio/u", width=100, anchor=tk.E, fmt=_money),
+            Column("total_venta", "Total", width=100, anchor=tk.E, fmt=_money),
+        ], height=15, style="Modern.Treeview")
+        self.table.pack(fill=tk.BOTH, expand=True)
+
+        self.status_label = ttk.Label(frame, text="")
+        self.status_label.pack(anchor=tk.W, pady=(5, 0))
+
+    def load_filter_options(self):
+        self.cliente_combo.set(TODOS)
+        self.producto_combo.set(TODOS)
+        get_task_runner(self).submit(
+            self.fetch_filter_options,
+            on_success=self.show_filter_options, on_error=self.on_filter_error,
+            key="historial.filtros", busy=[self.cliente_combo, self.producto_combo],
+        )
+
+    def fetch_filter_options(self):
+        # Corre en el pool de TaskRunner: no tocar widgets acá
+        clientes = {c["nombre"]: c["id"] for c in self.backend.get_clientes()}
+        productos = {p["nombre"]: p["id"] for p in self.backend.get_productos_con_costo()}
+        return clientes, productos
+
+    def show_filter_options(self, result):
+        self.clientes, self.productos = result
+        self.cliente_combo["values"] = [TODOS] + list(self.clientes)
+        self.producto_combo["values"] = [TODOS] + list(self.productos)
+
+    def on_filter_error(self, e):
+        self.cliente_combo["values"] = [TODOS] + list(self.clientes)
+        self.producto_combo["values"] = [TODOS] + list(self.productos)
+        messagebox.showerror("Error", f"No se pudieron cargar los filtros: {e}")
+
+    def _parse_fecha(self, entry, nombre):
+        texto = entry.get().strip()
+        if not texto:
+            return None
+        try:
+            return datetime.strptime(texto, "%Y-%m-%d").date()
+        except ValueError:
+            raise ValueError(f"Fecha '{nombre}' inválida, usa AAAA-MM-DD")
+
+    def apply_filters(self):
         try:
-            rows = self.backend.get_historial_ventas()
-            for i in self.tree.get_children():
-                self.tree.delete(i)
-            for r in rows:
-                self.tree.insert("", tk.END, values=(
-                    str(r.get("fecha_venta")),
-                    r.get("cliente"),
-                    r.get("producto"),
-                    r.get("cantidad_vendida"),
-                    f"${float(r.get('precio_unitario_venta') or 0):.2f}",
-                    f"${float(r.get('total_venta') or 0):.2f}"
-                ))
-        except Exception as e:
-            messagebox.showerror("Error", f"No se pudo cargar historial: {e}")
\ No newline at end of file
+            self.filtros = {
+                "cliente_id": self.clientes.get(self.cliente_combo.get()),
+                "producto_final_id": self.productos.get(self.producto_combo.get()),
+                "desde": self._parse_fecha(self.desde_entry, "desde"),
+                "hasta": self._parse_fecha(self.hasta_entry, "hasta"),
+            }
+        except ValueError as e:
+            messagebox.showwarning("Aviso", str(e))
+            return
+        self.load_historial()
+
+    def clear_filters(self):
+        self.cliente_combo.set(TODOS)
+        self.producto_combo.set(TODOS)
+        self.desde_entry.delete(0, tk.END)
+        self.hasta_entry.delete(0, tk.END)
+        self.filtros = {}
+        self.load_historial()
+
+    def load_historial(self):
+        """Vuelve a la primera página con los filtros actuales."""
+        self.status_label.config(text="Cargando...")
+        self.table.set_page_source(
+            self.fetch_page, runner=get_task_runner(self),
+            on_page=self.on_page_loaded, on_error=self.on_page_error,
+        )
+
+    def fetch_page(self, after):
+        # Corre en el pool de TaskRunner: no tocar widgets acá
+        return self.backend.get_historial_ventas_page(after=after, **self.filtros)
+
+    def on_page_loaded(self, page, first):
+        self.loaded_count = (0 if first else self.loaded_count) + len(page["rows"])
+        self.status_label.config(
+            text=f"{self.loaded_count} ventas cargadas" + (" (desplázate para ver más)" if page["next_cursor"] else "")
+        )
+
+    def on_page_error(self, error):
+        self.status_label.config(text="")
+        messagebox.showerror("Error", f"No se pudo cargar historial: {error}")
@@ -1,6 +1,8 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 from Core.ventas_backend import VentasBackend
+from Core.app_context import get_app_context
+from Gui.task_runner import get_task_runner
 
 class PreciosTab(ttk.Frame):
     tab_name = "Precios"
@@ -10,6 +12,9 @@ class PreciosTab(ttk.Frame):
         self.backend = backend
         self.editing_entry = None
         self.setup_ui()
+        # Los datos se cargan al seleccionar el tab (LazyNotebook)
+
+    def load_data(self):
         self.load_precios()
 
     def setup_ui(self):
@@ -34,26 +39,32 @@ class PreciosTab(ttk.Frame):
         self.precios_tree.bind("<Double-1>", self.on_double_click)
 
         #boton para refrescar 
-        refresh_btn = tk.Button(self, text="Actualizar", command=self.load_precios)
-        refresh_btn.pack(pady=5)
+        self.refresh_btn = tk.Button(self, text="Actualizar", command=self.load_precios)
+        self.refresh_btn.pack(pady=5)
         
     def load_precios(self):
-        try:
-            productos = self.backend.get_productos_con_costo()
-            # Clear
-            for i in self.precios_tree.get_children():
-                self.precios_tree.delete(i)
-            for p in productos:
-                pid = p.get("id")
-                costo = p.get("costo_unitario", 0.0)
-                venta = p.get("precio_venta", 0.0) or 0.0
-                gan = p.get("ganancia_unitaria", 0.0)
-                pct = p.get("ganancia_pct", None)
-                pct_display = f"{pct:.2f}%" if pct is not None else "-"
-                # Use product id as iid so we can retrieve it later
-                self.precios_tree.insert("", tk.END, iid=str(pid), values=(p.get("nombre"), f"${costo:.2f}", f"${venta:.2f}", f"${gan:.2f}", pct_display))
-        except Exception as e:
-            messagebox.showerror("Error", f"No se pudieron cargar los precios: {e}")
+        get_task_runner(self).submit(
+            self.backend.get_productos_con_costo,
+            on_success=self.show_precios, on_error=self.on_load_error,
+            key="precios.load", busy=self.refresh_btn,
+        )
+
+    def on_load_error(self, e):
+        messagebox.showerror("Error", f"No se pudieron cargar los precios: {e}")
+
+    def show_precios(self, productos):
+        # Clear
+        for i in self.precios_tree.get_children():
+            self.precios_tree.delete(i)
+        for p in productos:
+            pid = p.get("id")
+            costo = p.get("costo_unitario", 0.0)
+            venta = p.get("precio_venta", 0.0) or 0.0
+            gan = p.get("ganancia_unitaria", 0.0)
+            pct = p.get("ganancia_pct", None)
+            pct_display = f"{pct:.2f}%" if pct is not None else "-"
+            # Use product id as iid so we can retrieve it later
+            self.precios_tree.insert("", tk.END, iid=str(pid), values=(p.get("nombre"), f"${costo:.2f}", f"${venta:.2f}", f"${gan:.2f}", pct_display))
 
     def _start_edit_cell(self, item_id, col_name, bbox):
         # Remove previous editing entry if any
@@ -79,6 +90,9 @@ class PreciosTab(ttk.Frame):
         entry.focus_set()
 
         def finish_edit(event=None):
+            # <Return> destroys the entry, which also fires <FocusOut>: save once
+            if self.editing_entry is not entry:
+                return
             new_text = entry.get().strip()
             try:
                 new_price = float(new_text) if new_text != "" else 0.0
@@ -86,33 +100,37 @@ class PreciosTab(ttk.Frame):
                 messagebox.showwarning("Valor inválido", "Ingresa un número válido para precio")
                 entry.focus_set()
                 return
-            # save to DB via backend
-            try:
-                self.backend.set_precio_venta(int(item_id), new_price)
-            except Exception as e:
-                messagebox.showerror("Error", f"No se pudo guardar el precio: {e}")
-                entry.destroy()
-                self.editing_entry = None
-                return
-            # update tree display
-            vals = list(self.precios_tree.item(item_id, "values"))
-            # precio venta is column "Precio Venta"
-            try:
-                col_idx = self.column_ids.index("Precio Venta")
-                vals[col_idx] = f"${new_price:.2f}"
-                self.precios_tree.item(item_id, values=vals)
-            except Exception:
-                pass
-            # notify other tabs that price changed
-            try:
-                # generate virtual event on the notebook (parent) so RegistrarVentaTab can reload
-                if hasattr(self.master, "event_generate"):
-                    self.master.event_generate("<<PrecioActualizado>>")
-            except Exception:
-                pass
             entry.destroy()
             self.editing_entry = None
 
+            def on_success(_):
+                # update tree display
+                vals = list(self.precios_tree.item(item_id, "values"))
+                # precio venta is column "Precio Venta"
+                try:
+                    col_idx = self.column_ids.index("Precio Venta")
+                    vals[col_idx] = f"${new_price:.2f}"
+                    self.precios_tree.item(item_id, values=vals)
+                except Exception:
+                    pass
+                # notify other tabs that price changed
+                get_app_context().mark_changed("precios")
+                try:
+                    # generate virtual event on the notebook (parent) so RegistrarVentaTab can reload
+                    if hasattr(self.master, "event_generate"):
+                        self.master.event_generate("<<PrecioActualizado>>")
+                except Exception:
+                    pass
+
+            def on_error(e):
+                messagebox.showerror("Error", f"No se pudo guardar el precio: {e}")
+
+            # save to DB via backend
+            get_task_runner(self).submit(
+                self.backend.set_precio_venta, int(item_id), new_price,
+                on_success=on_success, on_error=on_error, busy=self.refresh_btn,
+            )
+
         entry.bind("<Return>", finish_edit)
         entry.bind("<FocusOut>", finish_edit)
         self.editing_entry = entry
@@ -1,7 +1,9 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 from Core.ventas_backend import VentasBackend
+from Core.app_context import get_app_context
 from Core.logger import setup_logger
+from Gui.task_runner import get_task_runner
 
 
 class RegistrarVentaTab(ttk.Frame):
@@ -28,9 +30,12 @@ class RegistrarVentaTab(ttk.Frame):
         self.selected_client_name = None
         
         self.setup_ui()
+        # Los datos se cargan al seleccionar el tab (LazyNotebook)
+        self.logger.info("RegistrarVentaTab initialized")
+
+    def load_data(self):
         self.load_products()
         self.load_clients()
-        self.logger.info("RegistrarVentaTab initialized")
 
     def setup_ui(self):
         """Configurar la interfaz de usuario."""
@@ -71,7 +76,7 @@ class RegistrarVentaTab(ttk.Frame):
         left_panel.pack(side=tk.LEFT, fill=tk. BOTH, expand=True, padx=(0, 10))
         
         # Botón para agregar producto
-        add_product_btn = tk.Button(
+        self.add_product_btn = tk.Button(
             left_panel,
             text="➕ Agregar Producto",
             command=self.add_item,
@@ -83,7 +88,7 @@ class RegistrarVentaTab(ttk.Frame):
             relief=tk.FLAT,
             cursor="hand2"
         )
-        add_product_btn.pack(fill=tk.X, pady=(0, 10))
+        self.add_product_btn.pack(fill=tk.X, pady=(0, 10))
         
         # Frame para tabla con scrollbar
         tree_frame = ttk.Frame(left_panel)
@@ -247,7 +252,7 @@ class RegistrarVentaTab(ttk.Frame):
         buttons_frame = tk.Frame(footer, bg="white")
         buttons_frame. pack(fill=tk.X)
         
-        register_btn = tk.Button(
+        self.register_btn = tk.Button(
             buttons_frame,
             text="✅ Registrar Venta",
             command=self.submit_sale,
@@ -259,9 +264,9 @@ class RegistrarVentaTab(ttk.Frame):
             relief=tk.FLAT,
             cursor="hand2"
         )
-        register_btn.pack(side=tk.LEFT, padx=5)
+        self.register_btn.pack(side=tk.LEFT, padx=5)
         
-        clear_btn = tk.Button(
+        self.clear_btn = tk.Button(
             buttons_frame,
             text="🔄 Limpiar",
             command=self.clear_form,
@@ -273,52 +278,62 @@ class RegistrarVentaTab(ttk.Frame):
             relief=tk.FLAT,
             cursor="hand2"
         )
-        clear_btn.pack(side=tk.LEFT, padx=5)
+        self.clear_btn.pack(side=tk.LEFT, padx=5)
 
     def load_products(self):
         """Cargar productos disponibles."""
-        try:
-            prods = self.backend.get_productos_con_costo()
-            self.product_map. clear()
-            self.product_display_list = []
-            self.display_to_name = {}
-            
-            for p in prods:
-                name = p.get("nombre", "")
-                self.product_map[name] = p
-                display = f"{name} — ${p.get('precio_venta', 0):.2f}"
-                self.product_display_list.append(display)
-                self.display_to_name[display] = name
-            
-            self.logger.info(f"Cargados {len(self.product_map)} productos")
-            
-        except Exception as e:
+        def on_error(e):
             messagebox.showerror("Error", f"No se pudieron cargar productos: {e}")
             self.logger.error(f"Error al cargar productos: {e}")
 
+        get_task_runner(self).submit(
+            self.backend.get_productos_con_costo,
+            on_success=self.show_products, on_error=on_error,
+            key="registrar_venta.productos", busy=self.add_product_btn,
+        )
+
+    def show_products(self, prods):
+        self.product_map. clear()
+        self.product_display_list = []
+        self.display_to_name = {}
+        
+        for p in prods:
+            name = p.get("nombre", "")
+            self.product_map[name] = p
+            display = f"{name} — ${p.get('precio_venta', 0):.2f}"
+            self.product_display_list.append(display)
+            self.display_to_name[display] = name
+        
+        self.logger.info(f"Cargados {len(self.product_map)} productos")
+
     def load_clients(self):
         """Cargar clientes activos."""
-        try:
-            for item in self.clients_tree.get_children():
-                self.clients_tree.delete(item)
-            
-            rows = self.backend.get_clientes_activos()
-            self.client_name_to_id = {r["nombre"]: r["id"] for r in rows}
-            
-            for client in rows:
-                self.clients_tree.insert(
-                    "",
-                    tk.END,
-                    iid=str(client["id"]),
-                    values=(client["nombre"], "✅ Activo")
-                )
-            
-            self.logger.info(f"Cargados {len(rows)} clientes")
-            
-        except Exception as e:
+        def on_error(e):
             messagebox.showerror("Error", f"No se pudieron cargar clientes: {e}")
             self.logger. error(f"Error al cargar clientes: {e}")
 
+        get_task_runner(self).submit(
+            self.backend.get_clientes_activos,
+            on_success=self.show_clients, on_error=on_error,
+            key="registrar_venta.clientes", busy=self.register_btn,
+        )
+
+    def show_clients(self, rows):
+        for item in self.clients_tree.get_children():
+            self.clients_tree.delete(item)
+        
+        self.client_name_to_id = {r["nombre"]: r["id"] for r in rows}
+        
+        for client in rows:
+            self.clients_tree.insert(
+                "",
+                tk.END,
+                iid=str(client["id"]),
+                values=(client["nombre"], "✅ Activo")
+            )
+        
+        self.logger.info(f"Cargados {len(rows)} clientes")
+
     def on_client_select(self, event):
         """Manejar selección de cliente."""
         selection = self.clients_tree.selection()
@@ -650,35 +665,40 @@ class RegistrarVentaTab(ttk.Frame):
             messagebox. showwarning("Aviso", "Agrega al menos un producto")
             return
         
-        try:
-            # Preparar items
-            items = [
-                {
-                    'product_id': r['product_id'],
-                    'quantity': r['quantity'],
-                    'unit_price': r['unit_price']
-                }
-                for r in self.item_rows
-            ]
-            
-            # Registrar en backend
-            result = self.backend.crear_venta_multiple(self.selected_client_id, items)
-            total = result. get('total', 0)
-            
+        # Preparar items
+        items = [
+            {
+                'product_id': r['product_id'],
+                'quantity': r['quantity'],
+                'unit_price': r['unit_price']
+            }
+            for r in self.item_rows
+        ]
+        client_name = self.selected_client_name
+
+        def on_success(result):
+            get_app_context().mark_changed("ventas")
+            total = result.get('total', 0)
             messagebox.showinfo(
                 "✅ Éxito",
                 f"Venta registrada exitosamente\n\n"
-                f"Cliente: {self.selected_client_name}\n"
+                f"Cliente: {client_name}\n"
                 f"Total: ${total:.2f}"
             )
-            
             self.clear_form()
-            self.logger.info(f"Venta registrada - {self.selected_client_name}:  ${total:.2f}")
-            
-        except Exception as e:
+            self.logger.info(f"Venta registrada - {client_name}:  ${total:.2f}")
+
+        def on_error(e):
             messagebox.showerror("Error", f"No se pudo registrar:  {str(e)}")
             self.logger.error(f"Error al registrar venta: {e}")
 
+        # Registrar en backend (los botones quedan deshabilitados hasta que termine)
+        get_task_runner(self).submit(
+            self.backend.crear_venta_multiple, self.selected_client_id, items,
+            on_success=on_success, on_error=on_error,
+            busy=[self.register_btn, self.clear_btn],
+        )
+
     def clear_form(self):
         """Limpiar formulario."""
         for item in self.products_tree.get_children():
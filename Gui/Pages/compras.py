@@ -1,15 +1,20 @@
 import tkinter as tk
+from datetime import datetime
 from tkinter import ttk, messagebox
 from Gui.Pages.Styles.compras_styles import CompraStyles
-from Core.compras_backend import ComprasBackend
+from Core.app_context import get_app_context
 from Core.logger import setup_logger
+from Core.units import unit_choices
+from Gui.task_runner import get_task_runner
+from Gui.virtual_table import VirtualTable, Column
 
 class ComprasFrame(ttk.Frame):
     def __init__(self, parent):
         super().__init__(parent)
-        self.backend = ComprasBackend()
+        self.backend = get_app_context().compras
         self.styles = CompraStyles()
         self.logger = setup_logger()
+        self.filtros = {}
         self.setup_ui()
 
     def setup_ui(self):
@@ -47,7 +52,7 @@ class ComprasFrame(ttk.Frame):
         self.cantidad_entry = ttk.Entry(self.granel_frame)
         self.cantidad_entry.grid(row=0, column=1, pady=2)
         ttk.Label(self.granel_frame, text="Unidad:").grid(row=0, column=2, sticky=tk.W, pady=2)
-        self.unidad_combo = ttk.Combobox(self.granel_frame, values=["g", "kg", "lb", "oz", "ml", "liters", "units"])
+        self.unidad_combo = ttk.Combobox(self.granel_frame, values=unit_choices())
         self.unidad_combo.grid(row=0, column=3, pady=2)
         ttk.Label(self.granel_frame, text="Precio Compra:").grid(row=1, column=0, sticky=tk.W, pady=2)
         self.precio_entry = ttk.Entry(self.granel_frame)
@@ -65,33 +70,54 @@ class ComprasFrame(ttk.Frame):
         self.peso_paq_entry = ttk.Entry(self.paquetes_frame)
         self.peso_paq_entry.grid(row=2, column=1, pady=2)
         ttk.Label(self.paquetes_frame, text="Unidad de Peso:").grid(row=2, column=2, sticky=tk.W, pady=2)
-        self.unidad_peso_combo = ttk.Combobox(self.paquetes_frame, values=["g", "kg", "lb", "oz", "ml", "units"])
+        self.unidad_peso_combo = ttk.Combobox(self.paquetes_frame, values=unit_choices())
         self.unidad_peso_combo.grid(row=2, column=3, pady=2)
 
         # History treeview
         history_frame = ttk.Frame(main_card)
         history_frame.pack(pady=10, padx=25, fill=tk.BOTH, expand=True)
         ttk.Label(history_frame, text="Historial de Compras", font=("Segoe UI", 14, "bold")).pack(pady=5)
-        columns = ("Producto", "Cantidad", "Unidad", "Precio Compra", "Precio Total", "Proveedor", "Tipo", "Fecha")
-        self.history_tree = ttk.Treeview(history_frame, columns=columns, show="headings", height=10, style="Modern.Treeview")
-        for col in columns:
-            self.history_tree.heading(col, text=col)
-            self.history_tree.column(col, width=100)
-        self.history_tree.pack(fill=tk.BOTH, expand=True)
+
+        filter_frame = ttk.Frame(history_frame)
+        filter_frame.pack(fill=tk.X, pady=(0, 5))
+        ttk.Label(filter_frame, text="Producto:").pack(side=tk.LEFT)
+        self.filtro_producto_entry = ttk.Entry(filter_frame, width=16)
+        self.filtro_producto_entry.pack(side=tk.LEFT, padx=(5, 10))
+        ttk.Label(filter_frame, text="Proveedor:").pack(side=tk.LEFT)
+        self.filtro_proveedor_entry = ttk.Entry(filter_frame, width=16)
+        self.filtro_proveedor_entry.pack(side=tk.LEFT, padx=(5, 10))
+        ttk.Label(filter_frame, text="Desde:").pack(side=tk.LEFT)
+        self.filtro_desde_entry = ttk.Entry(filter_frame, width=11)
+        self.filtro_desde_entry.pack(side=tk.LEFT, padx=(5, 10))
+        ttk.Label(filter_frame, text="Hasta:").pack(side=tk.LEFT)
+        self.filtro_hasta_entry = ttk.Entry(filter_frame, width=11)
+        self.filtro_hasta_entry.pack(side=tk.LEFT, padx=(5, 10))
+        ttk.Button(filter_frame, text="Filtrar", command=self.apply_filters, style="Secondary.TButton").pack(side=tk.LEFT, padx=5)
+        ttk.Button(filter_frame, text="Limpiar", command=self.clear_filters).pack(side=tk.LEFT)
+
+        self.history_table = VirtualTable(history_frame, [
+            Column("producto", "Producto"),
+            Column("cantidad", "Cantidad"),
+            Column("unidad", "Unidad"),
+            Column("precio_compra", "Precio Compra"),
+            Column("precio_total", "Precio Total"),
+            Column("proveedor", "Proveedor"),
+            Column("tipo", "Tipo"),
+            Column("fecha", "Fecha"),
+        ], height=10, style="Modern.Treeview")
+        self.history_table.pack(fill=tk.BOTH, expand=True)
 
         # Buttons with modern styling
         button_frame = ttk.Frame(form_card)
         button_frame.pack(pady=(10, 15))
-        ttk.Button(button_frame, text="Guardar Compra", command=self.save_purchase, style="Primary.TButton").pack(side=tk.LEFT, padx=(0, 10))
+        self.save_btn = ttk.Button(button_frame, text="Guardar Compra", command=self.save_purchase, style="Primary.TButton")
+        self.save_btn.pack(side=tk.LEFT, padx=(0, 10))
         ttk.Button(button_frame, text="Cargar Historial", command=self.load_history, style="Secondary.TButton").pack(side=tk.LEFT)
 
         # Initialize form fields visibility
         self.update_fields()
         self.load_history()
 
-        self.update_fields()
-        self.load_history()
-
     def update_fields(self):
         tipo = self.tipo_var.get()
         if tipo == "granel":
@@ -105,38 +131,95 @@ class ComprasFrame(ttk.Frame):
         nombre = self.nombre_entry.get()
         proveedor = self.proveedor_entry.get()
         tipo = self.tipo_var.get()
-        try:
-            if tipo == "granel":
-                cantidad = self.cantidad_entry.get()
-                unidad = self.unidad_combo.get()
-                precio_compra = self.precio_entry.get()
-                self.backend.save_purchase(tipo, nombre, proveedor, cantidad=cantidad, unidad=unidad, precio_compra=precio_compra)
-            else:
-                cantidad_paq = self.cantidad_paq_entry.get()
-                precio_paq = self.precio_paq_entry.get()
-                peso_paq = self.peso_paq_entry.get()
-                unidad_peso = self.unidad_peso_combo.get()
-                self.backend.save_purchase(tipo, nombre, proveedor, cantidad_paq=cantidad_paq, precio_paq=precio_paq, peso_paq=peso_paq, unidad_peso=unidad_peso)
-            messagebox.showinfo("Éxito", "Compra guardada exitosamente")
-            self.clear_form()
-            self.load_history()
-        except ValueError as e:
+        # Los valores se leen acá: el guardado corre en el pool y no toca widgets
+        if tipo == "granel":
+            campos = dict(
+                cantidad=self.cantidad_entry.get(),
+                unidad=self.unidad_combo.get(),
+                precio_compra=self.precio_entry.get(),
+            )
+        else:
+            campos = dict(
+                cantidad_paq=self.cantidad_paq_entry.get(),
+                precio_paq=self.precio_paq_entry.get(),
+                peso_paq=self.peso_paq_entry.get(),
+                unidad_peso=self.unidad_peso_combo.get(),
+            )
+        get_task_runner(self).submit(
+            self.backend.save_purchase, tipo, nombre, proveedor, **campos,
+            on_success=self.on_purchase_saved,
+            on_error=self.on_purchase_error,
+            busy=self.save_btn,
+        )
+
+    def on_purchase_saved(self, compra):
+        get_app_context().mark_changed("compras", "inventario")
+        messagebox.showinfo("Éxito", "Compra guardada exitosamente")
+        self.clear_form()
+        self.prepend_purchase(compra)
+
+    def on_purchase_error(self, e):
+        if isinstance(e, ValueError):
             messagebox.showerror("Error", str(e))
-        except Exception as e:
+        else:
             messagebox.showerror("Error", f"Error al guardar la compra: {e}")
 
-    def load_history(self):
+    def _parse_fecha(self, entry, nombre):
+        texto = entry.get().strip()
+        if not texto:
+            return None
+        try:
+            return datetime.strptime(texto, "%Y-%m-%d").date()
+        except ValueError:
+            raise ValueError(f"Fecha '{nombre}' inválida, usa AAAA-MM-DD")
+
+    def apply_filters(self):
         try:
-            history = self.backend.get_purchase_history()
-            for item in self.history_tree.get_children():
-                self.history_tree.delete(item)
-            for purchase in history:
-                self.history_tree.insert("", tk.END, values=(
-                    purchase['producto'], purchase['cantidad'], purchase['unidad'],
-                    purchase['precio_compra'], purchase['precio_total'], purchase['proveedor'], purchase['tipo'], purchase['fecha']
-                ))
-        except Exception as e:
-            messagebox.showerror("Error", f"Error al cargar el historial: {e}")
+            self.filtros = {
+                "producto": self.filtro_producto_entry.get().strip() or None,
+                "proveedor": self.filtro_proveedor_entry.get().strip() or None,
+                "desde": self._parse_fecha(self.filtro_desde_entry, "desde"),
+                "hasta": self._parse_fecha(self.filtro_hasta_entry, "hasta"),
+            }
+        except ValueError as e:
+            messagebox.showwarning("Aviso", str(e))
+            return
+        self.load_history()
+
+    def clear_filters(self):
+        for entry in (self.filtro_producto_entry, self.filtro_proveedor_entry, self.filtro_desde_entry, self.filtro_hasta_entry):
+            entry.delete(0, tk.END)
+        self.filtros = {}
+        self.load_history()
+
+    def load_history(self):
+        """Vuelve a la primera página del historial con los filtros actuales."""
+        self.history_table.set_page_source(
+            self.fetch_history_page, runner=get_task_runner(self), on_error=self.on_history_error
+        )
+
+    def fetch_history_page(self, after):
+        # Corre en el pool de TaskRunner
+        return self.backend.get_purchase_history_page(after=after, **self.filtros)
+
+    def on_history_error(self, e):
+        messagebox.showerror("Error", f"Error al cargar el historial: {e}")
+
+    def _matches_filters(self, purchase):
+        f = self.filtros
+        fecha = purchase['fecha'].date() if purchase.get('fecha') else None
+        return (
+            (not f.get("producto") or purchase['producto'] == f["producto"])
+            and (not f.get("proveedor") or purchase['proveedor'] == f["proveedor"])
+            and (not f.get("desde") or (fecha and fecha >= f["desde"]))
+            and (not f.get("hasta") or (fecha and fecha <= f["hasta"]))
+        )
+
+    def prepend_purchase(self, purchase):
+        """Agrega arriba la compra recién guardada sin recargar el historial."""
+        if not purchase or not self._matches_filters(purchase):
+            return
+        self.history_table.prepend_row(purchase)
 
     def clear_form(self):
         self.nombre_entry.delete(0, tk.END)
@@ -4,16 +4,22 @@ Página de Producción - Gestión de subproductos y productos finales
 
 import tkinter as tk
 from tkinter import ttk, messagebox
-from Core.produccion_backend import ProduccionBackend
-from Core.inventario_backend import InventarioBackend
+from Core.app_context import get_app_context
 from Core.logger import setup_logger
+from Core.units import unit_choices
+from Gui.task_runner import get_task_runner
+from Gui.virtual_table import VirtualTable, Column
 
 
 class ProduccionFrame(ttk.Frame):
+    # Datos de otras páginas que muestra; si cambian mientras está oculta, refresh()
+    datasets = ("inventario", "precios")
+
     def __init__(self, parent):
         super().__init__(parent)
-        self.backend = ProduccionBackend()
-        self.inv_backend = InventarioBackend()
+        context = get_app_context()
+        self.backend = context.produccion
+        self.inv_backend = context.inventario
         self.logger = setup_logger()
 
         # Estado
@@ -22,6 +28,7 @@ class ProduccionFrame(ttk.Frame):
         self.selected_subproducto_data = None
         self.subproductos_map = {}
         self.productos_finales_map = {}
+        self.runner = get_task_runner(self)
 
         self.setup_ui()
         self.load_ingredient_combo()
@@ -101,7 +108,7 @@ class ProduccionFrame(ttk.Frame):
         ttk.Label(ing_frame, text="Unidad: ").grid(row=0, column=4, sticky="w", padx=2)
         self.ing_unidad_combo = ttk.Combobox(
             ing_frame,
-            values=["g", "kg", "ml", "L", "units"],
+            values=unit_choices(),
             state="readonly",
             width=10
         )
@@ -132,14 +139,24 @@ class ProduccionFrame(ttk.Frame):
         self.ingredientes_tree.column("Unidad", width=70)
         self.ingredientes_tree.column("❌", width=30)
 
-        self.ingredientes_tree.pack(fill=tk. BOTH, expand=True, pady=(0, 15))
+        self.ingredientes_tree.pack(fill=tk. BOTH, expand=True, pady=(0, 5))
         self.ingredientes_tree.bind("<Button-3>", self.on_ingrediente_right_click)
 
+        # Previsualización del costo de la receta (no consume stock)
+        self.costo_preview_label = tk.Label(
+            left_panel,
+            text="Costo estimado: -",
+            font=("Segoe UI", 9, "bold"),
+            bg="white",
+            fg="#0078d4"
+        )
+        self.costo_preview_label.pack(anchor="w", pady=(0, 10))
+
         # Botones
         btn_frame = tk. Frame(left_panel, bg="white")
         btn_frame.pack(fill=tk.X)
 
-        tk.Button(
+        self.create_sub_btn = tk.Button(
             btn_frame,
             text="✅ Crear Subproducto",
             command=self.create_subproducto,
@@ -149,7 +166,8 @@ class ProduccionFrame(ttk.Frame):
             padx=15,
             pady=8,
             relief=tk. FLAT
-        ).pack(side=tk.LEFT, padx=5)
+        )
+        self.create_sub_btn.pack(side=tk.LEFT, padx=5)
 
         tk.Button(
             btn_frame,
@@ -179,19 +197,13 @@ class ProduccionFrame(ttk.Frame):
         )
         sub_card.pack(fill=tk.BOTH, expand=True, pady=(0, 10))
 
-        cols = ("Nombre", "Costo", "Acción")
-        self.subproductos_tree = ttk. Treeview(sub_card, columns=cols, show="headings", height=5)
-        self.subproductos_tree.heading("Nombre", text="📦 Nombre")
-        self.subproductos_tree.heading("Costo", text="Costo Total")
-        self.subproductos_tree.heading("Acción", text="")
-
-        self.subproductos_tree.column("Nombre", width=200)
-        self.subproductos_tree.column("Costo", width=100)
-        self.subproductos_tree.column("Acción", width=50)
-
-        self.subproductos_tree.pack(fill=tk.BOTH, expand=True, pady=(0, 10))
-        self.subproductos_tree.bind("<<TreeviewSelect>>", self. on_subproducto_select)
-        self.subproductos_tree.bind("<Button-3>", self.on_subproducto_right_click)
+        self.subproductos_table = VirtualTable(sub_card, [
+            Column("nombre", "📦 Nombre", width=200),
+            Column("costo_total_subproducto", "Costo Total", width=100, fmt=lambda v, r: f"${v or 0:.2f}"),
+            Column("accion", "", width=50, fmt=lambda v, r: "🗑️", sortable=False),
+        ], height=5, on_select=self.on_subproducto_select)
+        self.subproductos_table.pack(fill=tk.BOTH, expand=True, pady=(0, 10))
+        self.subproductos_table.tree.bind("<Button-3>", self.on_subproducto_right_click)
 
         # Info subproducto
         info_frame = tk.Frame(sub_card, bg="white")
@@ -210,7 +222,7 @@ class ProduccionFrame(ttk.Frame):
         self.cantidad_producir_entry.insert(0, "1")
         self.cantidad_producir_entry.pack(anchor="w", padx=10, pady=(5, 10))
 
-        tk.Button(
+        self.produce_btn = tk.Button(
             sub_card,
             text="🚀 Producir Subproducto",
             command=self.produce_subproducto,
@@ -220,7 +232,8 @@ class ProduccionFrame(ttk.Frame):
             padx=20,
             pady=8,
             relief=tk. FLAT
-        ).pack(fill=tk.X)
+        )
+        self.produce_btn.pack(fill=tk.X)
 
         # --- Productos Finales (Inferior) ---
         prod_card = tk.LabelFrame(
@@ -251,7 +264,7 @@ class ProduccionFrame(ttk.Frame):
         self.prod_unidades_entry.insert(0, "1")
         self.prod_unidades_entry.pack(anchor="w", pady=(0, 10))
 
-        tk.Button(
+        self.create_prod_btn = tk.Button(
             form_frame,
             text="➕ Crear Producto Final",
             command=self.create_producto_final,
@@ -261,129 +274,108 @@ class ProduccionFrame(ttk.Frame):
             padx=15,
             pady=8,
             relief=tk.FLAT
-        ).pack(anchor="w")
+        )
+        self.create_prod_btn.pack(anchor="w")
 
         # Tabla de productos finales
         tk.Label(prod_card, text="Productos Creados:", font=("Segoe UI", 9, "bold"), bg="white").pack(anchor="w", pady=(15, 5))
 
-        cols = ("Nombre", "Subproducto", "Unidades", "Costo Unit.", "Precio", "Margen", "")
-        self.productos_tree = ttk.Treeview(prod_card, columns=cols, show="headings", height=4)
-        self.productos_tree.heading("Nombre", text="📦 Nombre")
-        self.productos_tree.heading("Subproducto", text="Subproducto")
-        self.productos_tree.heading("Unidades", text="Unid.")
-        self.productos_tree.heading("Costo Unit.", text="Costo Unit.")
-        self.productos_tree.heading("Precio", text="Precio")
-        self.productos_tree.heading("Margen", text="Margen %")
-        self.productos_tree.heading("", text="")
-
-        self.productos_tree.column("Nombre", width=100)
-        self.productos_tree.column("Subproducto", width=90)
-        self.productos_tree.column("Unidades", width=50)
-        self.productos_tree.column("Costo Unit.", width=70)
-        self.productos_tree.column("Precio", width=70)
-        self.productos_tree.column("Margen", width=60)
-        self.productos_tree.column("", width=30)
-
-        self.productos_tree.pack(fill=tk. BOTH, expand=True)
-        self.productos_tree. bind("<Button-3>", self.on_producto_right_click)
+        def si_tiene_precio(texto):
+            return lambda v, r: texto.format(float(v or 0)) if float(r.get('precio_venta') or 0) > 0 else "-"
+
+        self.productos_table = VirtualTable(prod_card, [
+            Column("nombre", "📦 Nombre", width=100),
+            Column("subproducto_nombre", "Subproducto", width=90),
+            Column("unidades_producidas", "Unid.", width=50, fmt=lambda v, r: int(v or 1)),
+            Column("costo_por_unidad", "Costo Unit.", width=70, fmt=lambda v, r: f"${float(v or 0):.4f}"),
+            Column("precio_venta", "Precio", width=70, fmt=si_tiene_precio("${:.2f}")),
+            Column("margen_ganancia", "Margen %", width=60, fmt=si_tiene_precio("{:.1f}%")),
+            Column("accion", "", width=30, fmt=lambda v, r: "🗑️", sortable=False),
+        ], height=4)
+        self.productos_table.pack(fill=tk.BOTH, expand=True)
+        self.productos_table.tree.bind("<Button-3>", self.on_producto_right_click)
 
     # ===== MÉTODOS DE CARGA =====
 
+    def refresh(self):
+        """Recargar todo tras cambios en el inventario (p. ej. una compra) o en los precios de venta."""
+        self.load_ingredient_combo()
+        self.load_subproductos()
+        self.load_productos_finales()
+
     def load_ingredient_combo(self):
         """Cargar productos del inventario."""
-        try:
-            inventario = self.inv_backend. get_inventario_para_resumen()
-            productos = [item['producto'] for item in inventario]
-            self.ing_producto_combo['values'] = productos
-        except Exception as e:
+        def on_error(e):
             self.logger.error(f"Error cargando ingredientes: {e}")
 
+        self.runner.submit(
+            self.inv_backend.get_inventario_para_resumen,
+            on_success=self.show_ingredient_combo, on_error=on_error,
+            key="produccion.ingredientes",
+        )
+
+    def show_ingredient_combo(self, inventario):
+        productos = [item['producto'] for item in inventario]
+        self.ing_producto_combo['values'] = productos
+
     def load_subproductos(self):
         """Cargar subproductos disponibles."""
-        try:
-            for item in self.subproductos_tree.get_children():
-                self.subproductos_tree.delete(item)
+        def on_error(e):
+            messagebox.showerror("Error", f"No se pudieron cargar subproductos: {e}")
+            self.logger.error(f"Error cargando subproductos: {e}")
 
-            subproductos = self.backend.get_subproductos_disponibles()
-            self.subproductos_map. clear()
+        self.runner.submit(
+            self.backend.get_subproductos_disponibles,
+            on_success=self.show_subproductos, on_error=on_error,
+            key="produccion.subproductos",
+        )
 
-            # También actualizar combo para productos finales
-            sub_names = []
+    def show_subproductos(self, subproductos):
+        self.subproductos_map. clear()
 
-            for sub in subproductos:
-                sub_id = sub. get('id')
-                self.subproductos_map[sub_id] = sub
-                nombre = sub.get('nombre', '')
-                sub_names.append(nombre)
+        # También actualizar combo para productos finales
+        sub_names = []
 
-                self.subproductos_tree.insert(
-                    "",
-                    tk.END,
-                    iid=str(sub_id),
-                    values=(
-                        nombre,
-                        f"${sub.get('costo_total_subproducto', 0):.2f}",
-                        "🗑️"
-                    )
-                )
+        for sub in subproductos:
+            self.subproductos_map[sub.get('id')] = sub
+            sub_names.append(sub.get('nombre', ''))
 
-            # Actualizar combo de subproductos para productos finales
-            self.prod_subproducto_combo['values'] = sub_names
+        self.subproductos_table.set_rows(subproductos)
 
-            self.logger.info(f"Cargados {len(subproductos)} subproductos")
+        # Actualizar combo de subproductos para productos finales
+        self.prod_subproducto_combo['values'] = sub_names
 
-        except Exception as e:
-            messagebox.showerror("Error", f"No se pudieron cargar subproductos: {e}")
-            self.logger.error(f"Error cargando subproductos: {e}")
+        self.logger.info(f"Cargados {len(subproductos)} subproductos")
 
     def load_productos_finales(self):
         """Cargar productos finales."""
-        try:
-            for item in self.productos_tree.get_children():
-                self.productos_tree.delete(item)
-
-            productos = self.backend.get_productos_finales_info()
-            self.productos_finales_map. clear()
-
-            for prod in productos:
-                prod_id = prod.get('id')
-                self.productos_finales_map[prod_id] = prod
-
-                costo_unit = float(prod.get('costo_unitario', 0))
-                precio = float(prod.get('precio_venta', 0) or 0)
-                margen = float(prod.get('margen_ganancia', 0))
-                unidades = int(prod.get('unidades_producidas', 1))
-
-                self.productos_tree.insert(
-                    "",
-                    tk.END,
-                    iid=str(prod_id),
-                    values=(
-                        prod. get('nombre', ''),
-                        prod.get('subproducto_nombre', ''),
-                        unidades,
-                        f"${costo_unit:.4f}",
-                        f"${precio:.2f}" if precio > 0 else "-",
-                        f"{margen:.1f}%" if precio > 0 else "-",
-                        "🗑️"
-                    )
-                )
-
-            self.logger. info(f"Cargados {len(productos)} productos finales")
-
-        except Exception as e: 
+        def on_error(e):
             messagebox.showerror("Error", f"No se pudieron cargar productos finales: {e}")
             self.logger. error(f"Error cargando productos finales: {e}")
 
+        self.runner.submit(
+            self.backend.get_productos_finales_info,
+            on_success=self.show_productos_finales, on_error=on_error,
+            key="produccion.productos_finales",
+        )
+
+    def show_productos_finales(self, productos):
+        self.productos_finales_map. clear()
+
+        for prod in productos:
+            self.productos_finales_map[prod.get('id')] = prod
+
+        self.productos_table.set_rows(productos)
+
+        self.logger. info(f"Cargados {len(productos)} productos finales")
+
     # ===== EVENTOS DE SELECCIÓN =====
 
-    def on_subproducto_select(self, event):
+    def on_subproducto_select(self, row):
         """Manejar selección de subproducto."""
-        selection = self.subproductos_tree.selection()
-
-        if selection:
+        if row:
             try:
-                sub_id = int(selection[0])
+                sub_id = row.get('id')
                 self.selected_subproducto_id = sub_id
                 self. selected_subproducto_data = self.subproductos_map.get(sub_id)
 
@@ -425,10 +417,33 @@ class ProduccionFrame(ttk.Frame):
             self.ing_producto_combo.set("")
             self.ing_cantidad_entry.delete(0, tk.END)
             self.ing_unidad_combo.set("")
+            self.update_cost_preview()
 
         except Exception as e:
             messagebox.showerror("Error", f"Error:  {e}")
 
+    def update_cost_preview(self):
+        """Actualizar el costo estimado de los ingredientes cargados."""
+        if not self.ingredientes_list:
+            # Descarta un cálculo en curso para la lista anterior
+            self.runner.cancel("produccion.costo_preview")
+            self.costo_preview_label.config(text="Costo estimado: -")
+            return
+
+        def on_success(costo):
+            self.costo_preview_label.config(text=f"Costo estimado: ${costo:.2f}")
+
+        def on_error(e):
+            self.costo_preview_label.config(text="Costo estimado: -")
+            self.logger.warning(f"No se pudo calcular el costo estimado: {e}")
+
+        # Cada cambio en los ingredientes descarta el cálculo anterior
+        self.runner.submit(
+            self.backend.cost_recipe, list(self.ingredientes_list),
+            on_success=on_success, on_error=on_error,
+            key="produccion.costo_preview", busy=self.costo_preview_label,
+        )
+
     def on_ingrediente_right_click(self, event):
         """Click derecho para eliminar ingrediente."""
         item = self.ingredientes_tree. identify('item', event.x, event. y)
@@ -458,6 +473,7 @@ class ProduccionFrame(ttk.Frame):
                 ing for ing in self.ingredientes_list
                 if ing['producto'] != values[0]
             ]
+            self.update_cost_preview()
 
         except Exception as e:
             self.logger.error(f"Error eliminando ingrediente: {e}")
@@ -466,15 +482,14 @@ class ProduccionFrame(ttk.Frame):
 
     def create_subproducto(self):
         """Crear nuevo subproducto."""
-        try:
-            nombre = self.sub_nombre_entry.get().strip()
+        nombre = self.sub_nombre_entry.get().strip()
 
-            if not nombre or not self.ingredientes_list:
-                messagebox.showwarning("Aviso", "Ingresa nombre y al menos un ingrediente")
-                return
-
-            costo = self.backend.crear_subproducto(nombre, self.ingredientes_list)
+        if not nombre or not self.ingredientes_list:
+            messagebox.showwarning("Aviso", "Ingresa nombre y al menos un ingrediente")
+            return
 
+        def on_success(costo):
+            get_app_context().mark_changed("produccion", "inventario")
             messagebox.showinfo(
                 "✅ Éxito",
                 f"Subproducto '{nombre}' creado\nCosto Total: ${costo:.2f}"
@@ -483,33 +498,33 @@ class ProduccionFrame(ttk.Frame):
             self.clear_subproducto()
             self.load_subproductos()
 
-        except Exception as e:
+        def on_error(e):
             messagebox.showerror("Error", f"Error:  {e}")
             self.logger.error(f"Error creando subproducto: {e}")
 
+        self.runner.submit(
+            self.backend.crear_subproducto, nombre, list(self.ingredientes_list),
+            on_success=on_success, on_error=on_error, busy=self.create_sub_btn,
+        )
+
     def produce_subproducto(self):
         """Producir subproducto (consumir ingredientes)."""
         if not self.selected_subproducto_id:
             messagebox.showwarning("Aviso", "Selecciona un subproducto")
             return
 
-        try: 
-            cantidad_str = self.cantidad_producir_entry.get().strip()
-            try:
-                cantidad = int(float(cantidad_str))
-                if cantidad <= 0:
-                    messagebox.showwarning("Aviso", "La cantidad debe ser mayor a 0")
-                    return
-            except ValueError:
-                messagebox.showerror("Error", "Ingresa una cantidad válida")
+        cantidad_str = self.cantidad_producir_entry.get().strip()
+        try:
+            cantidad = int(float(cantidad_str))
+            if cantidad <= 0:
+                messagebox.showwarning("Aviso", "La cantidad debe ser mayor a 0")
                 return
+        except ValueError:
+            messagebox.showerror("Error", "Ingresa una cantidad válida")
+            return
 
-            # Llamar al backend para producir
-            sub_data = self.backend.producir_subproducto(
-                self.selected_subproducto_id,
-                cantidad
-            )
-
+        def on_success(sub_data):
+            get_app_context().mark_changed("produccion", "inventario")
             messagebox.showinfo(
                 "✅ Éxito",
                 f"Subproducto '{sub_data['nombre']}' producido x{cantidad}\n"
@@ -520,21 +535,27 @@ class ProduccionFrame(ttk.Frame):
             self.cantidad_producir_entry.insert(0, "1")
             self.load_subproductos()
 
-        except Exception as e:
+        def on_error(e):
             messagebox.showerror("Error", f"Error:  {e}")
             self.logger.error(f"Error produciendo:  {e}")
 
+        # Llamar al backend para producir
+        self.runner.submit(
+            self.backend.producir_subproducto, self.selected_subproducto_id, cantidad,
+            on_success=on_success, on_error=on_error, busy=self.produce_btn,
+        )
+
     def on_subproducto_right_click(self, event):
         """Click derecho en subproducto."""
-        item = self.subproductos_tree.identify('item', event.x, event. y)
+        row = self.subproductos_table.row_at(event.y)
 
-        if not item: 
+        if not row:
             return
 
         context_menu = tk.Menu(self, tearoff=0)
         context_menu.add_command(
             label="❌ Eliminar",
-            command=lambda: self.delete_subproducto(int(item)),
+            command=lambda: self.delete_subproducto(row['id']),
             foreground="red"
         )
 
@@ -548,13 +569,21 @@ class ProduccionFrame(ttk.Frame):
         if not messagebox.askyesno("Confirmar", "¿Eliminar este subproducto?"):
             return
 
-        try:
-            self.backend.eliminar_subproducto(sub_id)
+        def on_success(_):
+            get_app_context().mark_changed("produccion")
             self.load_subproductos()
             self.load_productos_finales()
             messagebox.showinfo("✅ Éxito", "Subproducto eliminado")
-        except Exception as e:
+
+        def on_error(e):
             messagebox.showerror("Error", f"Error: {e}")
+            self.logger.error(f"Error eliminando subproducto: {e}")
+
+        self.runner.submit(
+            self.backend.eliminar_subproducto, sub_id,
+            on_success=on_success, on_error=on_error,
+            busy=[self.produce_btn, self.create_prod_btn],
+        )
 
     # ===== OPERACIONES PRODUCTOS FINALES =====
 
@@ -589,12 +618,16 @@ class ProduccionFrame(ttk.Frame):
                 messagebox.showerror("Error", "Subproducto no encontrado")
                 return
 
-            # Crear producto final
-            self.backend.crear_producto_final(nombre, subproducto_id, unidades, 0)
+        except Exception as e:
+            messagebox. showerror("Error", f"Error: {e}")
+            self.logger.error(f"Error creando producto final: {e}")
+            return
 
-            costo_total = float(self.subproductos_map[subproducto_id].get('costo_total_subproducto', 0))
-            costo_unitario = costo_total / unidades
+        costo_total = float(self.subproductos_map[subproducto_id].get('costo_total_subproducto', 0))
+        costo_unitario = costo_total / unidades
 
+        def on_success(_):
+            get_app_context().mark_changed("produccion")
             messagebox.showinfo(
                 "✅ Éxito",
                 f"Producto final '{nombre}' creado\n"
@@ -611,21 +644,27 @@ class ProduccionFrame(ttk.Frame):
 
             self.load_productos_finales()
 
-        except Exception as e:
-            messagebox. showerror("Error", f"Error: {e}")
+        def on_error(e):
+            messagebox.showerror("Error", f"Error: {e}")
             self.logger.error(f"Error creando producto final: {e}")
 
+        # Crear producto final
+        self.runner.submit(
+            self.backend.crear_producto_final, nombre, subproducto_id, unidades, 0,
+            on_success=on_success, on_error=on_error, busy=self.create_prod_btn,
+        )
+
     def on_producto_right_click(self, event):
         """Click derecho en producto final."""
-        item = self.productos_tree.identify('item', event.x, event.y)
+        row = self.productos_table.row_at(event.y)
 
-        if not item:
+        if not row:
             return
 
         context_menu = tk. Menu(self, tearoff=0)
         context_menu.add_command(
             label="❌ Eliminar",
-            command=lambda: self.delete_producto(int(item)),
+            command=lambda: self.delete_producto(row['id']),
             foreground="red"
         )
 
@@ -639,12 +678,19 @@ class ProduccionFrame(ttk.Frame):
         if not messagebox.askyesno("Confirmar", "¿Eliminar este producto? "):
             return
 
-        try: 
-            self.backend.eliminar_producto_final(prod_id)
+        def on_success(_):
+            get_app_context().mark_changed("produccion")
             self.load_productos_finales()
             messagebox.showinfo("✅ Éxito", "Producto eliminado")
-        except Exception as e:
+
+        def on_error(e):
             messagebox.showerror("Error", f"Error:  {e}")
+            self.logger.error(f"Error eliminando producto final: {e}")
+
+        self.runner.submit(
+            self.backend.eliminar_producto_final, prod_id,
+            on_success=on_success, on_error=on_error, busy=self.create_prod_btn,
+        )
 
     # ===== LIMPIAR =====
 
@@ -654,6 +700,7 @@ class ProduccionFrame(ttk.Frame):
         for item in self.ingredientes_tree.get_children():
             self.ingredientes_tree.delete(item)
         self.ingredientes_list. clear()
+        self.update_cost_preview()
         self.ing_producto_combo.set("")
         self.ing_cantidad_entry.delete(0, tk.END)
         self.ing_unidad_combo.set("")
\ No newline at end of file
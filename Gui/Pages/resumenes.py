@@ -6,15 +6,24 @@ import tkinter as tk
 from tkinter import ttk
 from Gui.Pages.ResumenesTabs. inventario_tab import InventarioTab
 from Gui.Pages.ResumenesTabs.contabilidad_tab import ContabilidadTab
-from Core.inventario_backend import InventarioBackend
+from Core.app_context import get_app_context
+from Gui.lazy_notebook import LazyNotebook
+from Gui.task_runner import SharedQuery
 from Core.logger import setup_logger
 
 
 class ResumenesFrame(ttk.Frame):
+    # Datos que muestra; si cambian mientras la página está oculta, refresh()
+    datasets = ("inventario",)
+
     def __init__(self, parent):
         super().__init__(parent)
         self.logger = setup_logger()
-        self.backend = InventarioBackend()
+        self.backend = get_app_context().inventario
+        # Inventario y Contabilidad muestran la misma consulta: se trae una vez
+        self.inventario_query = SharedQuery(
+            self.backend.get_inventario_para_resumen, error_message="No se pudo cargar el inventario"
+        )
         self.setup_ui()
         self.logger.info("ResumenesFrame initialized")
 
@@ -41,13 +50,18 @@ class ResumenesFrame(ttk.Frame):
         title.pack(side=tk.LEFT, fill=tk. BOTH, expand=True)
         
         # ===== TABS/NOTEBOOK =====
-        self.notebook = ttk.Notebook(main)
+        self.notebook = LazyNotebook(main)
         self.notebook.pack(fill=tk.BOTH, expand=True)
         
         # Tab:  Inventario
-        self.inv_tab = InventarioTab(self.notebook, self.backend)
+        self.inv_tab = InventarioTab(self.notebook, self.backend, inventario_query=self.inventario_query)
         self.notebook.add(self.inv_tab, text="📦 Inventario")
         
         # Tab: Contabilidad (NUEVO)
-        self.contabilidad_tab = ContabilidadTab(self.notebook, self.backend)
-        self.notebook.add(self.contabilidad_tab, text="💰 Contabilidad")
\ No newline at end of file
+        self.contabilidad_tab = ContabilidadTab(self.notebook, self.backend, inventario_query=self.inventario_query)
+        self.notebook.add(self.contabilidad_tab, text="💰 Contabilidad")
+
+    def refresh(self):
+        """Recargar los tabs tras cambios en el inventario."""
+        self.inventario_query.invalidate()
+        self.notebook.refresh()
@@ -1,17 +1,21 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 from Gui.Pages.Styles.ventas_styles import VentasStyles
-from Core.ventas_backend import VentasBackend
+from Core.app_context import get_app_context
 from Gui.Pages.Ventas_Tabs.clientes_tab import ClientesTab
 from Gui.Pages.Ventas_Tabs.history_tab import HistorialTab
 # from Gui.Pages.Ventas_Tabs.precios_tab import PreciosTab
 from Gui.Pages.Ventas_Tabs.ventas_registro_tab import RegistrarVentaTab
 from Core.logger import setup_logger
+from Gui.lazy_notebook import LazyNotebook
 
 class VentasFrame(ttk.Frame):
+    # Datos que muestra; si cambian mientras la página está oculta, refresh()
+    datasets = ("clientes", "ventas", "produccion", "precios")
+
     def __init__(self, parent):
         super().__init__(parent)
-        self.backend = VentasBackend()
+        self.backend = get_app_context().ventas
         self.logger = setup_logger()
         self.styles = VentasStyles()
         self.setup_ui()
@@ -30,9 +34,14 @@ class VentasFrame(ttk.Frame):
         self.notebook.add(self.historial_tab, text="Historial de Ventas")
 
     def setup_ui(self):
-        self.notebook = ttk.Notebook(self)
+        # Cada tab carga sus datos la primera vez que se selecciona
+        self.notebook = LazyNotebook(self)
         self.notebook.pack(fill=tk.BOTH, expand=True)
 
+    def refresh(self):
+        """Recargar clientes, catálogo e historial tras cambios en otras páginas."""
+        self.notebook.refresh()
+
 
 
 
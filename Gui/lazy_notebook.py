@@ -0,0 +1,72 @@
+"""
+Notebook cuyos tabs cargan sus datos al mostrarse por primera vez.
+
+Los tabs construían sus widgets y consultaban la base en el constructor,
+así que abrir Ventas traía clientes, catálogo e historial aunque el
+usuario solo mirara uno. Con LazyNotebook los tabs solo arman sus widgets
+al construirse y cargan en load_data(), que se llama con el primer
+<<NotebookTabChanged>> que los selecciona.
+
+    class ClientesTab(ttk.Frame):
+        def load_data(self):
+            self.load_clients()
+
+Los tabs sin load_data() se tratan como siempre cargados.
+"""
+
+from tkinter import ttk
+
+from Core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class LazyNotebook(ttk.Notebook):
+    """ttk.Notebook que difiere load_data() de cada tab hasta que se selecciona."""
+
+    def __init__(self, parent, **options):
+        super().__init__(parent, **options)
+        self._loaded = set()
+        self._stale = set()
+        self.bind("<<NotebookTabChanged>>", self._on_tab_changed, add="+")
+
+    def add(self, child, **options):
+        super().add(child, **options)
+        # El primer tab queda seleccionado solo; no depender de que Tk emita el evento
+        self.after_idle(self._load_current)
+
+    def refresh(self):
+        """
+        Los datos cambiaron: recarga ya el tab visible y marca los demás tabs
+        cargados para recargarlos cuando se vuelvan a seleccionar.
+        """
+        current = self.current_tab()
+        for tab in list(self._loaded):
+            if tab is current:
+                self._load(tab)
+            else:
+                self._stale.add(tab)
+
+    def current_tab(self):
+        selected = self.select()
+        return self.nametowidget(selected) if selected else None
+
+    def is_loaded(self, tab):
+        return tab in self._loaded
+
+    def _on_tab_changed(self, event):
+        if event.widget is self:
+            self._load_current()
+
+    def _load_current(self):
+        tab = self.current_tab()
+        if tab is not None and (tab not in self._loaded or tab in self._stale):
+            self._load(tab)
+
+    def _load(self, tab):
+        self._stale.discard(tab)
+        self._loaded.add(tab)
+        load_data = getattr(tab, "load_data", None)
+        if load_data is not None:
+            logger.debug(f"Cargando datos del tab '{getattr(tab, 'tab_name', tab)}'")
+            load_data()
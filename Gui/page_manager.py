@@ -0,0 +1,141 @@
+"""
+Páginas del menú principal construidas una sola vez.
+
+Antes cada click en el menú destruía la página actual y construía otra:
+todos los widgets de nuevo y todas las consultas iniciales otra vez.
+PageManager construye cada página en la primera visita, la oculta con
+pack_forget al salir y la vuelve a mostrar tal cual al volver.
+
+Una página puede declarar qué datos muestra y cómo recargarlos:
+
+    class ResumenesFrame(ttk.Frame):
+        datasets = ("inventario",)
+
+        def refresh(self):
+            self.inv_tab.load_inventario()
+
+Al volver a la página solo se llama refresh() si alguno de sus `datasets`
+cambió mientras estaba oculta (ver AppContext.mark_changed). Lo que la
+página escribe mientras está visible ya lo refleja ella misma.
+
+Las fábricas pueden ser "modulo:Clase": el módulo de la página (y sus
+backends) se importa recién en la primera visita.
+"""
+
+import importlib
+import time
+import tkinter as tk
+from tkinter import ttk
+
+from Core.app_context import get_app_context
+from Core.logger import setup_logger, log_event
+
+logger = setup_logger(__name__)
+
+
+class PageManager:
+    """Construye, guarda y alterna las páginas dentro de `container`."""
+
+    def __init__(self, container, factories):
+        """`factories` mapea nombre de página -> callable(parent) o "modulo:Clase"."""
+        self.container = container
+        self.factories = dict(factories)
+        self.pages = {}
+        self.current = None
+        self.import_ms = {}
+        self._versions = {}
+        self._timings = {}
+
+    def show(self, name):
+        """Muestra la página `name`. Devuelve el frame mostrado."""
+        start = time.perf_counter()
+        if self.current == name:
+            return self.pages[name]
+
+        if self.current is not None:
+            previous = self.pages[self.current]
+            previous.pack_forget()
+            self._versions[self.current] = self._current_versions(previous)
+
+        page = self.pages.get(name)
+        built = page is None
+        refreshed = False
+        if built:
+            page = self._build(name)
+            self.pages[name] = page
+            self._versions[name] = self._current_versions(page)
+        else:
+            refreshed = self._refresh_if_stale(name, page)
+
+        page.pack(fill=tk.BOTH, expand=True)
+        self.current = name
+        # Incluye el layout para que la medición sea lo que ve el usuario
+        page.update_idletasks()
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self._timings.setdefault(name, []).append(elapsed_ms)
+        logger.info(
+            f"Página '{name}' mostrada en {elapsed_ms:.1f} ms"
+            + (" (construida)" if built else " (refrescada)" if refreshed else " (en caché)")
+        )
+        log_event("gui.show_page", page=name, built=built, refreshed=refreshed, elapsed_ms=round(elapsed_ms, 3))
+        return page
+
+    def invalidate(self, name=None):
+        """Descarta una página (o todas) para que se reconstruya en la próxima visita."""
+        names = [name] if name is not None else list(self.pages)
+        for n in names:
+            page = self.pages.pop(n, None)
+            self._versions.pop(n, None)
+            if page is not None:
+                page.destroy()
+            if self.current == n:
+                self.current = None
+
+    def switch_stats(self):
+        """Latencia de cambio por página: {nombre: {count, first_ms, avg_ms, max_ms}}."""
+        stats = {}
+        for name, timings in self._timings.items():
+            cached = timings[1:]
+            stats[name] = {
+                "count": len(timings),
+                "first_ms": round(timings[0], 1),
+                "avg_ms": round(sum(cached) / len(cached), 1) if cached else None,
+                "max_ms": round(max(cached), 1) if cached else None,
+            }
+        return stats
+
+    def _build(self, name):
+        factory = self.factories.get(name)
+        if factory is None:
+            return self._placeholder(name)
+        if isinstance(factory, str):
+            module_name, class_name = factory.split(":")
+            start = time.perf_counter()
+            factory = getattr(importlib.import_module(module_name), class_name)
+            self.import_ms[name] = (time.perf_counter() - start) * 1000
+            self.factories[name] = factory
+            logger.debug(f"Módulo '{module_name}' importado en {self.import_ms[name]:.1f} ms")
+        return factory(self.container)
+
+    def _placeholder(self, name):
+        page = ttk.Frame(self.container)
+        ttk.Label(
+            page,
+            text=f"Página: {name.title()}\n(Placeholder - Contenido a desarrollar)",
+            font=("Arial", 12),
+            justify=tk.CENTER,
+        ).pack(expand=True)
+        return page
+
+    def _current_versions(self, page):
+        datasets = getattr(page, "datasets", ())
+        return get_app_context().data_versions(datasets) if datasets else ()
+
+    def _refresh_if_stale(self, name, page):
+        versions = self._current_versions(page)
+        if versions == self._versions.get(name) or not hasattr(page, "refresh"):
+            return False
+        self._versions[name] = versions
+        page.refresh()
+        return True
@@ -0,0 +1,304 @@
+"""
+Ejecución de trabajo de base de datos fuera del hilo de Tk.
+
+Las páginas llamaban al backend directamente desde los callbacks de Tk, así
+que una consulta lenta congelaba toda la ventana. TaskRunner corre esas
+llamadas en un pool de hilos y entrega el resultado de vuelta en el hilo de
+Tk (con `after`), que es el único que puede tocar widgets.
+
+    runner = get_task_runner(self)
+    runner.submit(
+        self.backend.get_cliente_stats, cliente_id,
+        on_success=self.show_stats,
+        key="clientes.stats",          # una consulta nueva descarta la anterior
+        busy=self.toggle_btn,          # se deshabilita mientras corre
+        error_message="No se pudieron cargar las estadísticas",
+    )
+"""
+
+import queue
+import threading
+import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
+from tkinter import messagebox
+
+from Core.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class Task:
+    """Una llamada enviada al runner. cancel() descarta su resultado."""
+
+    def __init__(self, key):
+        self.key = key
+        self.cancelled = False
+        self.future = None
+
+    def cancel(self):
+        self.cancelled = True
+        if self.future is not None:
+            self.future.cancel()
+
+
+class TaskRunner:
+    """Pool de hilos con entrega de resultados en el hilo de Tk."""
+
+    POLL_MS = 25
+
+    def __init__(self, root, max_workers=4):
+        self.root = root
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="economia-db")
+        self._results = queue.SimpleQueue()
+        self._latest = {}
+        self._pending = 0
+        self._polling = False
+        self._busy_widgets = {}
+        self._busy_states = {}
+        self._closed = False
+
+    # ===== API =====
+
+    def submit(self, fn, *args, on_success=None, on_error=None, on_done=None, key=None,
+               busy=None, error_title="Error", error_message=None, **kwargs):
+        """
+        Corre fn(*args, **kwargs) en un hilo del pool.
+
+        on_success(resultado) / on_error(excepción) / on_done() se llaman en el
+        hilo de Tk. Sin on_error, el error se loguea y se muestra en un
+        messagebox (`error_message` antepone un texto al mensaje).
+        Con `key`, enviar otra tarea con la misma clave cancela la anterior:
+        su resultado se descarta aunque ya esté corriendo.
+        `busy` es un widget (o lista) que se deshabilita mientras la tarea corre.
+        """
+        if self._closed:
+            raise RuntimeError("TaskRunner cerrado")
+        task = Task(key)
+        if key is not None:
+            previous = self._latest.get(key)
+            if previous is not None:
+                previous.cancel()
+            self._latest[key] = task
+
+        busy_widgets = _widget_list(busy)
+        callbacks = (on_success, on_error, on_done, busy_widgets, error_title, error_message)
+        self._set_busy(busy_widgets, True)
+        self._pending += 1
+        self._update_cursor()
+
+        def run():
+            if task.cancelled:
+                return task, callbacks, None, None
+            try:
+                return task, callbacks, fn(*args, **kwargs), None
+            except Exception as e:
+                return task, callbacks, None, e
+
+        def done(future):
+            # Hilo del pool (o el que canceló): solo encolar, nunca tocar Tk.
+            # Las tareas canceladas antes de empezar también pasan por la cola
+            # para que _finish libere sus widgets ocupados.
+            outcome = (task, callbacks, None, None) if future.cancelled() else future.result()
+            self._results.put(outcome)
+
+        task.future = self._executor.submit(run)
+        task.future.add_done_callback(done)
+        self._ensure_polling()
+        return task
+
+    def cancel(self, key):
+        """Cancela la última tarea enviada con `key`, si sigue pendiente."""
+        task = self._latest.pop(key, None)
+        if task is not None:
+            task.cancel()
+
+    def is_busy(self):
+        return self._pending > 0
+
+    def shutdown(self):
+        """Cancela lo pendiente y espera a que terminen las tareas en curso."""
+        self._closed = True
+        for task in list(self._latest.values()):
+            task.cancel()
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    # ===== INTERNO =====
+
+    def _ensure_polling(self):
+        if not self._polling:
+            self._polling = True
+            self.root.after(self.POLL_MS, self._poll)
+
+    def _poll(self):
+        while True:
+            try:
+                task, callbacks, result, error = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self._finish(task, callbacks, result, error)
+
+        if self._pending > 0 and not self._closed:
+            self.root.after(self.POLL_MS, self._poll)
+        else:
+            self._polling = False
+        self._update_cursor()
+
+    def _finish(self, task, callbacks, result, error):
+        on_success, on_error, on_done, busy_widgets, error_title, error_message = callbacks
+        self._pending = max(0, self._pending - 1)
+        self._set_busy(busy_widgets, False)
+        if task.key is not None and self._latest.get(task.key) is task:
+            del self._latest[task.key]
+        if task.cancelled:
+            return
+        try:
+            if error is not None:
+                logger.error(f"Error en tarea de fondo: {error}")
+                if on_error is not None:
+                    on_error(error)
+                else:
+                    messagebox.showerror(error_title, f"{error_message}: {error}" if error_message else str(error))
+            elif on_success is not None:
+                on_success(result)
+            if on_done is not None:
+                on_done()
+        except tk.TclError as e:
+            # La página se cerró (o se reconstruyó) mientras la tarea corría
+            logger.debug(f"Resultado descartado, widget destruido: {e}")
+
+    def _set_busy(self, widgets, busy):
+        # Al liberar se restaura el estado que tenía el widget (p. ej. un
+        # Combobox "readonly" no debe quedar editable)
+        for widget in widgets:
+            previous = self._busy_widgets.get(widget, 0)
+            count = previous + (1 if busy else -1)
+            try:
+                if count > 0 and previous == 0:
+                    self._busy_states[widget] = str(widget.cget("state"))
+                    widget.configure(state="disabled")
+                elif count <= 0 and previous > 0:
+                    widget.configure(state=self._busy_states.pop(widget, "normal"))
+            except Exception:
+                # el widget pudo haberse destruido mientras la tarea corría
+                if count <= 0:
+                    self._busy_states.pop(widget, None)
+            if count > 0:
+                self._busy_widgets[widget] = count
+            else:
+                self._busy_widgets.pop(widget, None)
+
+    def _update_cursor(self):
+        try:
+            self.root.configure(cursor="watch" if self._pending > 0 else "")
+        except Exception:
+            pass
+
+
+class SharedQuery:
+    """
+    Un resultado que varios widgets muestran: una consulta, varios consumidores.
+
+        inventario = SharedQuery(backend.get_inventario_para_resumen)
+        inventario.get(tab_a, on_success=tab_a.show)   # consulta
+        inventario.get(tab_b, on_success=tab_b.show)   # reusa el resultado
+        inventario.subscribe(tab_b.show)               # y recibe los que pida tab_a
+
+    Si la consulta está en curso, los pedidos se suman a ella en vez de
+    lanzar otra. invalidate() descarta el resultado guardado (y el que esté
+    en curso): el próximo get vuelve a consultar. Como en TaskRunner.submit,
+    `busy` se deshabilita hasta que llega el resultado, también cuando el
+    pedido se suma a una consulta ya en curso. Con subscribe(), un widget
+    recibe cada resultado nuevo aunque lo haya pedido otro (p. ej. el
+    "Actualizar" forzado de un tab actualiza también a sus hermanos).
+    """
+
+    def __init__(self, fn, error_message=None):
+        self.fn = fn
+        self.error_message = error_message
+        self._has_result = False
+        self._result = None
+        self._waiting = None
+        self._version = 0
+        self._subscribers = []
+
+    def subscribe(self, on_result):
+        """Llama a on_result(resultado) (en el hilo de Tk) con cada resultado nuevo que se consulte."""
+        self._subscribers.append(on_result)
+
+    def get(self, widget, on_success, on_error=None, force=False, busy=None):
+        """Entrega el resultado a on_success (en el hilo de Tk), consultando solo si hace falta."""
+        if force:
+            self.invalidate()
+        if self._has_result:
+            on_success(self._result)
+            return
+        runner = get_task_runner(widget)
+        busy_widgets = _widget_list(busy)
+        runner._set_busy(busy_widgets, True)
+        if self._waiting is not None:
+            self._waiting.append((on_success, on_error, busy_widgets))
+            return
+        self._waiting = [(on_success, on_error, busy_widgets)]
+        self._fetch(runner)
+
+    def invalidate(self):
+        self._has_result = False
+        self._result = None
+        self._version += 1
+
+    def _fetch(self, runner):
+        version = self._version
+
+        def done(result):
+            if version != self._version:
+                self._fetch(runner)  # se invalidó mientras corría
+                return
+            waiting, self._waiting = self._waiting, None
+            self._has_result, self._result = True, result
+            release(waiting)
+            delivered = [on_success for on_success, _, _ in waiting]
+            for on_success in delivered:
+                on_success(result)
+            for on_result in self._subscribers:
+                if on_result not in delivered:
+                    on_result(result)
+
+        def failed(error):
+            waiting, self._waiting = self._waiting, None
+            release(waiting)
+            shown = False
+            for _, on_error, _ in waiting:
+                if on_error is not None:
+                    on_error(error)
+                elif not shown:
+                    shown = True
+                    messagebox.showerror("Error", f"{self.error_message}: {error}" if self.error_message else str(error))
+
+        def release(waiting):
+            for _, _, busy_widgets in waiting:
+                runner._set_busy(busy_widgets, False)
+
+        runner.submit(self.fn, on_success=done, on_error=failed)
+
+
+def _widget_list(busy):
+    """Normaliza `busy` (None, un widget o lista/tupla de widgets) a una lista."""
+    if busy is None:
+        return []
+    return list(busy) if isinstance(busy, (list, tuple)) else [busy]
+
+
+_runner_lock = threading.Lock()
+
+
+def get_task_runner(widget):
+    """Devuelve el TaskRunner de la ventana principal de `widget` (uno por ventana)."""
+    root = widget.winfo_toplevel()
+    runner = getattr(root, "_task_runner", None)
+    if runner is None:
+        with _runner_lock:
+            runner = getattr(root, "_task_runner", None)
+            if runner is None:
+                runner = TaskRunner(root)
+                root._task_runner = runner
+    return runner
@@ -0,0 +1,377 @@
+"""
+Tabla virtualizada sobre ttk.Treeview.
+
+Un Treeview normal necesita un item de Tk por fila: refrescar una tabla de
+100k filas son 100k deletes y 100k inserts en el hilo de la GUI. VirtualTable
+guarda las filas en una lista de Python y solo materializa las que entran en
+pantalla: reutiliza siempre los mismos items del Treeview y les cambia los
+valores al desplazarse, así refrescar cuesta lo mismo con 1k que con 100k filas.
+
+Las filas son dicts. Las columnas se describen con Column (clave del dict,
+encabezado, ancho, alineación y formato). Los datos pueden venir completos
+(set_rows) o de un backend paginado por keyset (set_page_source), en cuyo
+caso la página siguiente se pide al acercarse al final.
+"""
+
+import tkinter as tk
+from tkinter import ttk, messagebox
+
+
+class Column:
+    """Columna de una VirtualTable. `fmt` convierte el valor de la fila a texto."""
+
+    def __init__(self, key, heading=None, width=100, anchor=tk.W, fmt=None, sortable=True):
+        self.key = key
+        self.heading = heading if heading is not None else key
+        self.width = width
+        self.anchor = anchor
+        self.fmt = fmt
+        self.sortable = sortable
+
+    def format(self, row):
+        value = row.get(self.key)
+        if self.fmt is not None:
+            return self.fmt(value, row)
+        return "" if value is None else value
+
+
+def _sort_key(value):
+    # None al final y sin comparar tipos distintos entre sí
+    return (value is None, value if value is not None else 0)
+
+
+class VirtualTable(ttk.Frame):
+    """
+    Tabla que solo crea items de Tk para las filas visibles.
+
+        table = VirtualTable(parent, [
+            Column("producto", "Producto", width=150),
+            Column("total", "Total", anchor=tk.E, fmt=lambda v, r: f"${v:.2f}"),
+        ], on_select=self.on_row_select)
+        table.set_rows(rows)
+    """
+
+    DEFAULT_ROW_HEIGHT = 20
+    # Fracción de las filas cargadas a partir de la cual se pide la página siguiente
+    PREFETCH_AT = 0.9
+
+    def __init__(self, parent, columns, height=10, style=None, on_select=None, **tree_options):
+        super().__init__(parent)
+        self.columns = list(columns)
+        self.on_select = on_select
+        self._rows = []
+        self._offset = 0
+        self._visible = height
+        self._slots = []
+        self._attached = 0
+        self._selected = None
+        self._rendering = False
+        self._sort_key = None
+        self._sort_reverse = False
+        self._page_source = None
+        self._runner = None
+        self._on_page = None
+        self._on_page_error = None
+        self._source_version = 0
+        self._next_cursor = None
+        self._loading = False
+        self._load_pending = False
+
+        if style:
+            tree_options["style"] = style
+        self.tree = ttk.Treeview(
+            self, columns=[c.key for c in self.columns], show="headings",
+            height=height, selectmode="browse", **tree_options
+        )
+        for column in self.columns:
+            self.tree.heading(column.key, text=column.heading,
+                              command=(lambda k=column.key: self.sort_by(k)) if column.sortable else "")
+            self.tree.column(column.key, width=column.width, anchor=column.anchor)
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self._on_scrollbar)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.pack(side=tk.LEFT, fill=tk.Y)
+
+        style_name = style or "Treeview"
+        try:
+            self._row_height = int(ttk.Style().lookup(style_name, "rowheight") or self.DEFAULT_ROW_HEIGHT)
+        except (tk.TclError, ValueError):
+            self._row_height = self.DEFAULT_ROW_HEIGHT
+
+        self.tree.bind("<Configure>", self._on_configure)
+        self.tree.bind("<<TreeviewSelect>>", self._on_tree_select)
+        self.tree.bind("<MouseWheel>", self._on_mousewheel)
+        self.tree.bind("<Button-4>", lambda e: self._scroll_units(-3))
+        self.tree.bind("<Button-5>", lambda e: self._scroll_units(3))
+        self.tree.bind("<Up>", lambda e: self._move_selection(-1))
+        self.tree.bind("<Down>", lambda e: self._move_selection(1))
+        self.tree.bind("<Prior>", lambda e: self._move_selection(-self._visible))
+        self.tree.bind("<Next>", lambda e: self._move_selection(self._visible))
+        self.tree.bind("<Home>", lambda e: self._move_selection(-len(self._rows)))
+        self.tree.bind("<End>", lambda e: self._move_selection(len(self._rows)))
+
+    # ===== DATOS =====
+
+    @property
+    def rows(self):
+        return self._rows
+
+    def __len__(self):
+        return len(self._rows)
+
+    def set_rows(self, rows):
+        """Reemplaza todas las filas (sin fuente paginada)."""
+        self._page_source = None
+        self._source_version += 1
+        self._loading = False
+        self._next_cursor = None
+        self._rows = list(rows)
+        self._apply_sort()
+        self._reset_view()
+
+    def set_page_source(self, fetch, runner=None, on_page=None, on_error=None):
+        """
+        Usa un backend paginado: fetch(after) devuelve {"rows", "next_cursor"}
+        (ver Core.database.keyset_page). Carga la primera página y pide las
+        siguientes a medida que se desplaza. El orden lo define el backend.
+
+        Con `runner` (Gui.task_runner.TaskRunner) fetch corre fuera del hilo de
+        Tk, así que no debe tocar widgets: on_page(page, first) y
+        on_error(excepción) se llaman en el hilo de Tk al terminar cada página.
+        Cambiar de fuente descarta la página que se estuviera trayendo.
+        """
+        self._page_source = fetch
+        self._runner = runner
+        self._on_page = on_page
+        self._on_page_error = on_error
+        self._source_version += 1
+        self._loading = False
+        self._rows = []
+        self._next_cursor = None
+        self._sort_key = None
+        self._update_headings()
+        self._reset_view()
+        self.load_more(first=True)
+
+    def has_more(self):
+        return self._page_source is not None and self._next_cursor is not None
+
+    def load_more(self, first=False):
+        """Trae la página siguiente de la fuente paginada y la agrega al final."""
+        if self._loading or self._page_source is None or (not first and self._next_cursor is None):
+            return
+        self._loading = True
+        if self._runner is None:
+            try:
+                page = self._page_source(self._next_cursor)
+                self._page_loaded(page, first)
+            finally:
+                self._loading = False
+            return
+
+        version = self._source_version
+
+        def loaded(page):
+            if version == self._source_version:
+                self._loading = False
+                self._page_loaded(page, first)
+
+        def failed(error):
+            if version == self._source_version:
+                self._loading = False
+                if self._on_page_error is not None:
+                    self._on_page_error(error)
+                else:
+                    messagebox.showerror("Error", f"No se pudieron cargar los datos: {error}")
+
+        self._runner.submit(self._page_source, self._next_cursor, on_success=loaded, on_error=failed,
+                            key=("virtual_table", id(self)))
+
+    def _page_loaded(self, page, first):
+        self.append_page(page)
+        if self._on_page is not None:
+            self._on_page(page, first)
+
+    def append_page(self, page):
+        """Agrega una página ya traída ({"rows", "next_cursor"}) al final."""
+        self._rows.extend(page["rows"])
+        self._next_cursor = page["next_cursor"]
+        self.refresh()
+
+    def prepend_row(self, row):
+        """Agrega una fila arriba sin recargar (p. ej. un registro recién guardado)."""
+        self._rows.insert(0, row)
+        if self._selected is not None:
+            self._selected += 1
+        self.refresh()
+
+    def clear(self):
+        self.set_rows([])
+
+    # ===== SELECCIÓN =====
+
+    def selected_row(self):
+        if self._selected is None or self._selected >= len(self._rows):
+            return None
+        return self._rows[self._selected]
+
+    def row_at(self, y):
+        """Fila bajo la coordenada y del Treeview (para menús contextuales), o None."""
+        slot = self.tree.identify_row(y)
+        if not slot:
+            return None
+        index = self._offset + int(slot)
+        return self._rows[index] if index < len(self._rows) else None
+
+    def select_index(self, index):
+        if not self._rows:
+            return
+        index = max(0, min(index, len(self._rows) - 1))
+        self._selected = index
+        self.scroll_to(index)
+        self._notify_select()
+
+    # ===== ORDEN =====
+
+    def sort_by(self, key):
+        """Ordena por la columna `key`; un segundo click invierte el orden."""
+        if self._page_source is not None:
+            return  # con datos paginados solo hay parte de las filas
+        if self._sort_key == key:
+            self._sort_reverse = not self._sort_reverse
+        else:
+            self._sort_key, self._sort_reverse = key, False
+        selected = self.selected_row()
+        self._apply_sort()
+        self._selected = next((i for i, r in enumerate(self._rows) if r is selected), None) if selected else None
+        self.refresh()
+
+    def _apply_sort(self):
+        if self._sort_key is not None:
+            key = self._sort_key
+            self._rows.sort(key=lambda r: _sort_key(r.get(key)), reverse=self._sort_reverse)
+        self._update_headings()
+
+    def _update_headings(self):
+        for column in self.columns:
+            arrow = ""
+            if column.key == self._sort_key:
+                arrow = " ▼" if self._sort_reverse else " ▲"
+            self.tree.heading(column.key, text=column.heading + arrow)
+
+    # ===== VISTA =====
+
+    def _reset_view(self):
+        self._offset = 0
+        self._selected = None
+        self.refresh()
+
+    def scroll_to(self, index):
+        """Desplaza lo mínimo para que la fila `index` quede visible."""
+        if index < self._offset:
+            self._offset = index
+        elif index >= self._offset + self._visible:
+            self._offset = index - self._visible + 1
+        self.refresh()
+
+    def refresh(self):
+        """Vuelve a pintar la ventana visible. Cuesta O(filas visibles)."""
+        total = len(self._rows)
+        self._offset = max(0, min(self._offset, total - self._visible))
+        count = min(self._visible, total - self._offset)
+
+        self._rendering = True
+        try:
+            # Los items (slots) se crean una vez y se ocultan/reusan; siempre
+            # quedan adjuntos los primeros `count`, en orden.
+            for i in range(count, self._attached):
+                self.tree.detach(self._slots[i])
+            for i in range(self._attached, min(count, len(self._slots))):
+                self.tree.move(self._slots[i], "", i)
+            while len(self._slots) < count:
+                slot = str(len(self._slots))
+                self.tree.insert("", tk.END, iid=slot)
+                self._slots.append(slot)
+            self._attached = max(count, 0)
+
+            for i in range(count):
+                row = self._rows[self._offset + i]
+                self.tree.item(self._slots[i], values=[c.format(row) for c in self.columns])
+
+            selected_slot = None
+            if self._selected is not None and self._offset <= self._selected < self._offset + count:
+                selected_slot = self._slots[self._selected - self._offset]
+            if selected_slot:
+                self.tree.selection_set(selected_slot)
+                self.tree.focus(selected_slot)
+            elif self.tree.selection():
+                self.tree.selection_remove(*self.tree.selection())
+        finally:
+            self._rendering = False
+
+        if total:
+            self.scrollbar.set(self._offset / total, (self._offset + count) / total)
+        else:
+            self.scrollbar.set(0, 1)
+        self._maybe_load_more()
+
+    def _maybe_load_more(self):
+        if not self.has_more() or self._load_pending:
+            return
+        if self._offset + self._visible >= len(self._rows) * self.PREFETCH_AT:
+            # Fuera del repintado actual para no anidar refresh()
+            self._load_pending = True
+            self.after_idle(self._load_pending_page)
+
+    def _load_pending_page(self):
+        self._load_pending = False
+        self.load_more()
+
+    def _on_configure(self, event):
+        header = self._row_height + 4
+        visible = max(1, (event.height - header) // self._row_height)
+        if visible != self._visible:
+            self._visible = visible
+            self.refresh()
+
+    # ===== EVENTOS =====
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        total = len(self._rows)
+        if action == "moveto":
+            self._offset = int(float(amount) * total)
+            self.refresh()
+        elif action == "scroll":
+            step = self._visible if unit == "pages" else 1
+            self._scroll_units(int(amount) * step)
+
+    def _scroll_units(self, rows):
+        self._offset += rows
+        self.refresh()
+        return "break"
+
+    def _on_mousewheel(self, event):
+        # Windows envía múltiplos de 120, macOS valores chicos
+        delta = event.delta // 120 if abs(event.delta) >= 120 else event.delta
+        return self._scroll_units(-3 * delta)
+
+    def _move_selection(self, rows):
+        start = self._selected if self._selected is not None else self._offset - (1 if rows > 0 else 0)
+        self.select_index(start + rows)
+        return "break"
+
+    def _on_tree_select(self, event):
+        if self._rendering:
+            return
+        selection = self.tree.selection()
+        if not selection:
+            return
+        index = self._offset + int(selection[0])
+        if index < len(self._rows) and index != self._selected:
+            self._selected = index
+            self._notify_select()
+
+    def _notify_select(self):
+        if self.on_select is not None:
+            row = self.selected_row()
+            if row is not None:
+                self.on_select(row)
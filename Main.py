@@ -1,18 +1,68 @@
+import sys
+import time
+
+_START = time.perf_counter()
+_MODULES_AT_START = len(sys.modules)
+
+import argparse
 import tkinter as tk
 from tkinter import ttk, messagebox
 from Core.logger import setup_logger
-
-# Modulos
+from Core.app_context import get_app_context
+from Gui.task_runner import get_task_runner
+from Gui.page_manager import PageManager
 from Gui.Pages.Styles.Main_styles import MainStyles
-from Gui.Pages.resumenes import ResumenesFrame
-from Gui.Pages.compras import ComprasFrame
-from Gui.Pages.produccion import ProduccionFrame
-from Gui.Pages.ventas import VentasFrame
-from Gui.Pages.Productos import ProductosFrame
+
+# Modulos: se importan en la primera visita a cada página (ver PageManager)
+PAGES = {
+    "compras": "Gui.Pages.compras:ComprasFrame",
+    "resumenes": "Gui.Pages.resumenes:ResumenesFrame",
+    "produccion": "Gui.Pages.produccion:ProduccionFrame",
+    "productos": "Gui.Pages.Productos:ProductosFrame",
+    "ventas": "Gui.Pages.ventas:VentasFrame",
+}
+INITIAL_PAGE = "compras"
+
+
+class StartupProfile:
+    """Tiempos del arranque por fase, para --profile-startup."""
+
+    def __init__(self, start, modules_at_start):
+        self.start = start
+        self._last = start
+        self._modules = modules_at_start
+        self.phases = []
+        self.background = []
+
+    def mark(self, name):
+        """Cierra la fase `name`: tiempo y módulos importados desde la marca anterior."""
+        now = time.perf_counter()
+        modules = len(sys.modules)
+        self.phases.append((name, (now - self._last) * 1000, modules - self._modules))
+        self._last = now
+        self._modules = modules
+
+    def add_background(self, name, elapsed_ms):
+        """Fase que corrió en otro hilo, en paralelo con las de la GUI."""
+        self.background.append((name, elapsed_ms))
+
+    def report(self):
+        lines = ["Perfil de arranque (ms)"]
+        for name, elapsed_ms, modules in self.phases:
+            extra = f"  +{modules} módulos" if modules else ""
+            lines.append(f"  {name:<42} {elapsed_ms:>9.1f}{extra}")
+        lines.append(f"  {'total':<42} {(self._last - self.start) * 1000:>9.1f}")
+        if self.background:
+            lines.append("En segundo plano")
+            for name, elapsed_ms in self.background:
+                lines.append(f"  {name:<42} {elapsed_ms:>9.1f}")
+        return "\n".join(lines)
+
 
 class MainInterface:
-    def __init__(self, root):
+    def __init__(self, root, profile=None):
         self.root = root
+        self.profile = profile
         self.root.title("Aplicacion de Economia")
         self.root.attributes("-fullscreen", True)
         self.styles = MainStyles(self.root)
@@ -45,9 +95,17 @@ class MainInterface:
         ]
 
         self.current_page = None
+        self.pages = None
+        self.db_ready = False
+        self.pending_page = INITIAL_PAGE
         self.setup_ui()
+        self._mark("menú y estilos")
         self.root.update()  # Force update to show the UI immediately
-        #self.show_page("compras")  # Load initial page after UI is set up
+        self._mark("ventana visible")
+
+        # La base se prepara con la ventana ya visible; la página inicial se
+        # muestra cuando termina
+        self.start_database()
 
         # Bind escape key to exit
         self.root.bind("<Escape>", self.confirm_exit)
@@ -98,52 +156,90 @@ class MainInterface:
             side=tk.RIGHT, fill=tk.BOTH, expand=True, padx=5, pady=5
         )
 
-        # Initial placeholder page
-        self.show_page("compras")
+        # Cada página se construye en la primera visita y queda en caché
+        self.pages = PageManager(self.content_frame, PAGES)
+
+        # Estado de la conexión inicial; si falla se queda aquí con "Reintentar"
+        self.loading_frame = ttk.Frame(self.content_frame)
+        self.loading_frame.pack(expand=True)
+        self.loading_label = ttk.Label(
+            self.loading_frame, text="Conectando con la base de datos...", font=("Arial", 12)
+        )
+        self.loading_label.pack(pady=10)
+        self.retry_btn = ttk.Button(
+            self.loading_frame, text="Reintentar", style="Accent.TButton", command=self.retry_database
+        )
+
+    def start_database(self):
+        """Abre el pool y aplica migraciones en el pool de tareas, fuera del hilo de Tk."""
+        def init():
+            start = time.perf_counter()
+            from Core.database import init_database  # importa pymysql en este hilo
+            return init_database(), (time.perf_counter() - start) * 1000
+
+        get_task_runner(self.root).submit(init, on_success=self.on_database_ready, on_error=self.on_database_error)
+
+    def on_database_ready(self, result):
+        ready, elapsed_ms = result
+        if self.profile:
+            self.profile.add_background("init_database (pool + migraciones)", elapsed_ms)
+        if not ready:
+            self.show_database_error("No se pudo inicializar la base de datos. Revisa la conexión y el log.")
+            return
+        self.show_initial_page()
+
+    def on_database_error(self, error):
+        self.show_database_error(f"No se pudo inicializar la base de datos: {error}")
+
+    def show_database_error(self, message):
+        """Un solo aviso con "Reintentar"; las páginas no se cargan sin base de datos."""
+        self.logger.error(message)
+        self.loading_label.config(text=message, foreground="#dc3545", wraplength=500)
+        self.retry_btn.pack(pady=10)
+        if self.profile:
+            self._mark("error al iniciar la base de datos")
+            print(self.profile.report())
+            self.root.quit()
+
+    def retry_database(self):
+        self.logger.info("Reintentando la conexión con la base de datos")
+        self.retry_btn.pack_forget()
+        self.loading_label.config(text="Conectando con la base de datos...", foreground="")
+        self.start_database()
+
+    def show_initial_page(self):
+        self._mark("esperando la base de datos")
+        self.db_ready = True
+        self.loading_frame.destroy()
+        self.show_page(self.pending_page)
+        if self.profile:
+            import_ms = self.pages.import_ms.get(self.pending_page, 0)
+            self._mark(f"página {self.pending_page} (import {import_ms:.0f} ms)")
+            self.root.after(20, self._finish_profile)
 
     def show_page(self, page_name):
-        # Clear current page
-        if self.current_page:
-            self.current_page.destroy()
-
-        if page_name == "compras":
-            
-            self.current_page = ComprasFrame(self.content_frame)
-            self.current_page.pack(fill=tk.BOTH, expand=True)
-
-        elif page_name == "resumenes":
-            
-            self.current_page = ResumenesFrame(self.content_frame)
-            self.current_page.pack(fill=tk.BOTH, expand=True)
-
-        elif page_name == "produccion":
-            self.current_page = ProduccionFrame(self.content_frame)
-            self.current_page.pack(fill=tk.BOTH, expand=True)
-
-        elif page_name == "productos":
-            self.current_page = ProductosFrame(self.content_frame)
-            self.current_page.pack(fill=tk.BOTH, expand=True)
-            
-        elif page_name == "ventas":
-            self.current_page = VentasFrame(self.content_frame)
-            self.current_page.pack(fill=tk.BOTH, expand=True)
+        if not self.db_ready:
+            # Se muestra al terminar start_database
+            self.pending_page = page_name
+            return
 
-        else:
-            # Create new page frame
-            self.current_page = ttk.Frame(self.content_frame)
-            self.current_page.pack(fill=tk.BOTH, expand=True)
-
-            # Placeholder label for the page
-            placeholder_label = ttk.Label(
-                self.current_page,
-                text=f"Página: {page_name.title()}\n(Placeholder - Contenido a desarrollar)",
-                font=("Arial", 12),
-                justify=tk.CENTER,
-            )
-            placeholder_label.pack(expand=True)
+        self.current_page = self.pages.show(page_name)
 
         self.logger.info(f"Navegando a página: {page_name}")
-        # Here, in future, load actual content from modules (e.g., Gui/pages/resumenes.py)
+        self.logger.debug(f"Conexiones: {get_app_context().connection_stats()}")
+
+    def _mark(self, name):
+        if self.profile:
+            self.profile.mark(name)
+
+    def _finish_profile(self):
+        # Espera a que la página inicial termine sus consultas y sale
+        if get_task_runner(self.root).is_busy():
+            self.root.after(20, self._finish_profile)
+            return
+        self._mark("primeros datos en pantalla")
+        print(self.profile.report())
+        self.root.quit()
 
     def confirm_exit(self, event=None):
         # Confirm exit with a dialog
@@ -156,10 +252,28 @@ class MainInterface:
             self.logger.info("Salida cancelada por el usuario")
 
 
-def run_gui():
+def run_gui(argv=None):
+    parser = argparse.ArgumentParser(description="Aplicacion de Economia")
+    parser.add_argument(
+        "--profile-startup", action="store_true",
+        help="Imprime el tiempo de cada fase del arranque y sale al mostrar la página inicial",
+    )
+    args = parser.parse_args(argv)
+
+    profile = StartupProfile(_START, _MODULES_AT_START) if args.profile_startup else None
+    if profile:
+        profile.mark("imports de Main")
+
     root = tk.Tk()
-    app = MainInterface(root)
+    if profile:
+        profile.mark("tk.Tk()")
+    app = MainInterface(root, profile)
     root.mainloop()
+    app.logger.info(f"Latencia de cambio de página: {app.pages.switch_stats()}")
+    # Esperar las escrituras en curso antes de cerrar las conexiones
+    get_task_runner(root).shutdown()
+    if "Core.database" in sys.modules:
+        sys.modules["Core.database"].close_pool()
     # Log app exit
     app.logger.info("Aplicación cerrada")
 
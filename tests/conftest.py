@@ -0,0 +1,24 @@
+"""
+Fixtures compartidas.
+
+Las pruebas puras corren siempre. Las que necesitan MariaDB piden la
+fixture `db` y se saltean si el servidor de DB_CONFIG no está disponible.
+"""
+
+import pymysql
+import pytest
+
+from Core import database
+
+
+@pytest.fixture(scope="session")
+def db():
+    """Módulo Core.database con el esquema migrado; saltea la prueba si no hay base."""
+    try:
+        pymysql.connect(**database.DB_CONFIG, connect_timeout=2).close()
+    except pymysql.Error as e:
+        pytest.skip(f"MariaDB no disponible: {e}")
+    if not database.init_database():
+        pytest.skip("No se pudo preparar el esquema de la base")
+    yield database
+    database.close_pool()
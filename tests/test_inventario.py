@@ -0,0 +1,74 @@
+"""Consumo de stock: validaciones sin base y prueba de concurrencia con base."""
+
+from decimal import Decimal
+
+import pytest
+
+from Core.benchmarks import stress_consumir_stock
+from Core.inventario_backend import InventarioBackend, StockInsuficienteError
+
+
+class CursorFalso:
+    """Cursor mínimo: registra las sentencias y simula un UPDATE que siempre alcanza."""
+
+    def __init__(self, filas=()):
+        self.filas = list(filas)
+        self.sentencias = []
+        self.rowcount = 0
+
+    def execute(self, sql, params=()):
+        self.sentencias.append(sql.split()[0])
+        self.rowcount = 1
+
+    def fetchall(self):
+        return self.filas
+
+    def fetchone(self):
+        return self.filas[0] if self.filas else None
+
+
+@pytest.fixture
+def inventario():
+    return InventarioBackend()
+
+
+@pytest.mark.parametrize("cantidad", [0, "0.00001"])
+def test_consumo_cero_no_toca_la_base(inventario, cantidad):
+    cursor = CursorFalso()
+    inventario.consumir_stock("harina", cantidad, "g", cursor=cursor)
+    assert cursor.sentencias == []
+
+
+def test_consumo_negativo_es_error(inventario):
+    with pytest.raises(ValueError, match="negativa"):
+        inventario.consumir_stock("harina", -5, "g", cursor=CursorFalso())
+
+
+def test_unidad_desconocida_es_error(inventario):
+    with pytest.raises(ValueError, match="No se pudo convertir"):
+        inventario.consumir_stock("harina", 1, "zz", cursor=CursorFalso())
+
+
+def test_lote_rechaza_negativos_e_ignora_ceros(inventario):
+    with pytest.raises(StockInsuficienteError) as error:
+        inventario.consumir_stock_lote([{"producto": "harina", "cantidad": -1, "unidad": "g"}], cursor=CursorFalso())
+    assert "negativa" in error.value.faltantes[0]
+
+    cursor = CursorFalso()
+    inventario.consumir_stock_lote([{"producto": "harina", "cantidad": 0, "unidad": "g"}], cursor=cursor)
+    assert cursor.sentencias == []
+
+
+def test_lote_compara_nombres_como_la_base(inventario):
+    filas = [{"producto": "harina", "cantidad_stock": Decimal("1000"), "unidad_base": "g"}]
+    cursor = CursorFalso(filas)
+    inventario.consumir_stock_lote([
+        {"producto": "Harina", "cantidad": 100, "unidad": "g"},
+        {"producto": "harina ", "cantidad": "0.1", "unidad": "kg"},
+    ], cursor=cursor)
+    assert cursor.sentencias == ["SELECT", "UPDATE"]
+
+
+def test_consumo_concurrente_sin_lost_updates(db):
+    resultado = stress_consumir_stock(hilos=8, consumos=20)
+    assert resultado["ok"], resultado
@@ -0,0 +1,28 @@
+"""Dinero y cantidades en Decimal: redondeos y deriva del costo promedio."""
+
+from decimal import Decimal
+
+from Core import money as m
+from Core.benchmarks import drift_costo_promedio
+
+
+def test_redondeo_mitad_hacia_arriba():
+    assert m.money("0.125") == Decimal("0.13")
+    assert m.money(0.1 + 0.2) == Decimal("0.30")
+
+
+def test_line_total_y_unit_cost():
+    assert m.line_total("3", "0.10") == Decimal("0.30")
+    assert m.unit_cost("10.00", "3") == Decimal("3.3333")
+
+
+def test_costo_promedio_ponderado():
+    assert m.weighted_average_cost(0, 0, "1000", "2.00") == Decimal("0.0020")
+    assert m.weighted_average_cost("1000", "0.0020", "500", "1.50") == Decimal("0.0023")
+    assert m.weighted_average_cost(0, 0, 0, 0) == Decimal("0.0000")
+
+
+def test_costo_promedio_sin_deriva_en_100k_compras():
+    resultado = drift_costo_promedio(compras=100000)
+    assert resultado["ok"], resultado
+    assert resultado["desvio_max_decimal"] == 0
@@ -0,0 +1,38 @@
+"""Registro de unidades: la matriz que ofrece la GUI convierte ida y vuelta."""
+
+import pytest
+
+from Core.units import (
+    UNIT_ALIASES, base_unit_of, check_unit_registry, convert_from_base, convert_to_base,
+    normalize_unit, unit_choices,
+)
+
+
+def test_matriz_de_unidades_sin_problemas():
+    assert check_unit_registry() == []
+
+
+def test_cada_unidad_ofrecida_tiene_alias_registrados():
+    assert set(unit_choices()) == set(UNIT_ALIASES)
+
+
+@pytest.mark.parametrize("alias, canonica, base", [
+    ("Kilos", "kg", "g"),
+    ("LITRO", "lt", "ml"),
+    ("docenas", "docen", "unit"),
+    (" gr ", "g", "g"),
+])
+def test_alias_normalizan_a_la_unidad_canonica(alias, canonica, base):
+    assert normalize_unit(alias) == canonica
+    assert base_unit_of(alias) == base
+
+
+def test_conversion_ida_y_vuelta():
+    convertido, base = convert_to_base(1.5, "kg")
+    assert (convertido, base) == (1500, "g")
+    assert convert_from_base(convertido, base, "kilo") == pytest.approx(1.5)
+
+
+def test_unidad_desconocida():
+    assert convert_to_base(1, "zz") == (None, None)
+    assert normalize_unit("zz") is None